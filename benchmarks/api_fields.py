@@ -0,0 +1,101 @@
+"""Benchmark for requesting only the attributes henry reads from the Looker API.
+
+Fetches models, explores, projects and connections from benchmarks.fake_looker
+with and without the fields parameter henry sends, and reports the bytes received
+and the time spent deserialising them into SDK models:
+
+    $ python -m benchmarks.api_fields --explores 100 --fields 300
+"""
+import argparse
+import time
+import urllib.parse
+import urllib.request
+from typing import Any, Dict, List, Optional, Sequence
+
+import tabulate
+from looker_sdk.rtl import serialize
+from looker_sdk.sdk.api40 import models
+
+from benchmarks import fake_looker
+from henry.modules import fetcher
+
+
+def fetch(base_url: str, path: str, fields: Optional[str]) -> bytes:
+    query = "?" + urllib.parse.urlencode({"fields": fields}) if fields else ""
+    url = f"{base_url}{fake_looker.API_PREFIX}{path}{query}"
+    with urllib.request.urlopen(url) as r:
+        return r.read()
+
+
+def measure(
+    base_url: str, paths: List[str], structure: Any, fields: Optional[str]
+) -> Dict[str, Any]:
+    payloads = [fetch(base_url, path, fields) for path in paths]
+    start = time.perf_counter()
+    for payload in payloads:
+        serialize.deserialize40(data=payload, structure=structure)
+    elapsed = time.perf_counter() - start
+    return {
+        "Calls": len(paths),
+        "Received (KB)": sum(map(len, payloads)) / 1024,
+        "Deserialise (ms)": elapsed * 1e3,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--explores", type=int, default=100)
+    parser.add_argument("--models", type=int, default=5)
+    parser.add_argument("--fields", type=int, default=100, help="Fields per view")
+    args = parser.parse_args()
+
+    scale = fake_looker.Scale(
+        models=args.models, explores=args.explores, fields=args.fields, history=0
+    )
+    with fake_looker.FakeLooker(scale) as looker:
+        instance = looker.instance
+        endpoints: Dict[str, Any] = {
+            "all_lookml_models": (
+                ["/lookml_models"],
+                Sequence[models.LookmlModel],
+                fetcher.MODEL_FIELDS,
+            ),
+            "lookml_model_explore": (
+                [
+                    f"/lookml_models/{m}/explores/{e}"
+                    for m, explores in instance.models.items()
+                    for e in explores
+                ],
+                models.LookmlModelExplore,
+                fetcher.EXPLORE_FIELDS,
+            ),
+            "all_projects": (
+                ["/projects"],
+                Sequence[models.Project],
+                fetcher.PROJECT_FIELDS,
+            ),
+            "all_connections": (
+                ["/connections"],
+                Sequence[models.DBConnection],
+                fetcher.CONNECTION_FIELDS,
+            ),
+        }
+        results = []
+        for name, (paths, structure, fields) in endpoints.items():
+            before = measure(looker.base_url, paths, structure, None)
+            after = measure(looker.base_url, paths, structure, fields)
+            results.append(
+                {
+                    "Endpoint": name,
+                    "Calls": before["Calls"],
+                    "Received before (KB)": before["Received (KB)"],
+                    "Received after (KB)": after["Received (KB)"],
+                    "Deserialise before (ms)": before["Deserialise (ms)"],
+                    "Deserialise after (ms)": after["Deserialise (ms)"],
+                }
+            )
+    print(tabulate.tabulate(results, headers="keys", floatfmt=".1f", tablefmt="psql"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Benchmark for henry's commands against a local fake Looker API.
+
+Runs analyze, vacuum and pulse against benchmarks.fake_looker at each scale, and
+reports wall time, API calls, bytes received and peak memory of every run:
+
+    $ python -m benchmarks.commands --explores 10 100 1000 --history 100000
+    $ python -m benchmarks.commands --latency 0.05 -- --transport async
+
+Each run is a separate henry process with an empty cache directory, so times
+include startup and logging in. Arguments after -- are passed to henry.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+import tabulate
+
+from benchmarks import fake_looker
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COMMANDS = {
+    "analyze projects": ["analyze", "projects"],
+    "analyze models": ["analyze", "models"],
+    "analyze explores": ["analyze", "explores"],
+    "vacuum models": ["vacuum", "models"],
+    "vacuum explores": ["vacuum", "explores"],
+    "pulse": ["pulse"],
+}
+
+
+# Runs henry and then writes its peak memory use in bytes to stderr. The kernel's
+# ru_maxrss for a child process includes the memory of this process it was forked
+# from, so Linux's per-process high water mark is used when available.
+HENRY = """
+import resource, sys
+from henry import cli
+sys.argv[1:] = %r
+try:
+    cli.main()
+finally:
+    try:
+        with open("/proc/self/status") as f:
+            status = dict(line.split(":", 1) for line in f)
+        peak = int(status["VmHWM"].split()[0]) * 1024
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(peak, file=sys.stderr)
+"""
+
+
+def run(argv: List[str], cache_dir: str) -> Tuple[float, int, int]:
+    """Runs henry and returns its wall time, exit status and peak RSS in bytes."""
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-c", HENRY % argv],
+        cwd=ROOT,
+        env=dict(os.environ, XDG_CACHE_HOME=cache_dir),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    elapsed = time.perf_counter() - start
+    lines = proc.stderr.splitlines()
+    sys.stderr.write("".join(f"{line}\n" for line in lines[:-1]))
+    return elapsed, proc.returncode, int(lines[-1]) if lines else 0
+
+
+def measure(
+    looker: fake_looker.FakeLooker, argv: List[str], runs: int
+) -> Dict[str, object]:
+    timings = []
+    for _ in range(runs):
+        looker.reset()
+        with tempfile.TemporaryDirectory() as cache_dir:
+            elapsed, status, peak = run(argv, cache_dir)
+        if status:
+            raise RuntimeError(f"henry {' '.join(argv)} exited with {status}")
+        timings.append(elapsed)
+    return {
+        "Time (s)": min(timings),
+        "API Calls": sum(looker.calls.values()),
+        "Received (MB)": sum(looker.bytes_sent.values()) / 1e6,
+        "Peak RSS (MB)": peak / 1e6,
+    }
+
+
+def _format(value: object) -> str:
+    return f"{value:.2f}" if isinstance(value, float) else str(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0],
+        usage="python -m benchmarks.commands [options] [-- henry options]",
+    )
+    parser.add_argument("--explores", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--history", type=int, nargs="+", default=[10_000])
+    parser.add_argument("--models", type=int, default=5)
+    parser.add_argument("--fields", type=int, default=20, help="Fields per view")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds per call")
+    parser.add_argument("--runs", type=int, default=1, help="Best of this many runs")
+    parser.add_argument(
+        "--command", choices=list(COMMANDS), action="append", dest="commands"
+    )
+    parser.add_argument("--calls", action="store_true", help="Show calls per endpoint")
+    args, henry_args = parser.parse_known_args()
+    henry_args = [a for a in henry_args if a != "--"]
+
+    results = []
+    for explores in args.explores:
+        for history in args.history:
+            scale = fake_looker.Scale(
+                models=args.models,
+                explores=explores,
+                fields=args.fields,
+                history=history,
+            )
+            with fake_looker.FakeLooker(scale, latency=args.latency) as looker:
+                with tempfile.TemporaryDirectory() as tmp:
+                    config_file = os.path.join(tmp, "looker.ini")
+                    looker.write_config(config_file)
+                    for name in args.commands or COMMANDS:
+                        argv = COMMANDS[name] + ["--config-file", config_file]
+                        if name != "pulse":
+                            argv += henry_args
+                        row = {
+                            "Explores": explores,
+                            "History": history,
+                            "Command": name,
+                            **measure(looker, argv, args.runs),
+                        }
+                        results.append(row)
+                        print(
+                            ", ".join(f"{k}: {_format(v)}" for k, v in row.items()),
+                            flush=True,
+                        )
+                        if args.calls:
+                            for endpoint, count in sorted(looker.calls.items()):
+                                print(f"    {count:6d} {endpoint}")
+
+    print()
+    print(tabulate.tabulate(results, headers="keys", floatfmt=".2f", tablefmt="psql"))
+
+
+if __name__ == "__main__":
+    main()
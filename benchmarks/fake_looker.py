@@ -0,0 +1,490 @@
+"""A local stand-in for the Looker API serving synthetic metadata and history.
+
+Serves the endpoints henry uses with models, explores and i__looker history
+generated at a given scale, returning only the attributes asked for with the
+fields parameter. It sleeps for a given latency on every call and counts calls
+and bytes per endpoint, e.g.
+
+    with fake_looker.FakeLooker(fake_looker.Scale(explores=100)) as looker:
+        looker.write_config("looker.ini")
+        ...
+        print(looker.calls, looker.bytes_sent)
+"""
+import bisect
+import collections
+import json
+import random
+import re
+import threading
+import time
+from http import server
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+from urllib import parse
+
+API_PREFIX = "/api/4.0"
+SYSTEM_MODEL = "system__activity"
+# Measures of i__looker history and how rows are aggregated into them
+MEASURES: Dict[str, Callable[[List[tuple]], Any]] = {
+    "history.query_run_count": lambda rows: sum(r[5] for r in rows),
+    "query.count": len,
+    "history.average_runtime": lambda rows: sum(r[6] for r in rows) / len(rows),
+    "scheduled_job.count": len,
+}
+# Path segments that are not ids
+ENDPOINTS = {
+    "connections",
+    "current_workspace",
+    "explores",
+    "files",
+    "git_connection_tests",
+    "legacy_features",
+    "login",
+    "lookml_models",
+    "projects",
+    "queries",
+    "run",
+    "session",
+    "test",
+    "user",
+}
+# Columns of the synthetic history rows
+DIMENSIONS = {
+    "query.id": 0,
+    "query.model": 1,
+    "query.view": 2,
+    "query.formatted_fields": 3,
+    "query.formatted_filters": 4,
+    "history.connection_name": 7,
+    "dashboard.title": 8,
+    "scheduled_job.name": 8,
+}
+
+
+class Scale(NamedTuple):
+    """Size of the synthetic instance. Explores are spread evenly over the models
+    and only some of them, and some of their fields, appear in the history.
+    """
+
+    models: int = 5
+    explores: int = 100
+    joins: int = 3
+    fields: int = 20
+    history: int = 10_000
+    distinct_queries: int = 2_000
+    connections: int = 5
+    seed: int = 0
+
+
+class Instance:
+    """Synthetic metadata and history for a Scale."""
+
+    def __init__(self, scale: Scale):
+        rnd = random.Random(scale.seed)
+        self.scale = scale
+        self.models: Dict[str, List[str]] = {
+            f"model_{m}": [] for m in range(max(scale.models, 1))
+        }
+        names = list(self.models)
+        for e in range(scale.explores):
+            self.models[names[e % len(names)]].append(f"explore_{e}")
+        self.connections = [f"connection_{c}" for c in range(scale.connections)]
+        # Commit deployed to production for every project, changed to simulate a
+        # deploy
+        self.git_head = "abc123"
+        # Only two thirds of explores and half of their fields are ever queried
+        used = [
+            (m, e)
+            for m, explores in self.models.items()
+            for e in explores
+            if rnd.random() < 2 / 3
+        ]
+        queries = []
+        for _ in range(scale.distinct_queries if used else 0):
+            m, e = rnd.choice(used)
+            fields = rnd.sample(
+                [f for v in self.views(e) for f in self.fields(v)[: scale.fields // 2]],
+                k=min(rnd.randint(1, 6), len(self.views(e)) * (scale.fields // 2)),
+            )
+            filters = None
+            if fields and rnd.random() < 0.5:
+                filters = f"{rnd.choice(fields)}: -NULL"
+            queries.append((m, e, json.dumps(fields), filters))
+        self.history: List[tuple] = []
+        for i in range(scale.history if queries else 0):
+            m, e, fields, filters = rnd.choice(queries)
+            if rnd.random() < 0.05:
+                m = SYSTEM_MODEL
+            self.history.append(
+                (
+                    i + 1,
+                    m,
+                    e,
+                    fields,
+                    filters,
+                    rnd.randint(1, 20),
+                    rnd.random() * 60,
+                    rnd.choice(self.connections) if self.connections else None,
+                    f"Dashboard {rnd.randrange(50)}",
+                )
+            )
+        self.ids = [r[0] for r in self.history]
+
+    def views(self, explore: str) -> List[str]:
+        return [explore] + [f"{explore}_join_{j}" for j in range(self.scale.joins)]
+
+    def fields(self, view: str) -> List[str]:
+        return [f"{view}.field_{f}" for f in range(self.scale.fields)]
+
+    def model(self, name: str) -> Dict[str, Any]:
+        return {
+            "name": name,
+            "label": name.title(),
+            "project_name": f"project_{name}",
+            "has_content": True,
+            "allowed_db_connection_names": self.connections,
+            "unlimited_db_connections": False,
+            "explores": [
+                {"name": e, "label": e.title(), "hidden": False, "group_label": name}
+                for e in self.models[name]
+            ],
+        }
+
+    def explore(self, model: str, name: str) -> Dict[str, Any]:
+        views = self.views(name)
+        fields = {
+            kind: [
+                self.field(kind, view, f, i)
+                for view in views
+                for i, f in enumerate(self.fields(view))
+                if (i % 2 == 0) == (kind == "dimensions")
+            ]
+            for kind in ("dimensions", "measures")
+        }
+        return {
+            "id": f"{model}::{name}",
+            "name": name,
+            "model_name": model,
+            "label": name.title(),
+            "description": f"Synthetic explore {name}",
+            "hidden": False,
+            "scopes": views,
+            "connection_name": self.connections[0] if self.connections else None,
+            "sql_table_name": f"schema.{name}",
+            "source_file": f"{model}.model.lkml",
+            "fields": dict(fields, filters=[], parameters=[]),
+            "joins": [{"name": v, "dependent_fields": []} for v in views[1:]],
+        }
+
+    def field(self, kind: str, view: str, name: str, i: int) -> Dict[str, Any]:
+        return {
+            "name": name,
+            "label": name.replace("_", " ").title(),
+            "label_short": name.split(".")[1],
+            "category": kind[:-1],
+            "type": "string" if kind == "dimensions" else "count",
+            "description": f"Synthetic {kind[:-1]} {i} of {view}",
+            "hidden": i % 7 == 6,
+            "view": view,
+            "view_label": view.title(),
+            "sql": "${TABLE}." + name.split(".")[1],
+            "source_file": f"views/{view}.view.lkml",
+            "lookml_link": f"/projects/p/files/views%2F{view}.view.lkml?line={i}",
+            "suggestable": kind == "dimensions",
+            "tags": [],
+            "links": [],
+        }
+
+    def run_query(self, query: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Returns history rows for a WriteQuery, grouped by its dimensions."""
+        fields = [f.strip() for f in ",".join(query.get("fields") or []).split(",")]
+        filters = query.get("filters") or {}
+        limit = int(query.get("limit") or 5000)
+        keep_model = _matcher(filters.get("query.model"))
+        keep_view = _matcher(filters.get("query.view"))
+        start = 0
+        min_id = filters.get("query.id", "")
+        if min_id.startswith(">"):
+            start = bisect.bisect_right(self.ids, int(min_id[1:]))
+        dimensions = [f for f in fields if f not in MEASURES]
+        groups: Dict[tuple, List[tuple]] = collections.OrderedDict()
+        columns = [DIMENSIONS.get(f) for f in dimensions]
+        for i in range(start, len(self.history)):
+            row = self.history[i]
+            if keep_model(row[1]) and keep_view(row[2]):
+                key = tuple(None if c is None else row[c] for c in columns)
+                groups.setdefault(key, []).append(row)
+                # Rows are unique per query.id, so pages can stop early
+                if "query.id" in dimensions and len(groups) == limit:
+                    break
+        results = [
+            {
+                f: (MEASURES[f](rows) if f in MEASURES else key[dimensions.index(f)])
+                for f in fields
+            }
+            for key, rows in groups.items()
+        ]
+        for sort in reversed(query.get("sorts") or []):
+            field, _, direction = sort.partition(" ")
+            if field in fields:
+                results.sort(key=lambda r: r[field] or 0, reverse=direction == "desc")
+        return results[:limit]
+
+
+def _matcher(expression: Optional[str]) -> Callable[[str], bool]:
+    """Returns a predicate for a Looker string filter such as "a, b" or "-a, -b"."""
+    terms = [t.strip().replace("^_", "_") for t in (expression or "").split(",")]
+    terms = [t for t in terms if t and t != "-NULL"]
+    include = {t for t in terms if not t.startswith("-")}
+    exclude = {t[1:] for t in terms if t.startswith("-")}
+    return lambda value: (not include or value in include) and value not in exclude
+
+
+class FakeLooker:
+    """Serves an Instance over HTTP on a local port, in a background thread.
+
+    Every call waits latency seconds before being answered. calls and bytes_sent
+    count the calls and response bytes per endpoint, e.g. "GET /lookml_models/:id",
+    and fields keeps the last fields parameter passed to each.
+    """
+
+    def __init__(self, scale: Optional[Scale] = None, latency: float = 0.0):
+        self.instance = Instance(scale or Scale())
+        self.latency = latency
+        self.calls: collections.Counter = collections.Counter()
+        self.bytes_sent: collections.Counter = collections.Counter()
+        self.fields: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._server = server.ThreadingHTTPServer(("127.0.0.1", 0), _handler(self))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def __enter__(self) -> "FakeLooker":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def write_config(self, path: str, section: str = "Looker"):
+        """Writes a looker.ini file pointing at this server."""
+        with open(path, "w") as f:
+            f.write(
+                f"[{section}]\nbase_url={self.base_url}\nclient_id=id\n"
+                "client_secret=secret\nverify_ssl=False\ntimeout=120\n"
+            )
+
+    def reset(self):
+        self.calls.clear()
+        self.bytes_sent.clear()
+        self.fields.clear()
+
+    def handle(self, method: str, path: str, body: Any) -> Tuple[int, Any]:
+        """Returns the status and JSON response for a call, answered by the route
+        of its first path segment.
+        """
+        parts = path.strip("/").split("/")
+        routes: Dict[str, Callable[[str, List[str], Any], Optional[Any]]] = {
+            "login": self._login,
+            "session": self._session,
+            "queries": self._queries,
+            "user": self._user,
+            "lookml_models": self._lookml_models,
+            "projects": self._projects,
+            "connections": self._connections,
+            "legacy_features": self._legacy_features,
+        }
+        route = routes.get(parts[0])
+        data = route(method, parts, body) if route else None
+        if data is None:
+            return 404, {"message": "Not found", "documentation_url": ""}
+        return 200, data
+
+    def _login(self, method: str, parts: List[str], body: Any) -> Optional[Any]:
+        if method == "POST" and len(parts) == 1:
+            return {"access_token": "token", "token_type": "Bearer", "expires_in": 3600}
+        return None
+
+    def _session(self, method: str, parts: List[str], body: Any) -> Optional[Any]:
+        if method == "PATCH" and len(parts) == 1:
+            return {"workspace_id": body.get("workspace_id")}
+        return None
+
+    def _queries(self, method: str, parts: List[str], body: Any) -> Optional[Any]:
+        if method == "POST" and parts[1:2] == ["run"]:
+            return self.instance.run_query(body)
+        return None
+
+    def _user(self, method: str, parts: List[str], body: Any) -> Optional[Any]:
+        if len(parts) == 1:
+            return {"id": "1", "display_name": "Henry"}
+        return None
+
+    def _lookml_models(self, method: str, parts: List[str], body: Any) -> Optional[Any]:
+        instance = self.instance
+        if len(parts) == 1:
+            return [instance.model(m) for m in instance.models]
+        if parts[1] not in instance.models:
+            return None
+        if len(parts) == 2:
+            return instance.model(parts[1])
+        if parts[3:4] and parts[3] in instance.models[parts[1]]:
+            return instance.explore(parts[1], parts[3])
+        return None
+
+    def _projects(self, method: str, parts: List[str], body: Any) -> Optional[Any]:
+        instance = self.instance
+        projects = [f"project_{m}" for m in instance.models]
+        if len(parts) == 1:
+            return [_project(p) for p in projects]
+        if parts[1] not in projects:
+            return None
+        if len(parts) == 2:
+            return _project(parts[1])
+        if parts[2] == "files":
+            return _project_files(instance, parts[1][len("project_") :])
+        if parts[2] == "current_workspace":
+            return {"project_id": parts[1], "git_head": instance.git_head}
+        if parts[2:] == ["git_connection_tests"]:
+            return [{"id": "git_host_check"}, {"id": "git_auth"}]
+        if parts[2] == "git_connection_tests":
+            return {"id": parts[3], "status": "pass", "message": "OK"}
+        return None
+
+    def _connections(self, method: str, parts: List[str], body: Any) -> Optional[Any]:
+        if len(parts) == 1:
+            dialect = {"name": "postgres", "connection_tests": ["connect", "query"]}
+            return [{"name": c, "dialect": dialect} for c in self.instance.connections]
+        if parts[-1] == "test":
+            return [
+                {"name": t, "status": "success", "message": "OK"}
+                for t in ("connect", "query")
+            ]
+        return None
+
+    def _legacy_features(
+        self, method: str, parts: List[str], body: Any
+    ) -> Optional[Any]:
+        if len(parts) == 1:
+            return [
+                {"id": str(i), "name": f"Legacy feature {i}", "enabled": i % 3 == 0}
+                for i in range(10)
+            ]
+        return None
+
+
+def _project(name: str) -> Dict[str, Any]:
+    return {
+        "id": name,
+        "name": name,
+        "uses_git": True,
+        "git_remote_url": f"git@github.com:example/{name}.git",
+        "pull_request_mode": "off",
+        "validation_required": False,
+    }
+
+
+def _project_files(instance: Instance, model: str) -> List[Dict[str, Any]]:
+    views = [v for e in instance.models.get(model, []) for v in instance.views(e)]
+    files = [(f"{model}.model.lkml", "model")]
+    files += [(f"{v}.view.lkml", "view") for v in views]
+    return [{"id": path, "path": path, "type": kind} for path, kind in files]
+
+
+def _endpoint(method: str, path: str) -> str:
+    """Returns the call with ids replaced, e.g. "GET /lookml_models/:id"."""
+    parts = path.strip("/").split("/")
+    return f"{method} /" + "/".join(p if p in ENDPOINTS else ":id" for p in parts)
+
+
+def _parse_fields(fields: str) -> Dict[str, Any]:
+    """Parses a fields parameter, e.g. "name,fields(dimensions(name))", into a
+    tree of {attribute: subtree, or None for the whole attribute}.
+    """
+
+    def parse(i: int) -> Tuple[Dict[str, Any], int]:
+        tree: Dict[str, Any] = {}
+        name = ""
+        while i < len(fields) and fields[i] != ")":
+            if fields[i] == "(":
+                tree[name.strip()], i = parse(i + 1)
+                name = ""
+            elif fields[i] == ",":
+                if name.strip():
+                    tree[name.strip()] = None
+                name = ""
+            else:
+                name += fields[i]
+            i += 1
+        if name.strip():
+            tree[name.strip()] = None
+        return tree, i
+
+    return parse(0)[0]
+
+
+def _select(data: Any, tree: Dict[str, Any]) -> Any:
+    """Returns only the attributes of data in a parsed fields parameter."""
+    if isinstance(data, list):
+        return [_select(d, tree) for d in data]
+    if not isinstance(data, dict):
+        return data
+    return {
+        name: data[name] if subtree is None else _select(data[name], subtree)
+        for name, subtree in tree.items()
+        if name in data
+    }
+
+
+def _handler(looker: FakeLooker):
+    class Handler(server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _respond(self, method: str):
+            url = parse.urlsplit(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            try:
+                body = json.loads(raw) if raw else {}
+            except ValueError:
+                body = dict(parse.parse_qsl(raw.decode()))
+            path = re.sub(f"^{API_PREFIX}", "", url.path)
+            if looker.latency:
+                time.sleep(looker.latency)
+            status, data = looker.handle(method, path, body)
+            fields = parse.parse_qs(url.query).get("fields")
+            if fields and status == 200:
+                data = _select(data, _parse_fields(fields[0]))
+            payload = json.dumps(data).encode("utf-8")
+            endpoint = _endpoint(method, path)
+            with looker._lock:
+                looker.calls[endpoint] += 1
+                looker.bytes_sent[endpoint] += len(payload)
+                if fields:
+                    looker.fields[endpoint] = fields[0]
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            self._respond("GET")
+
+        def do_POST(self):
+            self._respond("POST")
+
+        def do_PATCH(self):
+            self._respond("PATCH")
+
+        def do_PUT(self):
+            self._respond("PUT")
+
+    return Handler
@@ -0,0 +1,105 @@
+"""Micro-benchmark for parsing and aggregating field usage from query history.
+
+Compares henry.modules.field_usage against the previous per-row parser on a
+synthetic i__looker history payload:
+
+    $ python -m benchmarks.field_usage --rows 1000000 --distinct 50000
+
+--distinct controls how many different formatted_fields/formatted_filters pairs
+the rows are drawn from; use --distinct equal to --rows for the worst case where
+every row parses a new pair.
+"""
+import argparse
+import json
+import random
+import re
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from henry.modules import field_usage
+
+
+def make_history(rows: int, distinct: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Returns history rows shaped like the field usage query results."""
+    rnd = random.Random(seed)
+    views = [f"view_{i}" for i in range(40)]
+    queries = []
+    for _ in range(distinct):
+        fields = [
+            f"{rnd.choice(views)}.field_{rnd.randrange(60)}"
+            for _ in range(rnd.randint(2, 12))
+        ]
+        filters = None
+        if rnd.random() < 0.6:
+            filter_fields = rnd.sample(fields, 1) + [
+                f"{rnd.choice(views)}.field_{rnd.randrange(60)}"
+                for _ in range(rnd.randint(0, 3))
+            ]
+            filters = ", ".join(f"{f}: -NULL" for f in filter_fields)
+        queries.append((json.dumps(fields), filters))
+    history = []
+    for _ in range(rows):
+        formatted_fields, formatted_filters = rnd.choice(queries)
+        history.append(
+            {
+                "query.model": f"model_{rnd.randrange(5)}",
+                "query.view": f"explore_{rnd.randrange(30)}",
+                "query.formatted_fields": formatted_fields,
+                "query.formatted_filters": formatted_filters,
+                "history.query_run_count": rnd.randint(1, 50),
+            }
+        )
+    return history
+
+
+def baseline(rows: List[Dict[str, Any]]) -> Dict[Tuple[str, str], Dict[str, int]]:
+    """The parser field_usage replaced, kept for comparison."""
+    result: Dict[Tuple[str, str], Dict[str, int]] = {}
+    for row in rows:
+        used_fields = result.setdefault(
+            (str(row["query.model"]), str(row["query.view"])), {}
+        )
+        fields = re.findall(r"(\w+\.\w+)", row["query.formatted_fields"])
+        recorded = []
+        for f in fields:
+            if used_fields.get(f):
+                used_fields[f] += row["history.query_run_count"]
+            else:
+                used_fields[f] = row["history.query_run_count"]
+            recorded.append(f)
+        filters = row["query.formatted_filters"]
+        if filters:
+            for f in re.findall(r"(\w+\.\w+)+", filters):
+                if f in recorded:
+                    continue
+                elif used_fields.get(f):
+                    used_fields[f] += row["history.query_run_count"]
+                else:
+                    used_fields[f] = row["history.query_run_count"]
+    return result
+
+
+def measure(name: str, fn: Callable, rows: List[Dict[str, Any]]) -> Any:
+    start = time.perf_counter()
+    result = fn(rows)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<10} {elapsed:8.2f}s {len(rows) / elapsed:14,.0f} rows/s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--distinct", type=int, default=50_000)
+    args = parser.parse_args()
+
+    rows = make_history(args.rows, min(args.distinct, args.rows))
+    print(f"{args.rows:,} rows, {args.distinct:,} distinct field/filter pairs")
+    expected = measure("baseline", baseline, rows)
+    field_usage.parse_fields.cache_clear()
+    result = measure("henry", field_usage.count_fields_by_explore, rows)
+    assert result == expected, "field usage differs from the baseline"
+
+
+if __name__ == "__main__":
+    main()
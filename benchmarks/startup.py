@@ -0,0 +1,66 @@
+"""Benchmark for henry's startup time.
+
+Measures the wall time of `henry --help` and of parsing a command's arguments,
+and lists the slowest imports reported by `python -X importtime`:
+
+    $ python -m benchmarks.startup --runs 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = {
+    "henry --help": ["--help"],
+    "henry vacuum explores --bad": ["vacuum", "explores", "--bad"],
+}
+
+
+def run(argv: List[str], *flags: str) -> subprocess.CompletedProcess:
+    code = "import sys; from henry import cli; sys.argv[1:] = %r; cli.main()" % argv
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code],
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+
+
+def slowest_imports(argv: List[str], count: int) -> List[Tuple[int, str]]:
+    """Returns the imports with the highest cumulative time in microseconds."""
+    imports = []
+    for line in run(argv, "-X", "importtime").stderr.splitlines():
+        if line.startswith("import time:") and "cumulative" not in line:
+            _, cumulative, name = line[len("import time:") :].split("|")
+            imports.append((int(cumulative), name.rstrip()))
+    return sorted(imports, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--imports", type=int, default=5)
+    args = parser.parse_args()
+
+    for name, argv in CASES.items():
+        timings = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            run(argv)
+            timings.append(time.perf_counter() - start)
+        print(
+            f"{name:<30} median {statistics.median(timings) * 1000:6.0f}ms"
+            f"  min {min(timings) * 1000:6.0f}ms"
+        )
+        for cumulative, module in slowest_imports(argv, args.imports):
+            print(f"    {cumulative / 1000:8.1f}ms {module}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,48 @@
 #!/usr/bin/env
 import argparse
+import configparser
 import os
 import sys
+from typing import List
 
 import henry
-from henry.commands import analyze, pulse, vacuum
-from henry.modules import fetcher
+from henry.modules import writers
+
+# Commands, and with them the Looker SDK, are only imported once arguments have
+# been parsed so that --help and usage errors return quickly.
 
 
 def main():
     parser = setup_cli()
     user_input = parse_input(parser)
+    from henry.modules import snapshot, tracing
+
+    try:
+        with tracing.trace(user_input.profile, user_input.trace_file), snapshot.use(
+            record=user_input.record, replay=user_input.replay
+        ):
+            if user_input.command == "pulse":
+                from henry.commands import pulse
+
+                pulse.Pulse.run(user_input)
+            elif user_input.command == "analyze":
+                from henry.commands import analyze
+
+                analyze.Analyze.run(user_input)
+            elif user_input.command == "vacuum":
+                from henry.commands import vacuum
+
+                vacuum.Vacuum.run(user_input)
+            elif user_input.command == "serve":
+                from henry.commands import serve
 
-    if user_input.command == "pulse":
-        pulse.Pulse.run(user_input)
-    elif user_input.command == "analyze":
-        analyze.Analyze.run(user_input)
-    elif user_input.command == "vacuum":
-        vacuum.Vacuum.run(user_input)
-    else:
-        parser.error()
+                serve.run(user_input)
+            else:
+                parser.error()
+    except snapshot.SnapshotError as e:
+        # e.g. a replayed call that wasn't recorded
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
 
 
 def setup_cli():
@@ -29,12 +52,7 @@ def setup_cli():
 
 
 def create_parser():
-    help_file = os.path.join(os.path.dirname(henry.__file__), ".support_files/help.rtf")
-    with open(help_file, "r", encoding="unicode_escape") as myfile:
-        description = myfile.read()
-
     parser = argparse.ArgumentParser(
-        description=description,
         formatter_class=argparse.RawDescriptionHelpFormatter,
         prog="henry",
         usage="henry command subcommand "
@@ -44,16 +62,41 @@ def create_parser():
         add_help=False,
     )
 
-    parser.add_argument("-h", "--help", action="help", help=argparse.SUPPRESS)
+    parser.add_argument("-h", "--help", action=HelpAction, help=argparse.SUPPRESS)
 
     return parser
 
 
+class HelpAction(argparse.Action):
+    """Prints help with the description from help.rtf, which is only read when
+    help is asked for.
+    """
+
+    def __init__(self, option_strings, dest=argparse.SUPPRESS, help=None):
+        super().__init__(
+            option_strings=option_strings,
+            dest=dest,
+            default=argparse.SUPPRESS,
+            nargs=0,
+            help=help,
+        )
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        help_file = os.path.join(
+            os.path.dirname(henry.__file__), ".support_files/help.rtf"
+        )
+        with open(help_file, "r", encoding="unicode_escape") as myfile:
+            parser.description = myfile.read()
+        parser.print_help()
+        parser.exit()
+
+
 def setup_subparsers(parser):
     subparsers = parser.add_subparsers(dest="command", help=argparse.SUPPRESS)
     setup_pulse_subparser(subparsers)
     setup_analyze_subparser(subparsers)
     setup_vacuum_subparser(subparsers)
+    setup_serve_subparser(subparsers)
 
 
 def setup_pulse_subparser(subparsers):
@@ -63,13 +106,27 @@ def setup_pulse_subparser(subparsers):
     pulse_parser.add_argument(
         "--timeout", type=int, default=120, help=argparse.SUPPRESS
     )
+    pulse_parser.add_argument(
+        "--retries", type=int, default=3, help=argparse.SUPPRESS
+    )
+    pulse_parser.add_argument(
+        "--backoff", type=float, default=0.5, help=argparse.SUPPRESS
+    )
+    pulse_parser.add_argument(
+        "--connection-timeout", type=int, default=60, help=argparse.SUPPRESS
+    )
+    pulse_parser.add_argument(
+        "--concurrency", type=int, default=10, help=argparse.SUPPRESS
+    )
+    add_profiling_arguments(pulse_parser)
     pulse_parser.add_argument_group("Authentication")
     pulse_parser.add_argument(
-        "--config-file", type=str, default="looker.ini", help=argparse.SUPPRESS
+        "--token-cache", action="store_true", default=False, help=argparse.SUPPRESS
     )
     pulse_parser.add_argument(
-        "--section", type=str, default="Looker", help=argparse.SUPPRESS
+        "--config-file", type=str, default="looker.ini", help=argparse.SUPPRESS
     )
+    add_section_arguments(pulse_parser)
 
 
 def setup_analyze_subparser(subparsers):
@@ -86,9 +143,10 @@ def setup_analyze_subparser(subparsers):
     analyze_projects.add_argument(
         "--order-by",
         nargs=2,
+        action="append",
         metavar=("ORDER_FIELD", "ASC/DESC"),
         dest="sortkey",
-        help="Sort results by a field",
+        help="Sort results by a field, can be repeated",
     )
     analyze_projects.add_argument(
         "--limit",
@@ -117,9 +175,10 @@ def setup_analyze_subparser(subparsers):
     analyze_models.add_argument(
         "--order-by",
         nargs=2,
+        action="append",
         metavar=("ORDER_FIELD", "ASC/DESC"),
         dest="sortkey",
-        help="Sort results by a field",
+        help="Sort results by a field, can be repeated",
     )
     analyze_models.add_argument(
         "--limit",
@@ -151,9 +210,10 @@ def setup_analyze_subparser(subparsers):
     analyze_explores.add_argument(
         "--order-by",
         nargs=2,
+        action="append",
         metavar=("ORDER_FIELD", "ASC/DESC"),
         dest="sortkey",
-        help="Sort results by a field",
+        help="Sort results by a field, can be repeated",
     )
     analyze_explores.add_argument(
         "--limit",
@@ -221,24 +281,175 @@ def setup_vacuum_subparser(subparsers):
     add_common_arguments(vacuum_explores)
 
 
+def setup_serve_subparser(subparsers):
+    serve_parser = subparsers.add_parser(
+        "serve", help="serve help", usage="henry serve [serve options]"
+    )
+    serve_parser.add_argument(
+        "--host", type=str, default="127.0.0.1", help=argparse.SUPPRESS
+    )
+    serve_parser.add_argument("--port", type=int, default=8765, help=argparse.SUPPRESS)
+    serve_parser.add_argument(
+        "--socket", dest="socket_path", type=str, default=None, help=argparse.SUPPRESS
+    )
+    serve_parser.add_argument(
+        "--refresh-interval", type=int, default=600, help=argparse.SUPPRESS
+    )
+    serve_parser.add_argument(
+        "--timeout", type=int, default=120, help=argparse.SUPPRESS
+    )
+    serve_parser.add_argument(
+        "--concurrency", type=int, default=10, help=argparse.SUPPRESS
+    )
+    serve_parser.add_argument(
+        "--no-cache", dest="cache", action="store_false", help=argparse.SUPPRESS
+    )
+    serve_parser.add_argument(
+        "--cache-ttl", type=int, default=3600, help=argparse.SUPPRESS
+    )
+    serve_parser.add_argument(
+        "--incremental", action="store_true", default=False, help=argparse.SUPPRESS
+    )
+    serve_parser.add_argument(
+        "--retries", type=int, default=3, help=argparse.SUPPRESS
+    )
+    serve_parser.add_argument(
+        "--backoff", type=float, default=0.5, help=argparse.SUPPRESS
+    )
+    serve_parser.add_argument(
+        "--transport",
+        choices=["sync", "async"],
+        default="sync",
+        help=argparse.SUPPRESS,
+    )
+    serve_parser.add_argument(
+        "--connection-timeout", type=int, default=60, help=argparse.SUPPRESS
+    )
+    serve_parser.add_argument_group("Authentication")
+    serve_parser.add_argument(
+        "--token-cache", action="store_true", default=False, help=argparse.SUPPRESS
+    )
+    serve_parser.add_argument(
+        "--config-file", type=str, default="looker.ini", help=argparse.SUPPRESS
+    )
+    add_section_arguments(serve_parser)
+
+
 def add_common_arguments(parser: argparse.ArgumentParser):
     parser.add_argument(
         "--save", action="store_true", default=False, help="Save output to CSV.",
     )
+    parser.add_argument(
+        "--format",
+        dest="output_format",
+        choices=writers.FORMATS,
+        default="csv",
+        help=argparse.SUPPRESS,
+    )
+    parser.add_argument(
+        "--output", dest="output_path", type=str, default=None, help=argparse.SUPPRESS
+    )
+    parser.add_argument(
+        "--progressive", action="store_true", default=False, help=argparse.SUPPRESS
+    )
     parser.add_argument("-q", "--quiet", action="store_true", help="Silence output")
+    add_profiling_arguments(parser)
     parser.add_argument("--timeout", type=int, default=120,
                         help=argparse.SUPPRESS)
+    parser.add_argument(
+        "--concurrency", type=int, default=10, help=argparse.SUPPRESS
+    )
+    parser.add_argument(
+        "--no-cache", dest="cache", action="store_false", help=argparse.SUPPRESS
+    )
+    parser.add_argument(
+        "--refresh-cache", action="store_true", default=False, help=argparse.SUPPRESS
+    )
+    parser.add_argument(
+        "--cache-ttl", type=int, default=3600, help=argparse.SUPPRESS
+    )
+    parser.add_argument(
+        "--incremental", action="store_true", default=False, help=argparse.SUPPRESS
+    )
+    parser.add_argument(
+        "--retries", type=int, default=3, help=argparse.SUPPRESS
+    )
+    parser.add_argument(
+        "--backoff", type=float, default=0.5, help=argparse.SUPPRESS
+    )
+    parser.add_argument(
+        "--transport",
+        choices=["sync", "async"],
+        default="sync",
+        help=argparse.SUPPRESS,
+    )
     parser.add_argument_group("Authentication")
+    parser.add_argument(
+        "--token-cache", action="store_true", default=False, help=argparse.SUPPRESS
+    )
     parser.add_argument(
         "--config-file", type=str, default="looker.ini", help=argparse.SUPPRESS
     )
-    parser.add_argument("--section", type=str, default="Looker", help=argparse.SUPPRESS)
+    add_section_arguments(parser)
+
+
+def add_section_arguments(parser: argparse.ArgumentParser):
+    """Adds arguments selecting the looker.ini sections, i.e. instances, to run
+    against.
+    """
+    sections = parser.add_mutually_exclusive_group()
+    sections.add_argument(
+        "--section", nargs="+", default=["Looker"], help=argparse.SUPPRESS
+    )
+    sections.add_argument(
+        "--all-sections", action="store_true", default=False, help=argparse.SUPPRESS
+    )
+
+
+def add_profiling_arguments(parser: argparse.ArgumentParser):
+    """Adds arguments to profile, record and replay API calls."""
+    parser.add_argument(
+        "--profile", action="store_true", default=False, help=argparse.SUPPRESS
+    )
+    parser.add_argument(
+        "--trace-file", type=str, default=None, help=argparse.SUPPRESS
+    )
+    snapshots = parser.add_mutually_exclusive_group()
+    snapshots.add_argument("--record", type=str, default=None, help=argparse.SUPPRESS)
+    snapshots.add_argument("--replay", type=str, default=None, help=argparse.SUPPRESS)
 
 
 def parse_input(parser: argparse.ArgumentParser):
     args = vars(parser.parse_args())
+    if "section" not in args:
+        # Only the parsers of (sub)commands take a section, e.g. not for henry
+        # or henry analyze on their own
+        parser.error("A command is required.")
+    sections = args.pop("section")
+    if args.pop("all_sections"):
+        sections = _config_sections(parser, args["config_file"])
+    # Duplicate sections would run the same instance twice
+    sections = list(dict.fromkeys(sections))
+    if len(sections) > 1 and (args.get("record") or args.get("replay")):
+        parser.error("--record and --replay only work with a single section.")
+    if len(sections) > 1 and args["command"] == "serve":
+        parser.error("serve only works with a single section.")
+    args["section"] = sections[0]
+    args["sections"] = sections
+    from henry.modules import fetcher
+
     return fetcher.Input(**args)
 
 
+def _config_sections(parser: argparse.ArgumentParser, config_file: str) -> List[str]:
+    """Returns the sections of config_file, exiting if it has none."""
+    config = configparser.ConfigParser()
+    if not config.read(config_file):
+        parser.error(f"Could not read config file {config_file}.")
+    if not config.sections():
+        parser.error(f"No sections found in {config_file}.")
+    return config.sections()
+
+
 if __name__ == "__main__":
     main()
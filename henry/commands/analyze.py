@@ -1,4 +1,4 @@
-from typing import cast, Optional, List, Any
+from typing import cast, Dict, Iterator, Optional
 
 from looker_sdk.sdk.api40 import models
 from henry.modules import spinner
@@ -6,100 +6,121 @@ from henry.modules import fetcher
 
 
 class Analyze(fetcher.Fetcher):
-    @classmethod
-    def run(cls, user_input: fetcher.Input):
-        analyze = cls(user_input)
+    def results(self, user_input: fetcher.Input) -> Iterator[fetcher.TRow]:
         if user_input.subcommand == "projects":
-            result = analyze.projects(id=user_input.project)
+            return self.iter_projects(id=user_input.project)
         elif user_input.subcommand == "models":
-            result = analyze.models(project=user_input.project, model=user_input.model)
+            return self.iter_models(project=user_input.project, model=user_input.model)
         elif user_input.subcommand == "explores":
-            result = analyze.explores(
+            return self.iter_explores(
                 model=user_input.model, explore=user_input.explore
             )
         else:
           raise ValueError(
               "Please specify one of 'projects', 'models' or 'explores'")
-        analyze.output(data=cast(fetcher.TResult, result))
 
     @spinner.Spinner()
     def projects(self, *, id: Optional[str] = None) -> fetcher.TResult:
         """Analyzes all projects or a specific project."""
+        return list(self.iter_projects(id=id))
+
+    def iter_projects(self, *, id: Optional[str] = None) -> Iterator[fetcher.TRow]:
+        """Yields the rows of projects() as they are generated."""
         projects = self.get_projects(project_id=id)
-        result: List[Any] = []
-        for p in projects:
+        # Files are listed in production, then git is tested for every project in
+        # a single switch to the dev workspace since the session is shared.
+        project_files = self._map_concurrently(
+            lambda p: self.sdk.all_project_files(
+                cast(str, p.name), fields=fetcher.PROJECT_FILE_FIELDS
+            ),
+            projects,
+        )
+        tested = [
+            p for p in projects if "/bare_models/" not in cast(str, p.git_remote_url)
+        ]
+        git_connection_test_results: Dict[str, str] = {}
+        if tested:
+            with self.dev_workspace():
+                statuses = self._map_concurrently(
+                    lambda p: self._run_git_connection_tests(cast(str, p.id)), tested
+                )
+            git_connection_test_results = {
+                cast(str, p.id): status for p, status in zip(tested, statuses)
+            }
+
+        for p, p_files in zip(projects, project_files):
+            assert isinstance(p.id, str)
             assert isinstance(p.name, str)
             assert isinstance(p.pull_request_mode, models.PullRequestMode)
             assert isinstance(p.validation_required, bool)
-            p_files = self.sdk.all_project_files(p.name)
-
-            if "/bare_models/" in cast(str, p.git_remote_url):
-                git_connection_test_results = "Bare repo, no tests required"
-            else:
-                git_connection_test_results = self.run_git_connection_tests(
-                    cast(str, p.id)
-                )
-
-            result.append(
-                {
-                    "Project": p.name,
-                    "# Models": sum(map(lambda p: p.type == "model", p_files)),
-                    "# View Files": sum(map(lambda p: p.type == "view", p_files)),
-                    "Git Connection Status": git_connection_test_results,
-                    "PR Mode": p.pull_request_mode.value,
-                    "Is Validation Required": p.validation_required,
-                }
-            )
-        return result
+            yield {
+                "Project": p.name,
+                "# Models": sum(map(lambda p: p.type == "model", p_files)),
+                "# View Files": sum(map(lambda p: p.type == "view", p_files)),
+                "Git Connection Status": git_connection_test_results.get(
+                    p.id, "Bare repo, no tests required"
+                ),
+                "PR Mode": p.pull_request_mode.value,
+                "Is Validation Required": p.validation_required,
+            }
 
     @spinner.Spinner()
     def models(
         self, *, project: Optional[str] = None, model: Optional[str] = None
     ) -> fetcher.TResult:
         """Analyze models, can optionally filter by project or model."""
+        return list(self.iter_models(project=project, model=model))
+
+    def iter_models(
+        self, *, project: Optional[str] = None, model: Optional[str] = None
+    ) -> Iterator[fetcher.TRow]:
+        """Yields the rows of models() as they are generated."""
         all_models = self.get_models(project=project, model=model)
-        result: fetcher.TResult = []
+        usage = self.get_used_explores_by_model()
         for m in all_models:
             assert isinstance(m.name, str)
             assert isinstance(m.project_name, str)
             assert isinstance(m.explores, list)
-            result.append(
-                {
-                    "Project": m.project_name,
-                    "Model": m.name,
-                    "# Explores": len(m.explores),
-                    "# Unused Explores": len(self.get_unused_explores(model=m.name)),
-                    "Query Count": self.get_used_models().get(m.name) or 0,
-                }
+            used_explores = usage.get(m.name, {})
+            # Keep only explores that satisfy the min_query requirement
+            used = self._filter(
+                data=used_explores, condition=lambda x: x[1] >= self.min_queries
             )
-        return result
+            unused_explores = [e.name for e in m.explores if e.name not in used]
+            yield {
+                "Project": m.project_name,
+                "Model": m.name,
+                "# Explores": len(m.explores),
+                "# Unused Explores": len(unused_explores),
+                "Query Count": sum(used_explores.values()),
+            }
 
     @spinner.Spinner()
     def explores(
         self, *, model: Optional[str] = None, explore: Optional[str] = None
     ) -> fetcher.TResult:
         """Analyze explores."""
-        all_explores = self.get_explores(model=model, explore=explore)
-        result: fetcher.TResult = []
+        return list(self.iter_explores(model=model, explore=explore))
+
+    def iter_explores(
+        self, *, model: Optional[str] = None, explore: Optional[str] = None
+    ) -> Iterator[fetcher.TRow]:
+        """Yields the rows of explores() as they are generated."""
+        all_explores = self.iter_lookml_explores(model=model, explore=explore)
+        explore_usage = self.get_used_explores_by_model(model=model)
+        # Field usage of all explores is fetched at once unless filtering on one
+        field_usage = None if explore else self.get_used_fields_by_explore(model=model)
         for e in all_explores:
-            assert isinstance(e.name, str)
-            assert isinstance(e.model_name, str)
-            assert isinstance(e.hidden, bool)
-            field_stats = self.get_explore_field_stats(e)
+            field_stats = self.get_explore_field_stats(e, field_usage=field_usage)
             join_stats = self.get_explore_join_stats(explore=e, field_stats=field_stats)
-            result.append(
-                {
-                    "Model": e.model_name,
-                    "Explore": e.name,
-                    "Is Hidden": e.hidden,
-                    "Has Description": True if e.description else False,
-                    "# Joins": len(join_stats),
-                    "# Unused Joins": len(self._filter(join_stats)),
-                    "# Fields": len(field_stats),
-                    "# Unused Fields": len(self._filter(field_stats)),
-                    "Query Count": self.get_used_explores(
-                        model=e.model_name, explore=e.name
-                    ).get(e.name, 0),
-                }
-            )
-        return result
+            yield {
+                "Model": e.model_name,
+                "Explore": e.name,
+                "Is Hidden": e.hidden,
+                "Has Description": True if e.description else False,
+                "# Joins": len(join_stats),
+                "# Unused Joins": len(self._filter(join_stats)),
+                "# Fields": len(field_stats),
+                "# Unused Fields": len(self._filter(field_stats)),
+                "Query Count": explore_usage.get(e.model_name, {}).get(e.name, 0),
+            }
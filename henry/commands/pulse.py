@@ -1,9 +1,11 @@
 import json
+from concurrent import futures
 from textwrap import fill
-from typing import Sequence, cast
+from typing import Dict, Iterator, Sequence, cast
 
-from looker_sdk import models
 from looker_sdk.error import SDKError
+from looker_sdk.rtl import transport
+from looker_sdk.sdk.api40 import models
 
 from henry.modules import exceptions, fetcher, spinner
 
@@ -15,64 +17,124 @@ class Pulse(fetcher.Fetcher):
 
     @classmethod
     def run(cls, user_input: fetcher.Input):
+        if user_input.sections and len(user_input.sections) > 1:
+            cls.run_on_instances(user_input)
+            return
         pulse = cls(user_input)
-        pulse.check_db_connections()
-        pulse.check_dashboard_performance()
-        pulse.check_dashboard_errors()
-        pulse.check_explore_performance()
-        pulse.check_schedule_failures()
-        pulse.check_legacy_features()
-
-    @spinner.Spinner()
-    def check_db_connections(self):
+        # Checks run concurrently but their sections are printed in order, each as
+        # soon as it and the ones before it are done.
+        with spinner.Spinner():
+            for section in pulse.checks():
+                print(f"\b{section}", end="\n" * 2)
+
+    @classmethod
+    def run_on_instances(cls, user_input: fetcher.Input):
+        """Runs the checks against every instance in parallel and prints them
+        instance by instance.
+        """
+        sections = list(cast(Sequence[str], user_input.sections))
+        errors: Dict[str, Exception] = {}
+        with futures.ThreadPoolExecutor(max_workers=len(sections)) as pool:
+            tasks = cls.submit_on_instances(
+                user_input, pool, errors, lambda p: list(p.checks())
+            )
+            with spinner.Spinner():
+                for section, task in tasks.items():
+                    checks = task.result()
+                    if checks is None:
+                        continue
+                    print(f"\bInstance: {section}", end="\n" * 2)
+                    for check in checks:
+                        print(f"\b{check}", end="\n" * 2)
+        fetcher.exit_on_instance_errors(sections, errors)
+
+    def checks(self) -> Iterator[str]:
+        """Runs the checks concurrently and yields their sections in order."""
+        checks = [
+            self.check_db_connections,
+            self.check_dashboard_performance,
+            self.check_dashboard_errors,
+            self.check_explore_performance,
+            self.check_schedule_failures,
+            self.check_legacy_features,
+        ]
+        return self._imap_concurrently(lambda check: check(), checks)
+
+    def check_db_connections(self) -> str:
         """Gets all db connections and runs all supported tests against them."""
-        print("\bTest 1/6: Checking connections")
+        header = "Test 1/6: Checking connections"
 
         reserved_names = ["looker__internal__analytics", "looker", "looker__ilooker"]
         db_connections: Sequence[models.DBConnection] = list(
-            filter(lambda c: c.name not in reserved_names, self.sdk.all_connections())
+            filter(
+                lambda c: c.name not in reserved_names,
+                self.sdk.all_connections(fields=fetcher.CONNECTION_FIELDS),
+            )
         )
 
         if not db_connections:
             raise exceptions.NotFoundError("No connections found.")
 
-        formatted_results = []
-        for connection in db_connections:
-            assert connection.dialect
-            assert isinstance(connection.name, str)
+        # The query counts are looked up while the connections are being tested
+        with futures.ThreadPoolExecutor(max_workers=1) as pool:
+            query_counts = pool.submit(self._get_connection_query_counts)
+            statuses = self._map_concurrently(self._test_connection, db_connections)
+        formatted_results = [
+            {
+                "Connection": connection.name,
+                "Status": status,
+                "Query Count": query_counts.result().get(
+                    cast(str, connection.name), 0
+                ),
+            }
+            for connection, status in zip(db_connections, statuses)
+        ]
+        return f"{header}\n{self._tabularize(formatted_results)}"
+
+    def _test_connection(self, connection: models.DBConnection) -> str:
+        """Runs all supported tests against a connection and returns "OK" or the
+        errors. Tests that take longer than self.connection_timeout are reported as
+        errors, without being retried, rather than holding up the other connections.
+        """
+        assert connection.dialect
+        assert isinstance(connection.name, str)
+        options: transport.TransportOptions = {}
+        if self.connection_timeout:
+            options["timeout"] = self.connection_timeout
+        try:
             resp = self.sdk.test_connection(
                 connection.name,
                 models.DelimSequence(connection.dialect.connection_tests),
+                transport_options=options,
             )
-            results = list(filter(lambda r: r.status == "error", resp))
-            errors = [f"- {fill(cast(str, e.message), width=100)}" for e in results]
-            resp = self.sdk.run_inline_query(
-                "json",
-                models.WriteQuery(
-                    model="i__looker",
-                    view="history",
-                    fields=["history.query_run_count"],
-                    filters={"history.connection_name": connection.name},
-                    limit="1",
-                ),
-            )
-            query_run_count = json.loads(resp)[0]["history.query_run_count"]
-
-            formatted_results.append(
-                {
-                    "Connection": connection.name,
-                    "Status": "OK" if not errors else "\n".join(errors),
-                    "Query Count": query_run_count,
-                }
-            )
-        self._tabularize_and_print(formatted_results)
+        except SDKError as e:
+            return f"- {fill(str(e), width=100)}"
+        results = list(filter(lambda r: r.status == "error", resp))
+        errors = [f"- {fill(cast(str, e.message), width=100)}" for e in results]
+        return "OK" if not errors else "\n".join(errors)
+
+    def _get_connection_query_counts(self) -> Dict[str, int]:
+        """Returns the number of queries run against each connection."""
+        resp = self.sdk.run_inline_query(
+            "json",
+            models.WriteQuery(
+                model="i__looker",
+                view="history",
+                fields=["history.connection_name", "history.query_run_count"],
+                filters={"history.connection_name": "-NULL"},
+                limit=str(fetcher.HISTORY_PAGE_SIZE),
+            ),
+        )
+        return {
+            r["history.connection_name"]: r["history.query_run_count"] or 0
+            for r in json.loads(resp)
+        }
 
-    @spinner.Spinner()
-    def check_dashboard_performance(self):
-        """Prints a list of dashboards with slow running queries in the past
+    def check_dashboard_performance(self) -> str:
+        """Returns a list of dashboards with slow running queries in the past
         7 days"""
-        print(
-            "\bTest 2/6: Checking for dashboards with queries slower than "
+        header = (
+            "Test 2/6: Checking for dashboards with queries slower than "
             "30 seconds in the last 7 days"
         )
         request = models.WriteQuery(
@@ -86,18 +148,15 @@ class Pulse(fetcher.Fetcher):
                 "history.status": "complete",
             },
             sorts=["query.count desc"],
-            limit=20,
+            limit="20",
         )
         resp = self.sdk.run_inline_query("json", request)
         slowest_dashboards = json.loads(resp)
-        self._tabularize_and_print(slowest_dashboards)
+        return f"{header}\n{self._tabularize(slowest_dashboards)}"
 
-    @spinner.Spinner()
-    def check_dashboard_errors(self):
-        """Prints a list of erroring dashboard queries."""
-        print(
-            "\bTest 3/6: Checking for dashboards with erroring queries in the last 7 days"  # noqa: B950
-        )
+    def check_dashboard_errors(self) -> str:
+        """Returns a list of erroring dashboard queries."""
+        header = "Test 3/6: Checking for dashboards with erroring queries in the last 7 days"  # noqa: B950
         request = models.WriteQuery(
             model="i__looker",
             view="history",
@@ -109,16 +168,15 @@ class Pulse(fetcher.Fetcher):
                 "history.status": "error",
             },
             sorts=["history.query_run_ount desc"],
-            limit=20,
+            limit="20",
         )
         resp = self.sdk.run_inline_query("json", request)
         erroring_dashboards = json.loads(resp)
-        self._tabularize_and_print(erroring_dashboards)
+        return f"{header}\n{self._tabularize(erroring_dashboards)}"
 
-    @spinner.Spinner()
-    def check_explore_performance(self):
-        """Prints a list of the slowest running explores."""
-        print("\bTest 4/6: Checking for the slowest explores in the past 7 days")
+    def check_explore_performance(self) -> str:
+        """Returns a list of the slowest running explores."""
+        lines = ["Test 4/6: Checking for the slowest explores in the past 7 days"]
         request = models.WriteQuery(
             model="i__looker",
             view="history",
@@ -128,7 +186,7 @@ class Pulse(fetcher.Fetcher):
                 "query.model": "-NULL, -system^_^_activity",
             },
             sorts=["history.average_runtime desc"],
-            limit=20,
+            limit="20",
         )
         resp = self.sdk.run_inline_query("json", request)
         slowest_explores = json.loads(resp)
@@ -137,16 +195,16 @@ class Pulse(fetcher.Fetcher):
         resp = json.loads(self.sdk.run_inline_query("json", request))
         avg_query_runtime = resp[0]["history.average_runtime"]
         if avg_query_runtime:
-            print(
-                f"\bFor context, the average query runtime is {avg_query_runtime:.4f}s"
+            lines.append(
+                f"For context, the average query runtime is {avg_query_runtime:.4f}s"
             )
 
-        self._tabularize_and_print(slowest_explores)
+        lines.append(self._tabularize(slowest_explores))
+        return "\n".join(lines)
 
-    @spinner.Spinner()
-    def check_schedule_failures(self):
-        """Prints a list of schedules that have failed in the past 7 days."""
-        print("\bTest 5/6: Checking for failing schedules")
+    def check_schedule_failures(self) -> str:
+        """Returns a list of schedules that have failed in the past 7 days."""
+        header = "Test 5/6: Checking for failing schedules"
         request = models.WriteQuery(
             model="i__looker",
             view="scheduled_plan",
@@ -156,16 +214,15 @@ class Pulse(fetcher.Fetcher):
                 "scheduled_job.status": "failure",
             },
             sorts=["scheduled_job.count desc"],
-            limit=500,
+            limit="500",
         )
         result = self.sdk.run_inline_query("json", request)
         failed_schedules = json.loads(result)
-        self._tabularize_and_print(failed_schedules)
+        return f"{header}\n{self._tabularize(failed_schedules)}"
 
-    @spinner.Spinner()
-    def check_legacy_features(self):
-        """Prints a list of enabled legacy features."""
-        print("\bTest 6/6: Checking for enabled legacy features")
+    def check_legacy_features(self) -> str:
+        """Returns a list of enabled legacy features."""
+        header = "Test 6/6: Checking for enabled legacy features"
         lf = list(filter(lambda f: f.enabled, self.sdk.all_legacy_features()))
         legacy_features = [{"Feature": cast(str, f.name)} for f in lf]
-        self._tabularize_and_print(legacy_features)
+        return f"{header}\n{self._tabularize(legacy_features)}"
@@ -0,0 +1,371 @@
+import contextlib
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+from concurrent import futures
+from http import server
+from typing import (
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+)
+from urllib import parse
+
+from henry.commands import analyze, pulse, vacuum
+from henry.modules import exceptions, fetcher
+
+# Commands served, by path
+COMMANDS: Dict[str, Type[fetcher.Fetcher]] = {
+    "/analyze/projects": analyze.Analyze,
+    "/analyze/models": analyze.Analyze,
+    "/analyze/explores": analyze.Analyze,
+    "/vacuum/models": vacuum.Vacuum,
+    "/vacuum/explores": vacuum.Vacuum,
+    "/pulse": pulse.Pulse,
+}
+# Commands that switch the shared session to the dev workspace while they run, so
+# that no other command may run meanwhile
+DEV_WORKSPACE_COMMANDS = {"/analyze/projects"}
+# Query parameters accepted, and how their values are parsed
+PARAMETERS = {
+    "project": str,
+    "model": str,
+    "explore": str,
+    "timeframe": int,
+    "min_queries": int,
+    "limit": int,
+    "order_by": str,
+}
+# Columns of the results of each command, by path, that they can be ordered by
+COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "/analyze/projects": (
+        "Project",
+        "# Models",
+        "# View Files",
+        "Git Connection Status",
+        "PR Mode",
+        "Is Validation Required",
+    ),
+    "/analyze/models": (
+        "Project",
+        "Model",
+        "# Explores",
+        "# Unused Explores",
+        "Query Count",
+    ),
+    "/analyze/explores": (
+        "Model",
+        "Explore",
+        "Is Hidden",
+        "Has Description",
+        "# Joins",
+        "# Unused Joins",
+        "# Fields",
+        "# Unused Fields",
+        "Query Count",
+    ),
+    "/vacuum/models": ("Model", "Unused Explores", "Model Query Count"),
+    "/vacuum/explores": ("Model", "Explore", "Unused Joins", "Unused Fields"),
+}
+# Directions results can be ordered in
+SORT_TYPES = ("asc", "desc")
+# Results not requested for this many refreshes are dropped rather than refreshed
+IDLE_REFRESHES = 6
+
+
+class RequestError(Exception):
+    """A request that doesn't name a command or has invalid parameters."""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+class Result(NamedTuple):
+    body: bytes
+    refreshed: float
+
+
+class ReadWriteLock:
+    """A lock held either by any number of readers or by a single writer.
+    Writers waiting for the lock keep new readers from taking it.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writing = False
+        self._waiting_writers = 0
+
+    @contextlib.contextmanager
+    def reading(self) -> Iterator[None]:
+        with self._condition:
+            self._condition.wait_for(
+                lambda: not self._writing and not self._waiting_writers
+            )
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                self._condition.notify_all()
+
+    @contextlib.contextmanager
+    def writing(self) -> Iterator[None]:
+        with self._condition:
+            self._waiting_writers += 1
+            self._condition.wait_for(lambda: not self._writing and not self._readers)
+            self._waiting_writers -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
+
+
+class Service:
+    """Answers henry commands from results kept in memory, so that they can be
+    asked for repeatedly without waiting for the API.
+
+    One logged in SDK is shared by every command, so API responses memoized for
+    one are reused by the others. A result is computed the first time it's asked
+    for, identical requests made meanwhile waiting for it, and then recomputed
+    in the background every refresh interval while the previous one is served.
+    Commands that switch the session to the dev workspace run on their own.
+    The metadata cache and usage store are opened once and shared as well.
+    """
+
+    def __init__(self, user_input: fetcher.Input):
+        self.user_input = user_input._replace(sections=None)
+        base = fetcher.Fetcher(self.user_input)
+        self.sdk = base.sdk
+        self.cache = base.cache
+        self.usage_store = base.usage_store
+        self.refreshes = 0
+        self._results: Dict[fetcher.Input, Result] = {}
+        self._requested: Dict[fetcher.Input, int] = {}
+        self._in_flight: Dict[fetcher.Input, futures.Future] = {}
+        self._lock = threading.Lock()
+        self._session_lock = ReadWriteLock()
+
+    def parse(self, path: str, query: str) -> fetcher.Input:
+        """Returns the input of the command requested by a URL path and query."""
+        if path.rstrip("/") not in COMMANDS:
+            raise RequestError(f"Unknown command {path}.", status=404)
+        command, _, subcommand = path.strip("/").partition("/")
+        params: Dict[str, List[str]] = parse.parse_qs(query, keep_blank_values=True)
+        strings: Dict[str, str] = {}
+        numbers: Dict[str, int] = {}
+        for name, values in params.items():
+            if name not in PARAMETERS:
+                raise RequestError(f"Unknown parameter {name}.")
+            if name != "order_by" and len(values) > 1:
+                raise RequestError(f"Parameter {name} can only be given once.")
+            if PARAMETERS[name] is str:
+                strings[name] = values[0]
+                continue
+            try:
+                numbers[name] = int(values[0])
+            except ValueError:
+                raise RequestError(f"Parameter {name} must be an integer.") from None
+        defaults = self.user_input
+        return defaults._replace(
+            command=command,
+            subcommand=subcommand or None,
+            project=strings.get("project", defaults.project),
+            model=strings.get("model", defaults.model),
+            explore=strings.get("explore", defaults.explore),
+            timeframe=numbers.get("timeframe", defaults.timeframe),
+            min_queries=numbers.get("min_queries", defaults.min_queries),
+            limit=(numbers["limit"],) if "limit" in numbers else defaults.limit,
+            # e.g. order_by=Query Count:desc, which can be repeated
+            sortkey=(
+                tuple(_sort_key(path.rstrip("/"), v) for v in params["order_by"])
+                if "order_by" in params
+                else defaults.sortkey
+            ),
+        )
+
+    def get(self, request: fetcher.Input) -> Result:
+        """Returns the result of a request, computing it if it isn't kept yet."""
+        with self._lock:
+            result = self._results.get(request)
+            if result is not None:
+                self._requested[request] = self.refreshes
+                return result
+            pending = self._in_flight.get(request)
+            if pending is None:
+                future: futures.Future = futures.Future()
+                self._in_flight[request] = future
+        if pending is not None:
+            return pending.result()
+
+        try:
+            result = self._compute(request)
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[request]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._in_flight[request]
+            self._results[request] = result
+            self._requested[request] = self.refreshes
+        future.set_result(result)
+        return result
+
+    def refresh(self):
+        """Forgets memoized API responses and recomputes the results requested in
+        the last IDLE_REFRESHES refreshes, dropping the others.
+        """
+        with self._lock:
+            self.refreshes += 1
+            for request, refreshes in list(self._requested.items()):
+                if self.refreshes - refreshes > IDLE_REFRESHES:
+                    del self._results[request]
+                    del self._requested[request]
+            requests = list(self._results)
+        clear = getattr(self.sdk.transport, "clear", None)
+        if clear:
+            clear()
+        # Testing connections isn't a read-only call and forgets memoized
+        # responses, so pulse is refreshed last
+        for request in sorted(requests, key=lambda r: r.command == "pulse"):
+            try:
+                result = self._compute(request._replace(refresh_cache=True))
+            except Exception as e:
+                print(f"Error refreshing {_path(request)}: {e}", file=sys.stderr)
+                continue
+            with self._lock:
+                if request in self._results:
+                    self._results[request] = result
+
+    def refresh_every(self, interval: float, stopped: threading.Event):
+        while not stopped.wait(interval):
+            self.refresh()
+
+    def _compute(self, request: fetcher.Input) -> Result:
+        path = _path(request)
+        # Commands don't open a cache or usage store of their own
+        command = COMMANDS[path](
+            request._replace(cache=False, incremental=False), sdk=self.sdk
+        )
+        command.cache = self.cache
+        command.usage_store = self.usage_store
+        if path in DEV_WORKSPACE_COMMANDS:
+            session = self._session_lock.writing()
+        else:
+            session = self._session_lock.reading()
+        with session:
+            if isinstance(command, pulse.Pulse):
+                data: Sequence = list(command.checks())
+            else:
+                data = command.ordered_results(request)
+        return Result(json.dumps(data, default=str).encode("utf-8"), time.time())
+
+
+def run(user_input: fetcher.Input):
+    """Serves henry commands over HTTP, on a TCP port or a Unix socket, until
+    interrupted.
+    """
+    service = Service(user_input)
+    httpd: socketserver.BaseServer
+    if user_input.socket_path:
+        httpd = _UnixHTTPServer(user_input.socket_path, _handler(service))
+        address = user_input.socket_path
+    else:
+        httpd = server.ThreadingHTTPServer(
+            (user_input.host, user_input.port), _handler(service)
+        )
+        address = "http://{}:{}".format(*httpd.server_address[:2])
+    stopped = threading.Event()
+    refresher = threading.Thread(
+        target=service.refresh_every,
+        args=(user_input.refresh_interval, stopped),
+        daemon=True,
+    )
+    refresher.start()
+    print(f"Serving {user_input.section} on {address}", file=sys.stderr)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stopped.set()
+        httpd.server_close()
+        if user_input.socket_path:
+            os.remove(user_input.socket_path)
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def _handler(service: Service):
+    class Handler(server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = parse.urlsplit(self.path)
+            try:
+                result = service.get(service.parse(url.path, url.query))
+            except RequestError as e:
+                self._send_error(e.status, e)
+            except exceptions.NotFoundError as e:
+                self._send_error(404, e)
+            except Exception as e:
+                self._send_error(502, e)
+            else:
+                age = int(time.time() - result.refreshed)
+                self._send(200, result.body, [("Age", str(age))])
+
+        def address_string(self) -> str:
+            # Clients of a Unix socket have no address
+            return self.client_address[0] if self.client_address else "local"
+
+        def _send_error(self, status: int, error: Exception):
+            body = json.dumps({"error": str(error)}).encode("utf-8")
+            self._send(status, body)
+
+        def _send(
+            self,
+            status: int,
+            body: bytes,
+            headers: Optional[List[Tuple[str, str]]] = None,
+        ):
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in headers or []:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def _sort_key(path: str, value: str) -> Tuple[str, str]:
+    """Parses an order_by value, e.g. Query Count:desc, checking it against the
+    columns of the command's results.
+    """
+    field, _, sort_type = value.rpartition(":") if ":" in value else (value, "", "asc")
+    if field not in COLUMNS.get(path, ()):
+        raise RequestError(f"Sort field {field} not found.")
+    if sort_type.lower() not in SORT_TYPES:
+        raise RequestError(f"Unrecognized sort type: {sort_type}.")
+    return field, sort_type
+
+
+def _path(request: fetcher.Input) -> str:
+    if request.subcommand:
+        return f"/{request.command}/{request.subcommand}"
+    return f"/{request.command}"
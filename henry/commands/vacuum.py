@@ -1,56 +1,56 @@
-from typing import cast, Optional
+from typing import Iterator, Optional
 
 from henry.modules import fetcher
 from henry.modules import spinner
 
 
 class Vacuum(fetcher.Fetcher):
-    @classmethod
-    def run(cls, user_input: fetcher.Input):
-        vacuum = cls(user_input)
+    def results(self, user_input: fetcher.Input) -> Iterator[fetcher.TRow]:
         if user_input.subcommand == "models":
-            result = vacuum.models(project=user_input.project, model=user_input.model)
-        elif user_input.subcommand == "explores":
-            result = vacuum.explores(model=user_input.model, explore=user_input.explore)
-        vacuum.output(data=cast(fetcher.TResult, result))
+            return self.iter_models(project=user_input.project, model=user_input.model)
+        return self.iter_explores(model=user_input.model, explore=user_input.explore)
 
     @spinner.Spinner()
     def models(self, *, project: Optional[str] = None, model: str) -> fetcher.TResult:
         """Analyze models."""
+        return list(self.iter_models(project=project, model=model))
+
+    def iter_models(
+        self, *, project: Optional[str] = None, model: str
+    ) -> Iterator[fetcher.TRow]:
+        """Yields the rows of models() as they are generated."""
         all_models = self.get_models(project=project, model=model)
         used_models = self.get_used_models()
-        result: fetcher.TResult = []
         for m in all_models:
             assert isinstance(m.name, str)
-            result.append(
-                {
-                    "Model": m.name,
-                    "Unused Explores": "\n".join(
-                        sorted(self.get_unused_explores(m.name))
-                    ),
-                    "Model Query Count": used_models.get(m.name, 0),
-                }
-            )
-        return result
+            yield {
+                "Model": m.name,
+                "Unused Explores": "\n".join(
+                    sorted(self.get_unused_explores(m.name))
+                ),
+                "Model Query Count": used_models.get(m.name, 0),
+            }
 
     @spinner.Spinner()
     def explores(
         self, *, model: Optional[str] = None, explore: Optional[str] = None
     ) -> fetcher.TResult:
         """Analyze explores"""
-        explores = self.get_explores(model=model, explore=explore)
-        result: fetcher.TResult = []
+        return list(self.iter_explores(model=model, explore=explore))
+
+    def iter_explores(
+        self, *, model: Optional[str] = None, explore: Optional[str] = None
+    ) -> Iterator[fetcher.TRow]:
+        """Yields the rows of explores() as they are generated."""
+        explores = self.iter_lookml_explores(model=model, explore=explore)
+        # Field usage of all explores is fetched at once unless filtering on one
+        field_usage = None if explore else self.get_used_fields_by_explore(model=model)
         for e in explores:
-            assert isinstance(e.name, str)
-            assert isinstance(e.model_name, str)
-            field_stats = self.get_explore_field_stats(e)
+            field_stats = self.get_explore_field_stats(e, field_usage=field_usage)
             join_stats = self.get_explore_join_stats(explore=e, field_stats=field_stats)
-            result.append(
-                {
-                    "Model": e.model_name,
-                    "Explore": e.name,
-                    "Unused Joins": "\n".join(sorted(self._filter(join_stats).keys())),
-                    "Unused Fields": "\n".join(sorted(self._filter(field_stats))),
-                }
-            )
-        return result
+            yield {
+                "Model": e.model_name,
+                "Explore": e.name,
+                "Unused Joins": "\n".join(sorted(self._filter(join_stats).keys())),
+                "Unused Fields": "\n".join(sorted(self._filter(field_stats))),
+            }
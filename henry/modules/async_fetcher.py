@@ -0,0 +1,214 @@
+import asyncio
+import random
+import time
+import urllib.parse
+from typing import TYPE_CHECKING, Any, Dict, Optional, Sequence, cast
+
+from looker_sdk import error
+from looker_sdk.rtl import auth_token, serialize, transport
+from looker_sdk.sdk.api40 import methods, models
+
+from henry.modules import auth, tracing
+
+if TYPE_CHECKING:
+    import aiohttp
+else:
+    # aiohttp is an optional dependency, checked for when an AsyncFetcher is made
+    try:
+        import aiohttp
+    except ImportError:  # pragma: no cover
+        aiohttp = None
+
+
+class AsyncFetcher:
+    """Makes Looker API calls over aiohttp so that many of them can be in flight at
+    once on a single thread. It's used to fetch explores, the calls henry makes
+    by the hundreds, and its methods mirror the SDK methods of the same name.
+    Must be used as an async context manager:
+
+        async with AsyncFetcher(sdk, concurrency=100) as af:
+            explores = await asyncio.gather(
+                *[af.lookml_model_explore(model, e) for e in names]
+            )
+
+    Authentication is shared with the synchronous SDK's AuthSession, including
+    its token cache. Logging in (or back in once the token has expired or been
+    rejected) happens behind a lock so concurrent requests wait for a single login.
+    Like the synchronous transport, requests that fail to connect, time out or
+    get a response with one of retry_statuses are retried up to `retries` times,
+    waiting for the Retry-After header if sent and otherwise backing off
+    exponentially from `backoff` seconds with jitter.
+    """
+
+    def __init__(
+        self,
+        sdk: methods.Looker40SDK,
+        concurrency: int = 10,
+        *,
+        retries: int = 0,
+        backoff: float = 0.0,
+        retry_statuses: Sequence[int] = (),
+    ):
+        if aiohttp is None:
+            raise ImportError(
+                "The async transport requires aiohttp. "
+                "Install it using: pip install henry[async]"
+            )
+        self.auth = sdk.auth
+        self.settings = sdk.auth.settings
+        self.api_path = sdk.api_path
+        self.concurrency = concurrency
+        self.retries = max(retries, 0)
+        self.backoff = backoff
+        self.retry_statuses = retry_statuses
+        self.token_cache: Optional[auth.TokenCache] = getattr(
+            sdk.auth, "token_cache", None
+        )
+        self.tracer = tracing.active()
+
+    async def __aenter__(self) -> "AsyncFetcher":
+        headers = {transport.LOOKER_API_ID: self.settings.agent_tag}
+        headers.update(self.settings.headers or {})
+        self.session = aiohttp.ClientSession(
+            headers=headers,
+            timeout=aiohttp.ClientTimeout(total=self.settings.timeout),
+            connector=aiohttp.TCPConnector(
+                limit=self.concurrency, ssl=bool(self.settings.verify_ssl)
+            ),
+        )
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._auth_lock = asyncio.Lock()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    async def lookml_model_explore(
+        self, lookml_model_name: str, explore_name: str, fields: Optional[str] = None
+    ) -> models.LookmlModelExplore:
+        return await self.get(
+            f"/lookml_models/{_encode(lookml_model_name)}"
+            f"/explores/{_encode(explore_name)}",
+            models.LookmlModelExplore,
+            {"fields": fields},
+        )
+
+    async def get(
+        self,
+        path: str,
+        structure: Any,
+        query_params: Optional[Dict[str, Optional[str]]] = None,
+    ) -> Any:
+        text = await self.request("GET", path, query_params)
+        return serialize.deserialize40(data=text, structure=structure)
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        query_params: Optional[Dict[str, Optional[str]]] = None,
+        body: Optional[bytes] = None,
+    ) -> str:
+        """Sends an authenticated request and returns the response body. Raises
+        SDKError for error responses, like the SDK does.
+        """
+        url = urllib.parse.urljoin(self.api_path, path.lstrip("/"))
+        params = {k: v for k, v in (query_params or {}).items() if v is not None}
+        async with self._slots:
+            rejected_token = None
+            retries = 0
+            start = time.perf_counter()
+            while True:
+                token = await self._get_token(rejected_token)
+                try:
+                    async with self.session.request(
+                        method,
+                        url,
+                        params=params,
+                        data=body,
+                        headers={"Authorization": f"Bearer {token}"},
+                    ) as resp:
+                        size = len(await resp.read())
+                        text = await resp.text()
+                        status = resp.status
+                        retry_after = resp.headers.get("Retry-After")
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    if retries >= self.retries:
+                        raise error.SDKError(str(e) or type(e).__name__) from e
+                    retries += 1
+                    await asyncio.sleep(self._backoff_time(retries))
+                    continue
+                if status in self.retry_statuses and retries < self.retries:
+                    retries += 1
+                    await asyncio.sleep(self._backoff_time(retries, retry_after))
+                    continue
+                if self.tracer:
+                    self.tracer.record(
+                        method,
+                        str(resp.url),
+                        status,
+                        start,
+                        time.perf_counter(),
+                        size,
+                        retries=retries,
+                    )
+                # Log back in once if the token was rejected, e.g. it expired early
+                if status == 401 and rejected_token is None:
+                    rejected_token = token
+                    retries, start = 0, time.perf_counter()
+                    continue
+                if status >= 400:
+                    raise error.SDKError(text)
+                return text
+
+    def _backoff_time(self, retries: int, retry_after: Optional[str] = None) -> float:
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        return random.uniform(0, self.backoff * 2 ** (retries - 1))
+
+    async def _get_token(self, rejected_token: Optional[str] = None) -> str:
+        """Returns an active access token, reading it from the token cache or
+        logging in first if needed.
+        """
+        async with self._auth_lock:
+            token = self.auth.token
+            if not self.auth.is_authenticated or token.access_token == rejected_token:
+                cached = self.token_cache.load() if self.token_cache else None
+                if cached and cached.access_token != rejected_token:
+                    self.auth.token = cached
+                else:
+                    await self._login()
+            return self.auth.token.access_token
+
+    async def _login(self):
+        config = self.settings.read_config()
+        client_id = config.get("client_id")
+        client_secret = config.get("client_secret")
+        if not (client_id and client_secret):
+            raise error.SDKError("Required auth credentials not found.")
+        start = time.perf_counter()
+        async with self.session.post(
+            urllib.parse.urljoin(self.api_path, "login"),
+            data=urllib.parse.urlencode(
+                {"client_id": client_id, "client_secret": client_secret}
+            ),
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+        ) as resp:
+            text = await resp.text()
+        if self.tracer:
+            url, end = str(resp.url), time.perf_counter()
+            self.tracer.record("POST", url, resp.status, start, end, len(text))
+        if resp.status >= 400:
+            raise error.SDKError(text)
+        access_token = serialize.deserialize40(
+            data=text, structure=auth_token.AccessToken
+        )
+        self.auth.token = auth_token.AuthToken(
+            cast(auth_token.AccessToken, access_token)
+        )
+        if self.token_cache:
+            self.token_cache.save(self.auth.token)
+
+
+def _encode(value: str) -> str:
+    return methods.Looker40SDK.encode_path_param(value)
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Optional, Sequence, Set
+
+import requests
+from looker_sdk import error
+from looker_sdk.rtl import auth_session, auth_token, transport
+
+from henry.modules import cache
+
+# Cached tokens this close to expiring are not reused
+EXPIRY_MARGIN = 60  # seconds
+
+
+class TokenCache:
+    """Keeps an API access token on disk, readable by the current user only, so
+    that consecutive runs against the same instance don't each log in.
+    """
+
+    def __init__(
+        self, namespace: Sequence[Any] = (), directory: str = cache.DEFAULT_DIRECTORY
+    ):
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        digest = hashlib.sha256(repr(list(namespace)).encode("utf-8")).hexdigest()
+        self.directory = directory
+        self.path = os.path.join(directory, f"token_{digest[:16]}.json")
+
+    def load(self) -> Optional[auth_token.AuthToken]:
+        """Returns the cached token or None if missing or about to expire."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            expires_in = int(data["expires_at"] - time.time())
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        if expires_in <= EXPIRY_MARGIN:
+            return None
+        return auth_token.AuthToken(
+            auth_token.AccessToken(
+                access_token=data["access_token"],
+                token_type=data.get("token_type"),
+                expires_in=expires_in,
+            )
+        )
+
+    def save(self, token: auth_token.AuthToken):
+        # mkstemp creates files that only the current user can read
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "access_token": token.access_token,
+                    "token_type": token.token_type,
+                    "expires_at": token.expires_at.timestamp(),
+                },
+                f,
+            )
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class AuthSession(auth_session.AuthSession):
+    """AuthSession that reports bad credentials when first logging in, rather than
+    requiring a call up front to check them, and optionally reuses a token
+    cached on disk.
+
+    A cached token can be revoked before it expires, so requests rejected with it
+    are resent once after logging back in (see retry_unauthorized). Its API
+    session is shared with the runs that used it, so it may have been left in the
+    dev workspace (see uses_cached_token).
+    """
+
+    def __init__(
+        self,
+        settings: Any,
+        transport: transport.Transport,
+        deserialize: Any,
+        api_version: str,
+        token_cache: Optional[TokenCache] = None,
+    ):
+        super().__init__(settings, transport, deserialize, api_version)
+        self.token_cache = token_cache
+        self._cached_tokens: Set[str] = set()
+        self._lock = threading.RLock()
+        if token_cache:
+            token = token_cache.load()
+            if token:
+                self.token = token
+                self._cached_tokens.add(token.access_token)
+
+    @property
+    def uses_cached_token(self) -> bool:
+        """Whether the current token was read from the token cache."""
+        return self.token.access_token in self._cached_tokens
+
+    def _get_token(self, transport_options: transport.TransportOptions):
+        # Concurrent requests wait for a single login
+        with self._lock:
+            return super()._get_token(transport_options)
+
+    def _login(self, transport_options: transport.TransportOptions):
+        try:
+            super()._login(transport_options)
+        except error.SDKError:
+            print(
+                "Error logging in to the Looker API. Please check your credentials.",
+                file=sys.stderr,
+            )
+            raise
+        if self.token_cache:
+            self.token_cache.save(self.token)
+
+    def retry_unauthorized(
+        self, response: requests.Response, **kwargs: Any
+    ) -> Optional[requests.Response]:
+        """requests response hook that logs back in and resends a request that was
+        rejected because its cached token is no longer valid.
+        """
+        if response.status_code != 401:
+            return None
+        rejected = response.request.headers.get("Authorization", "")[len("Bearer ") :]
+        if rejected not in self._cached_tokens:
+            return None
+        with self._lock:
+            if self.token.access_token == rejected:
+                if self.token_cache:
+                    self.token_cache.clear()
+                self.token = auth_token.AuthToken()
+        request = response.request.copy()
+        request.headers["Authorization"] = self.authenticate({})["Authorization"]
+        return response.connection.send(request, **kwargs)
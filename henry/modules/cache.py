@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, List, Optional, Sequence, Tuple
+
+DEFAULT_DIRECTORY = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "henry"
+)
+DEFAULT_TTL = 60 * 60  # seconds
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024  # bytes
+# Eviction frees space down to this fraction of the maximum size, so that it
+# doesn't run again on every following set()
+EVICT_TO = 0.9
+
+
+class MetadataCache:
+    """Stores API payloads on disk, one file per key.
+
+    Entries older than ttl seconds are ignored and removed when read. Reading an
+    entry marks it as recently used, and once the cache grows beyond max_size
+    bytes the least recently used entries are evicted. The size of the cache is
+    read from disk on the first set() and then tracked as entries are stored.
+    """
+
+    def __init__(
+        self,
+        namespace: Sequence[Any] = (),
+        directory: str = DEFAULT_DIRECTORY,
+        ttl: int = DEFAULT_TTL,
+        max_size: int = DEFAULT_MAX_SIZE,
+    ):
+        self.namespace = list(namespace)
+        self.directory = directory
+        self.ttl = ttl
+        self.max_size = max_size
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+
+    def get(self, *key: Any) -> Optional[str]:
+        """Returns the value stored under key or None if missing or expired."""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                created = float(f.readline())
+                value = f.read()
+        except (OSError, ValueError):
+            return None
+        if time.time() - created > self.ttl:
+            self._remove(path)
+            return None
+        # The modification time tracks when an entry was last used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def set(self, value: str, *key: Any):
+        """Stores value under key and evicts old entries if needed."""
+        path = self._path(key)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(f"{time.time()}\n")
+            f.write(value)
+            size = f.tell()
+        try:
+            size -= os.stat(path).st_size
+        except OSError:
+            pass
+        os.replace(tmp, path)
+        with self._lock:
+            if self._size is None:
+                self._size = sum(e[1] for e in self._entries())
+            else:
+                self._size += size
+            if self._size > self.max_size:
+                self._evict()
+
+    def clear(self):
+        """Removes all entries."""
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json"):
+                self._remove(entry.path)
+
+    def _path(self, key: Sequence[Any]) -> str:
+        digest = hashlib.sha256(
+            json.dumps([*self.namespace, *key], default=str).encode("utf-8")
+        ).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        """Returns the (last used time, size, path) of every entry."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _evict(self):
+        entries = self._entries()
+        size = sum(e[1] for e in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_size * EVICT_TO:
+                break
+            self._remove(path)
+            size -= entry_size
+        self._size = size
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
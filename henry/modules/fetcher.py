@@ -1,34 +1,96 @@
-import csv
+import asyncio
+import contextlib
 import datetime
+import enum
+import functools
+import heapq
+import itertools
 import json
-import re
+import random
+import sys
+import urllib.parse
 import uuid
+from concurrent import futures
 from operator import itemgetter
 from typing import (
+    Any,
+    Awaitable,
     Callable,
     Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
     MutableSequence,
     NamedTuple,
     Optional,
     Sequence,
+    Set,
     Tuple,
+    Type,
+    TypeVar,
     Union,
     cast,
 )
 
+import requests.adapters
 import tabulate
 from looker_sdk import error
-from looker_sdk.rtl import api_settings, auth_session, requests_transport, serialize
+from looker_sdk.rtl import api_settings, auth_token, serialize
 from looker_sdk.sdk.api40 import methods, models
+from urllib3.util import retry
 
-from henry.modules import exceptions
+from henry.modules import (
+    async_fetcher,
+    auth,
+    cache,
+    exceptions,
+    field_usage,
+    lookml,
+    memo,
+    snapshot,
+    spinner,
+    tracing,
+    usage_store,
+    writers,
+)
 
 from .. import __version__ as pkg
 
-TResult = MutableSequence[Dict[str, Union[str, int, bool]]]
+TRow = writers.TRow
+TResult = MutableSequence[TRow]
+T = TypeVar("T")
+F = TypeVar("F", bound="Fetcher")
+
+# Maximum number of rows requested from i__looker per history query
+HISTORY_PAGE_SIZE = 5000
+# Responses worth retrying since they are usually transient
+RETRY_STATUSES = (429, 502, 503, 504)
+# Calls that aren't sent again once they may have reached the API, since each
+# attempt can take until the timeout, e.g. testing a connection that hangs
+NO_RETRY_PATHS = ("/test",)
+# Models whose usage is left out of model usage stats
+SYSTEM_MODELS = ("system__activity", "i__looker")
+# Attributes requested from the API, only those henry reads, since whole objects
+# can be large, e.g. explores with every field's SQL, labels and links.
+MODEL_FIELDS = "name,project_name,has_content,explores(name)"
+EXPLORE_FIELDS = (
+    "name,model_name,hidden,description,scopes,"
+    "fields(dimensions(name,hidden),measures(name,hidden))"
+)
+PROJECT_FIELDS = "id,name,git_remote_url,pull_request_mode,validation_required"
+PROJECT_FILE_FIELDS = "type"
+CONNECTION_FIELDS = "name,dialect(connection_tests)"
+# Commands that switch their API session to the dev workspace. They don't use the
+# token cache, since runs sharing a token share its session.
+WORKSPACE_SWITCHING_COMMANDS = ("analyze_projects", "serve")
 
 class Fetcher:
-    def __init__(self, options: "Input"):
+    def __init__(self, options: "Input", sdk: Optional[methods.Looker40SDK] = None):
+        """Creates a fetcher for the instance of options.section. An SDK that is
+        already logged in to it can be passed to share its connections and
+        memoized responses.
+        """
         self.timeframe = f"{options.timeframe} days" if options.timeframe else "90 days"
         self.min_queries = options.min_queries or 0
         self.limit = options.limit[0] if options.limit else None
@@ -38,19 +100,156 @@ class Fetcher:
         self.cmd = f"{cmd}_{sub_cmd}" if sub_cmd else cmd
         self.save = options.save
         self.quiet = options.quiet
-        self.sdk = self.configure_sdk(
-            options.config_file, options.section, options.timeout
+        self.concurrency = max(options.concurrency or 1, 1)
+        self.retries = options.retries
+        self.backoff = options.backoff
+        # Calls made over aiohttp can't be recorded or replayed
+        replay_or_record = snapshot.recording() or snapshot.replaying()
+        self.transport = "sync" if replay_or_record else options.transport
+        self.connection_timeout = options.connection_timeout
+        self.output_format = options.output_format
+        self.output_path = options.output_path
+        self.progressive = options.progressive
+        self.sdk = sdk or self.configure_sdk(
+            options.config_file,
+            options.section,
+            options.timeout,
+            retries=options.retries,
+            backoff=options.backoff,
+            token_cache=(
+                options.token_cache and self.cmd not in WORKSPACE_SWITCHING_COMMANDS
+            ),
         )
-        self._verify_api_credentials()
+        self.cache = (
+            cache.MetadataCache(
+                namespace=(self.sdk.auth.settings.base_url, options.section),
+                ttl=options.cache_ttl,
+            )
+            if options.cache and not replay_or_record
+            else None
+        )
+        self.refresh_cache = options.refresh_cache
+        self.days = options.timeframe or 90
+        self.usage_store = (
+            usage_store.UsageStore(
+                namespace=(self.sdk.auth.settings.base_url, options.section)
+            )
+            if options.incremental and not replay_or_record
+            else None
+        )
+        self._synced_usage: Set[str] = set()
+        self._deployed_refs: Dict[str, Optional[str]] = {}
+        self._lookml_models: Dict[str, models.LookmlModel] = {}
+
+    @classmethod
+    def run(cls, user_input: "Input"):
+        """Runs the command and outputs its results. When several sections are
+        given, it runs against each instance in parallel.
+        """
+        if user_input.sections and len(user_input.sections) > 1:
+            cls.run_on_instances(user_input)
+            return
+        fetcher = cls(user_input)
+        fetcher.output(data=fetcher.results(user_input))
+
+    def results(self, user_input: "Input") -> Iterable[TRow]:
+        """Returns the result rows of the command."""
+        raise NotImplementedError
+
+    def ordered_results(self, user_input: "Input") -> List[TRow]:
+        """Returns the result rows of the command, sorted and limited as specified
+        by user.
+        """
+        return list(self._order(self.results(user_input)))
+
+    @classmethod
+    def run_on_instances(cls, user_input: "Input"):
+        """Runs the command against the instance of every section in parallel, one
+        fetcher per instance, and outputs their results together with an Instance
+        column. Sorting and limits apply to the combined results.
+
+        An instance that fails doesn't stop the others: errors are reported once
+        the other results are output, and the exit status is then 1.
+        """
+        sections = list(cast(Sequence[str], user_input.sections))
+        errors: Dict[str, Exception] = {}
+        with futures.ThreadPoolExecutor(max_workers=len(sections)) as pool:
+            tasks = cls.submit_on_instances(
+                user_input,
+                pool,
+                errors,
+                lambda f: (f, list(f.results(user_input))),
+            )
+            results = (
+                (s, result)
+                for s, result in ((s, t.result()) for s, t in tasks.items())
+                if result is not None
+            )
+            # Any fetcher can output the results since they share options
+            first = next(results, None)
+            if first is not None:
+                first[1][0].output(
+                    data=(
+                        {"Instance": section, **row}
+                        for section, (_, rows) in itertools.chain([first], results)
+                        for row in rows
+                    )
+                )
+        exit_on_instance_errors(sections, errors)
+
+    @classmethod
+    def submit_on_instances(
+        cls: Type[F],
+        user_input: "Input",
+        pool: futures.Executor,
+        errors: Dict[str, Exception],
+        task: Callable[[F], T],
+    ) -> Dict[str, "futures.Future[Optional[T]]"]:
+        """Submits a task for every section of user_input that creates a fetcher
+        for its instance and passes it to task, and returns them by section, in
+        order. Creating the fetcher in the task keeps its SDK session and usage
+        store in the thread that uses them. Tasks that fail return None and their
+        errors are added to errors.
+        """
+
+        def run(section: str) -> Optional[T]:
+            try:
+                return task(cls(user_input._replace(section=section)))
+            except Exception as e:
+                errors[section] = e
+                return None
+
+        sections = cast(Sequence[str], user_input.sections)
+        return {section: pool.submit(run, section) for section in sections}
 
     def configure_sdk(
-        self, config_file: str, section: str, timeout: Optional[int],
+        self,
+        config_file: str,
+        section: str,
+        timeout: Optional[int],
+        *,
+        retries: int = 3,
+        backoff: float = 0.5,
+        token_cache: bool = False,
     ) -> methods.Looker40SDK:
         """Instantiates and returns a LookerSDK object and overrides default timeout if
         specified by user.
+
+        Idempotent calls and query runs that fail with a connection error or a
+        transient status are retried up to `retries` times, waiting for the
+        Retry-After header if sent and otherwise backing off exponentially from
+        `backoff` seconds with jitter. The connection pool holds as many keep-alive
+        connections as there are workers, and callers wait for a free connection
+        rather than opening extra ones.
+
+        Credentials are checked when first logging in. With token_cache, the access
+        token is cached on disk and reused by later runs until it expires.
         """
+        recording, replaying = snapshot.recording(), snapshot.replaying()
+        # Replays make no API calls, so they don't read the config file
         settings = api_settings.ApiSettings(
-            filename=config_file, section=section)
+            filename="" if replaying else config_file, section=section
+        )
         user_agent_tag = f"Henry v{pkg.__version__}: cmd={self.cmd}, sid={uuid.uuid1()}"
         settings.headers = {
             "Content-Type": "application/json",
@@ -58,23 +257,64 @@ class Fetcher:
         }
         if timeout:
             settings.timeout = timeout
-        transport = requests_transport.RequestsTransport.configure(settings)
+        # configure is inherited, and typed as returning any transport
+        transport = cast(
+            memo.MemoizingTransport, memo.MemoizingTransport.configure(settings)
+        )
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.concurrency,
+            pool_block=True,
+            max_retries=_JitteredRetry(
+                total=max(retries, 0),
+                backoff_factor=backoff,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=retry.Retry.DEFAULT_ALLOWED_METHODS | {"POST"},
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            ),
+        )
+        transport.session.mount("https://", adapter)
+        transport.session.mount("http://", adapter)
+        tokens = None
+        if token_cache and not replaying:
+            tokens = auth.TokenCache(
+                namespace=(settings.base_url, settings.read_config().get("client_id"))
+            )
+        sdk_transport: Any = transport
+        if replaying:
+            settings.base_url = replaying.base_url
+            sdk_transport = snapshot.ReplayTransport(replaying)
+        elif recording:
+            recording.base_url = settings.base_url
+            sdk_transport = snapshot.RecordingTransport(transport, recording)
         # 4.0 is hardcoded here due to needing the -40 suffixed methods
-        return methods.Looker40SDK(
-            auth_session.AuthSession(
-                settings, transport, serialize.deserialize40, "4.0"),
+        session = auth.AuthSession(
+            settings, sdk_transport, serialize.deserialize40, "4.0", token_cache=tokens
+        )
+        if replaying:
+            # Replayed calls need no credentials
+            session.token = auth_token.AuthToken(
+                auth_token.AccessToken(
+                    access_token="replay", token_type="Bearer", expires_in=86400
+                )
+            )
+        tracer = tracing.active()
+        if tracer:
+            transport.session.hooks["response"].append(tracer.hook)
+        transport.session.hooks["response"].append(session.retry_unauthorized)
+        sdk = methods.Looker40SDK(
+            session,
             serialize.deserialize40,
             serialize.serialize40,
-            transport,
+            sdk_transport,
             "4.0",
         )
-
-    def _verify_api_credentials(self):
-        try:
-            self.sdk.me()
-        except error.SDKError as e:
-            print("Error retreiving self using API. Please check your credentials.")
-            raise (e)
+        if session.uses_cached_token:
+            # A run that used the token may have left its session in the dev
+            # workspace, e.g. if it was interrupted
+            sdk.update_session(models.WriteApiSession(workspace_id="production"))
+        return sdk
 
     def get_projects(
         self, project_id: Optional[str] = None
@@ -83,9 +323,9 @@ class Fetcher:
         try:
             if project_id:
                 projects: Sequence[models.Project] = [
-                    self.sdk.project(project_id)]
+                    self.sdk.project(project_id, fields=PROJECT_FIELDS)]
             else:
-                projects = self.sdk.all_projects()
+                projects = self.sdk.all_projects(fields=PROJECT_FIELDS)
         except error.SDKError:
             raise exceptions.NotFoundError("An error occured while getting projects.")
         return projects
@@ -93,17 +333,23 @@ class Fetcher:
     def get_models(
         self, *, project: Optional[str] = None, model: Optional[str] = None
     ) -> Sequence[models.LookmlModel]:
-        """Returns a list of lookml models."""
-        ret: Sequence[models.LookmlModel]
-        if project:
-            self.get_projects(project)
+        """Returns a list of lookml models. The project is only looked up, to report
+        it as not found, when it has no models or the model could not be fetched.
+        """
         try:
             if model:
-                ml: Sequence[models.LookmlModel] = [
-                    self.sdk.lookml_model(model)]
+                ml: Sequence[models.LookmlModel] = [self._get_model(model)]
             else:
-                ml = self.sdk.all_lookml_models()
+                ml = self._cached_models(
+                    lambda: self.sdk.all_lookml_models(fields=MODEL_FIELDS),
+                    Sequence[models.LookmlModel],
+                    "all_lookml_models",
+                )
+                # Models listed here aren't fetched again one by one
+                self._lookml_models.update((cast(str, m.name), m) for m in ml)
         except error.SDKError:
+            if project:
+                self.get_projects(project)
             raise exceptions.NotFoundError("An error occured while getting models.")
         else:
             if project:
@@ -111,13 +357,19 @@ class Fetcher:
                 ml = list(
                     filter(lambda m: m.project_name.lower() == project.lower(), ml,)  # type: ignore  # noqa: B950
                 )
+                if not ml:
+                    self.get_projects(project)
             ml = list(filter(lambda m: cast(bool, m.has_content), ml))
         return ml
 
     def get_used_models(self) -> Dict[str, int]:
         """Returns a dictionary with model names as keys and query count as values."""
-        resp = self.sdk.run_inline_query(
-            "json",
+        if self.usage_store:
+            return {
+                m: sum(explores.values())
+                for m, explores in self.get_used_explores_by_model().items()
+            }
+        _results = self._iter_history(
             models.WriteQuery(
                 model="i__looker",
                 view="history",
@@ -128,40 +380,232 @@ class Fetcher:
                     "history.query_run_count": ">0",
                     "user.dev_mode": "No",
                 },
-                limit="5000",
             ),
+            paginate=False,
         )
-        _results: MutableSequence[Dict[str, int]] = json.loads(resp)
         results = {
             str(row["query.model"]): int(row["history.query_run_count"])
             for row in _results
         }
         return results
 
+    def get_used_explores_by_model(
+        self, *, model: Optional[str] = None
+    ) -> Dict[str, Dict[str, int]]:
+        """Returns a dictionary with model names as keys and, as values, a dictionary
+        of used explore names and their query count. Fetches usage for all models,
+        or only the given model, in a single query.
+        """
+        if self.usage_store:
+            self._sync_usage(usage_store.EXPLORE)
+            results = self.usage_store.explore_usage(self.days, model=model)
+            if not model:
+                for m in SYSTEM_MODELS:
+                    results.pop(m, None)
+            return results
+        return self._query_explore_usage(
+            model=model.replace("_", "^_")
+            if model
+            else "-system^_^_activity, -i^_^_looker",
+            created_date=self.timeframe,
+        )
+
+    def _query_explore_usage(
+        self, *, model: str, created_date: str
+    ) -> Dict[str, Dict[str, int]]:
+        """Runs a query for explore usage grouped by model and explore."""
+        _results = self._iter_history(
+            models.WriteQuery(
+                model="i__looker",
+                view="history",
+                fields=["query.model", "query.view", "history.query_run_count"],
+                filters={
+                    "history.created_date": created_date,
+                    "query.model": model,
+                    "history.query_run_count": ">0",
+                    "user.dev_mode": "No",
+                },
+            ),
+            paginate=False,
+        )
+        results: Dict[str, Dict[str, int]] = {}
+        for row in _results:
+            used_explores = results.setdefault(str(row["query.model"]), {})
+            used_explores[str(row["query.view"])] = int(row["history.query_run_count"])
+        return results
+
     def get_explores(
         self, *, model: Optional[str] = None, explore: Optional[str] = None
-    ) -> Sequence[models.LookmlModelExplore]:
+    ) -> Sequence[lookml.Explore]:
         """Returns a list of explores."""
+        return list(self.iter_lookml_explores(model=model, explore=explore))
+
+    def iter_lookml_explores(
+        self, *, model: Optional[str] = None, explore: Optional[str] = None
+    ) -> Iterator[lookml.Explore]:
+        """Yields the explores get_explores() returns, in the same order, each as
+        soon as it and the ones before it have been fetched.
+        """
         try:
             if model and explore:
-                explores = [self.sdk.lookml_model_explore(model, explore)]
+                ref = None
+                if self.cache:
+                    project = cast(str, self._get_model(model).project_name)
+                    ref = self._get_deployed_ref(project)
+                yield self._get_explore(model, explore, ref)
             elif not explore:
                 all_models = self.get_models(model=model)
-                explores = []
+                names: List[Tuple[str, str, Optional[str]]] = []
                 for m in all_models:
                     assert isinstance(m.name, str)
                     assert isinstance(m.explores, list)
-                    explores.extend(
-                        [
-                            self.sdk.lookml_model_explore(m.name, cast(str, e.name))
-                            for e in m.explores
-                        ]
+                    ref = self._get_deployed_ref(cast(str, m.project_name))
+                    names.extend([(m.name, cast(str, e.name), ref) for e in m.explores])
+                if self.transport == "async":
+                    yield from asyncio.run(self.get_explores_async(names))
+                else:
+                    yield from self._imap_concurrently(
+                        lambda n: self._get_explore(*n), names
                     )
         except error.SDKError:
             raise exceptions.NotFoundError(
                 "An error occured while getting models/explores."
             )
-        return explores
+
+    async def get_explores_async(
+        self, names: Sequence[Tuple[str, str, Optional[str]]]
+    ) -> List[lookml.Explore]:
+        """Returns the explores for a list of (model, explore, deployed ref) names.
+        Explores are fetched with the async transport, with up to self.concurrency
+        requests in flight at once on the current thread.
+        """
+        async with async_fetcher.AsyncFetcher(
+            self.sdk,
+            self.concurrency,
+            retries=self.retries,
+            backoff=self.backoff,
+            retry_statuses=RETRY_STATUSES,
+        ) as af:
+
+            async def fetch(model: str, explore: str) -> lookml.Explore:
+                return lookml.Explore.from_sdk(
+                    await af.lookml_model_explore(model, explore, fields=EXPLORE_FIELDS)
+                )
+
+            return await asyncio.gather(
+                *[
+                    self._cached_async(
+                        functools.partial(fetch, m, e),
+                        lookml.Explore,
+                        "explore",
+                        m,
+                        e,
+                        ref,
+                    )
+                    for m, e, ref in names
+                ]
+            )
+
+    def _get_model(self, model: str) -> models.LookmlModel:
+        if model in self._lookml_models:
+            return self._lookml_models[model]
+        return self._cached_models(
+            lambda: self.sdk.lookml_model(model, fields=MODEL_FIELDS),
+            models.LookmlModel,
+            "lookml_model",
+            model,
+        )
+
+    def _get_explore(
+        self, model: str, explore: str, ref: Optional[str] = None
+    ) -> lookml.Explore:
+        # The SDK model is only kept until the compact explore is built
+        return self._cached(
+            lambda: lookml.Explore.from_sdk(
+                self.sdk.lookml_model_explore(model, explore, fields=EXPLORE_FIELDS)
+            ),
+            lookml.Explore,
+            "explore",
+            model,
+            explore,
+            ref,
+        )
+
+    def _get_deployed_ref(self, project: str) -> Optional[str]:
+        """Returns the git commit deployed to production for a project. Cached
+        explores are keyed on it so a deploy invalidates them. Returns None if the
+        cache is disabled or the ref can't be determined.
+        """
+        if not self.cache:
+            return None
+        if project not in self._deployed_refs:
+            try:
+                workspace = self.sdk.project_workspace(project, fields="git_head")
+            except error.SDKError:
+                self._deployed_refs[project] = None
+            else:
+                self._deployed_refs[project] = workspace.git_head
+        return self._deployed_refs[project]
+
+    def _cached(self, fetch: Callable[[], Any], structure: Any, *key: Any) -> Any:
+        """Returns the result of fetch(), reading it from and storing it in the
+        on-disk metadata cache if enabled.
+        """
+        result = self._cache_get(structure, *key)
+        if result is None:
+            result = fetch()
+            self._cache_set(result, *key)
+        return result
+
+    async def _cached_async(
+        self, fetch: Callable[[], Awaitable[Any]], structure: Any, *key: Any
+    ) -> Any:
+        """Async version of _cached()."""
+        result = self._cache_get(structure, *key)
+        if result is None:
+            result = await fetch()
+            self._cache_set(result, *key)
+        return result
+
+    def _cached_models(
+        self, fetch: Callable[[], Any], structure: Any, *key: Any
+    ) -> Any:
+        """Like _cached() for lookml models, which change when their project is
+        deployed. The deployed refs of their projects are cached with them, and
+        cached models are fetched again if any of the refs has changed.
+        """
+        result = self._cache_get(structure, *key)
+        if result is not None:
+            stored = cast(cache.MetadataCache, self.cache).get("refs", *key)
+            refs = json.loads(stored) if stored else None
+            if refs is not None and all(
+                self._get_deployed_ref(project) == ref for project, ref in refs.items()
+            ):
+                return result
+        result = fetch()
+        ml = [result] if isinstance(result, models.LookmlModel) else result
+        projects = {cast(str, m.project_name) for m in ml if m.project_name}
+        self._cache_set(result, *key)
+        self._cache_set({p: self._get_deployed_ref(p) for p in projects}, "refs", *key)
+        return result
+
+    def _cache_get(self, structure: Any, *key: Any) -> Any:
+        if not self.cache or self.refresh_cache:
+            return None
+        data = self.cache.get(*key)
+        if data is None:
+            return None
+        if structure is lookml.Explore:
+            return lookml.Explore.from_json(data)
+        return serialize.deserialize40(data=data, structure=structure)
+
+    def _cache_set(self, result: Any, *key: Any):
+        if not self.cache:
+            return
+        if isinstance(result, lookml.Explore):
+            self.cache.set(result.to_json(), *key)
+        else:
+            self.cache.set(json.dumps(result, default=_unstructure), *key)
 
     def get_used_explores(
         self, *, model: Optional[str] = None, explore: str = ""
@@ -169,8 +613,16 @@ class Fetcher:
         """Returns a dictionary with used explore names as keys and query count as
         values.
         """
-        resp = self.sdk.run_inline_query(
-            "json",
+        if self.usage_store:
+            self._sync_usage(usage_store.EXPLORE)
+            results: Dict[str, int] = {}
+            stored = self.usage_store.explore_usage(self.days, model=model)
+            for used_explores in stored.values():
+                for e, query_count in used_explores.items():
+                    if not explore or e == explore:
+                        results[e] = results.get(e, 0) + query_count
+            return results
+        _results = self._iter_history(
             models.WriteQuery(
                 model="i__looker",
                 view="history",
@@ -182,10 +634,9 @@ class Fetcher:
                     "query.view": explore,
                     "user.dev_mode": "No",
                 },
-                limit="5000",
             ),
+            paginate=False,
         )
-        _results: MutableSequence[Dict[str, int]] = json.loads(resp)
         results = {
             cast(str, r["query.view"]): r["history.query_run_count"] for r in _results
         }
@@ -202,13 +653,9 @@ class Fetcher:
         unused_explores = [e.name for e in _all if e.name not in used.keys()]
         return unused_explores
 
-    def get_explore_fields(self, explore: models.LookmlModelExplore) -> Sequence[str]:
+    def get_explore_fields(self, explore: lookml.Explore) -> Sequence[str]:
         """Return a list of non hidden fields for a given explore"""
-        fields = explore.fields
-        dimensions = [cast(str, f.name) for f in fields.dimensions if not f.hidden]  # type: ignore  # noqa: B950
-        measures = [cast(str, f.name) for f in fields.measures if not f.hidden]  # type: ignore  # noqa B950
-        result = sorted(list(set([*dimensions, *measures])))
-        return result
+        return list(explore.fields)
 
     def get_used_explore_fields(
         self, *, model: str, explore: str = ""
@@ -217,8 +664,74 @@ class Fetcher:
         number of times they were used in the specified timeframe as value.
         Should always be called with either model, or model and explore
         """
-        resp = self.sdk.run_inline_query(
-            "json",
+        used_fields: Dict[str, int] = {}
+        if self.usage_store:
+            stored = self.get_used_fields_by_explore(model=model)
+            for (_, e), fields in stored.items():
+                if not explore or e == explore:
+                    for f, query_count in fields.items():
+                        used_fields[f] = used_fields.get(f, 0) + query_count
+            return used_fields
+        return field_usage.count_fields(
+            self._get_field_usage(model=model, explore=explore)
+        )
+
+    def get_used_fields_by_explore(
+        self, *, model: Optional[str] = None
+    ) -> Dict[Tuple[str, str], Dict[str, int]]:
+        """Returns the field usage of every explore in a model (or in all models if
+        no model is given) keyed by (model, explore). All explores are covered by a
+        single query whose rows are partitioned per explore.
+        """
+        if self.usage_store:
+            self._sync_usage(usage_store.FIELD)
+            return self.usage_store.field_usage(self.days, model=model)
+        return field_usage.count_fields_by_explore(
+            self._get_field_usage(model=model or "")
+        )
+
+    def _sync_usage(self, kind: str):
+        """Fetches usage for the days of the timeframe that are missing from the
+        usage store, one query per day. Runs at most once per kind of usage.
+        """
+        assert self.usage_store
+        if kind in self._synced_usage:
+            return
+        days = self.usage_store.missing_days(kind, self.days)
+        if kind == usage_store.EXPLORE:
+            fetch = self._get_daily_explore_usage
+        else:
+            fetch = self._get_daily_field_usage
+        for day, usage in zip(days, self._map_concurrently(fetch, days)):
+            self.usage_store.save_day(kind, day, usage)
+        self.usage_store.prune()
+        self._synced_usage.add(kind)
+
+    def _get_daily_explore_usage(self, day: str) -> List[Tuple[str, str, str, int]]:
+        """Returns (model, explore, "", query count) rows for one day."""
+        usage = self._query_explore_usage(model="", created_date=day)
+        return [
+            (m, e, "", query_count)
+            for m, used_explores in usage.items()
+            for e, query_count in used_explores.items()
+        ]
+
+    def _get_daily_field_usage(self, day: str) -> List[Tuple[str, str, str, int]]:
+        """Returns (model, explore, field, query count) rows for one day."""
+        used_fields = field_usage.count_fields_by_explore(
+            self._get_field_usage(model="", created_date=day)
+        )
+        return [
+            (m, e, f, query_count)
+            for (m, e), fields in used_fields.items()
+            for f, query_count in fields.items()
+        ]
+
+    def _get_field_usage(
+        self, *, model: str, explore: str = "", created_date: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Yields history rows with the fields and filters of each query run."""
+        return self._iter_history(
             models.WriteQuery(
                 model="i__looker",
                 view="history",
@@ -230,58 +743,84 @@ class Fetcher:
                     "history.query_run_count",
                 ],
                 filters={
-                    "history.created_date": self.timeframe,
+                    "history.created_date": created_date or self.timeframe,
                     "query.model": model.replace("_", "^_"),
                     "query.view": explore.replace("_", "^_") if explore else "",
                     "query.formatted_fields": "-NULL",
                     "history.workspace_id": "production",
                 },
-                limit="5000",
             ),
         )
-        data = json.loads(resp)
-        used_fields: Dict[str, int] = {}
-        for row in data:
-            model = row["query.model"]
-            explore = row["query.view"]
-            fields = re.findall(r"(\w+\.\w+)", row["query.formatted_fields"])
-            recorded = []
-            for f in fields:
-                if used_fields.get(f):
-                    used_fields[f] += row["history.query_run_count"]
-                else:
-                    used_fields[f] = row["history.query_run_count"]
-                recorded.append(f)
-
-            # A field used as a filter in a query is not listed in
-            # query.formatted_fields BUT if the field is used as both a filter
-            # and a dimension/measure, it's listed in both query.formatted_fields
-            # and query.formatted_filters. The recorded variable keeps track of
-            # this, so that no double counting occurs.
-            filters = row["query.formatted_filters"]
-            if filters:
-                parsed_filters = re.findall(r"(\w+\.\w+)+", filters)
-                for f in parsed_filters:
-                    if f in recorded:
-                        continue
-                    elif used_fields.get(f):
-                        used_fields[f] += row["history.query_run_count"]
-                    else:
-                        used_fields[f] = row["history.query_run_count"]
-        return used_fields
+
+    def _iter_history(
+        self,
+        query: models.WriteQuery,
+        *,
+        paginate: bool = True,
+        page_size: int = HISTORY_PAGE_SIZE,
+    ) -> Iterator[Dict[str, Any]]:
+        """Runs an i__looker query and yields its rows one page at a time.
+
+        Paginated queries are grouped and sorted by query.id and every page only
+        asks for ids greater than the last one seen, so results are never cut off
+        at the row limit. Queries that can't be paginated this way (e.g. counts
+        grouped by model) are run once and a warning is printed if they hit the
+        row limit.
+        """
+        fields = list(query.fields or [])
+        if paginate and "query.id" not in fields:
+            fields.append("query.id")
+        filters = dict(query.filters or {})
+        pages = 0
+        while True:
+            resp = self.sdk.run_inline_query(
+                "json",
+                models.WriteQuery(
+                    model=query.model,
+                    view=query.view,
+                    fields=fields,
+                    filters=filters,
+                    sorts=["query.id"] if paginate else query.sorts,
+                    limit=str(page_size),
+                ),
+            )
+            page: MutableSequence[Dict[str, Any]] = json.loads(resp)
+            pages += 1
+            yield from page
+            if len(page) < page_size:
+                break
+            elif not paginate:
+                # Messages go to stderr so they don't mix with rows streamed to
+                # stdout with --output -
+                print(
+                    f"Warning: query history results were truncated at {page_size} "
+                    "rows.",
+                    file=sys.stderr,
+                )
+                break
+            filters["query.id"] = f">{page[-1]['query.id']}"
+        if pages > 1 and not self.quiet:
+            print(
+                f"Read query history in {pages} pages of {page_size} rows.",
+                file=sys.stderr,
+            )
 
     def get_explore_field_stats(
-        self, explore: models.LookmlModelExplore
+        self,
+        explore: lookml.Explore,
+        field_usage: Optional[Dict[Tuple[str, str], Dict[str, int]]] = None,
     ) -> Dict[str, int]:
         """Return a dictionary with all exposed field names as keys and field query
-        count as values.
+        count as values. Field usage is queried for the explore unless an index
+        built by get_used_fields_by_explore() is passed as field_usage.
         """
-        assert isinstance(explore.model_name, str)
-        assert isinstance(explore.name, str)
         all_fields = self.get_explore_fields(explore=explore)
-        field_stats = self.get_used_explore_fields(
-            model=explore.model_name, explore=explore.name
-        )
+        if field_usage is None:
+            field_stats = self.get_used_explore_fields(
+                model=explore.model_name, explore=explore.name
+            )
+        else:
+            field_stats = dict(field_usage.get((explore.model_name, explore.name), {}))
 
         for field in all_fields:
             if not field_stats.get(field):
@@ -290,12 +829,10 @@ class Fetcher:
         return field_stats
 
     def get_explore_join_stats(
-        self, *, explore: models.LookmlModelExplore, field_stats: Dict[str, int]
+        self, *, explore: lookml.Explore, field_stats: Dict[str, int]
     ) -> Dict[str, int]:
         """Returns dict containing stats about all joins in an explore."""
-        assert isinstance(explore.scopes, MutableSequence)
-        all_joins = explore.scopes
-        all_joins.remove(explore.name)
+        all_joins = [s for s in explore.scopes if s != explore.name]
         join_stats: Dict[str, int] = {}
         if all_joins:
             for field, query_count in field_stats.items():
@@ -314,7 +851,24 @@ class Fetcher:
 
     def run_git_connection_tests(self, project_id: str):
         """Run all git connection tests for a given project."""
+        with self.dev_workspace():
+            return self._run_git_connection_tests(project_id)
+
+    @contextlib.contextmanager
+    def dev_workspace(self) -> Iterator[None]:
+        """Switches the API session to the dev workspace for the duration of the
+        block, e.g. to run git connection tests for many projects at once.
+        """
         self.sdk.update_session(models.WriteApiSession(workspace_id="dev"))
+        try:
+            yield
+        finally:
+            self.sdk.update_session(models.WriteApiSession(workspace_id="production"))
+
+    def _run_git_connection_tests(self, project_id: str) -> str:
+        """Runs all git connection tests for a project. The session must already
+        be in the dev workspace.
+        """
         supported_tests = self.sdk.all_git_connection_tests(project_id)
         results = []
         for test in supported_tests:
@@ -323,11 +877,38 @@ class Fetcher:
             results.append(resp)
             if resp.status != "pass":
                 break
-        self.sdk.update_session(models.WriteApiSession(workspace_id="production"))
         errors = list(filter(lambda r: r.status != "pass", results))
         formatted_results = [f"{r.id} ({r.status})" for r in results]
         return "\n".join(formatted_results) if errors else "OK"
 
+    def _map_concurrently(
+        self, fn: Callable[[Any], T], items: Sequence[Any]
+    ) -> List[T]:
+        """Applies fn to every item using up to self.concurrency threads and returns
+        the results in the same order as items. If a call raises, calls that have
+        not started yet are cancelled and the exception is re-raised.
+        """
+        return list(self._imap_concurrently(fn, items))
+
+    def _imap_concurrently(
+        self, fn: Callable[[Any], T], items: Sequence[Any]
+    ) -> Iterator[T]:
+        """Like _map_concurrently() but yields each result as soon as it and all
+        results before it are available.
+        """
+        if self.concurrency == 1 or len(items) <= 1:
+            yield from (fn(i) for i in items)
+            return
+        with futures.ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            tasks = [pool.submit(fn, i) for i in items]
+            try:
+                for t in tasks:
+                    yield t.result()
+            except BaseException:
+                for t in tasks:
+                    t.cancel()
+                raise
+
     def _filter(
         self, data: Optional[Dict[str, int]], condition: Optional[Callable] = None
     ) -> Dict[str, int]:
@@ -355,56 +936,199 @@ class Fetcher:
         self, data: Sequence[Dict[str, Union[int, str, bool]]]
     ) -> Sequence[Dict[str, Union[int, str, bool]]]:
         """Sorts results as specified by user"""
-        if self.sortkey:
-            sort_key = self.sortkey[0]
-            if sort_key not in data[0].keys():
-                raise KeyError(f"Sort field {sort_key} not found.")
+        if self.sortkey and data:
+            # Sorting is stable, so sorting by each key from last to first sorts by
+            # all of them
+            for sort_key, sort_type in reversed(self._sort_keys(data[0])):
+                data = sorted(data, key=itemgetter(sort_key), reverse=sort_type)
+        return data
+
+    def _top(
+        self, data: Iterable[Dict[str, Union[int, str, bool]]]
+    ) -> Sequence[Dict[str, Union[int, str, bool]]]:
+        """Returns the first self.limit results as sorted by _sort(), keeping only
+        that many results in memory while consuming data.
+        """
+        rows = iter(data)
+        first = next(rows, None)
+        if first is None:
+            return []
+        return heapq.nsmallest(
+            cast(int, self.limit),
+            itertools.chain([first], rows),
+            key=functools.cmp_to_key(_row_comparator(self._sort_keys(first))),
+        )
 
-            sort_types = {"ASC": False, "DESC": True}
-            if self.sortkey[1].upper() not in sort_types.keys():
-                raise KeyError(f"Unrecognized sort type: {self.sortkey[1]}.")
-            sort_type = sort_types[self.sortkey[1].upper()]
+    def _sort_keys(
+        self, row: Dict[str, Union[int, str, bool]]
+    ) -> List[Tuple[str, bool]]:
+        """Returns the sort keys specified by user as (field, descending) pairs
+        after checking them against a result row.
+        """
+        assert self.sortkey
+        sortkeys = self.sortkey
+        # A single sort key can be given on its own rather than in a list
+        if isinstance(sortkeys[0], str):
+            sortkeys = [sortkeys]
+        sort_types = {"ASC": False, "DESC": True}
+        keys = []
+        for sort_key, sort_type in sortkeys:
+            if sort_key not in row.keys():
+                raise KeyError(f"Sort field {sort_key} not found.")
+            if sort_type.upper() not in sort_types.keys():
+                raise KeyError(f"Unrecognized sort type: {sort_type}.")
+            keys.append((sort_key, sort_types[sort_type.upper()]))
+        return keys
 
-            data = sorted(data, key=itemgetter(sort_key), reverse=sort_type)
+    def _order(
+        self, data: Iterable[Dict[str, Union[int, str, bool]]]
+    ) -> Iterable[Dict[str, Union[int, str, bool]]]:
+        """Sorts and limits results as specified by user. Results are only held in
+        memory when sorting, and only the top ones if also limiting.
+        """
+        if self.sortkey and self.limit:
+            return self._top(data)
+        if self.sortkey:
+            return self._sort(list(data))
+        if self.limit:
+            return itertools.islice(data, self.limit)
         return data
 
-    def _save_to_file(self, data: Sequence[Dict[str, Union[int, str]]]):
-        """Save results to a file with name {command}_date_time.csv"""
+    def _save_to_file(self, data: Sequence[Dict[str, Union[int, str, bool]]]):
+        """Save results to a file with name {command}_date_time.{format}"""
+        with writers.open_writer(self.output_format, self._save_path()) as writer:
+            for row in data:
+                writer.write(row)
+
+    def _save_path(self) -> str:
         date = datetime.datetime.now().strftime("%y%m%d_%H%M%S")
-        filename = f"{self.cmd}_{date}.csv"
-        with open(filename, "w", newline="") as csvfile:
-            # Replace "\n" which is required when printing, with ','
-            data = list(
-                map(
-                    lambda x: {k: str(v).replace("\n", ",") for k, v in x.items()},
-                    data,
-                )
-            )
-            writer = csv.DictWriter(csvfile, fieldnames=data[0].keys())
-            writer.writeheader()
-            writer.writerows(data)
+        return f"{self.cmd}_{date}.{self.output_format}"
 
-    def _tabularize_and_print(
-        self, data: Sequence[Dict[str, Union[int, str, bool]]],
-    ):
+    def _tabularize_and_print(self, data: Sequence[Mapping[str, Any]]):
         """Prints data in tabular form."""
+        print(f"\b{self._tabularize(data)}", end="\n" * 2)
+
+    def _tabularize(self, data: Sequence[Mapping[str, Any]]) -> str:
+        """Returns data in tabular form."""
         if not data:
-            print("\bNo results found.", end="\n" * 2)
-        else:
-            result = tabulate.tabulate(
-                data, headers="keys", tablefmt="psql", numalign="center"
-            )
-            print(f"\b{result}", end="\n" * 2)
+            return "No results found."
+        return tabulate.tabulate(
+            data, headers="keys", tablefmt="psql", numalign="center"
+        )
 
-    def output(self, data: Sequence[Dict[str, Union[int, str, bool]]]):
-        """Output generated results and/or save"""
-        data = self._sort(data)
-        data = self._limit(data)
+    def output(self, data: Iterable[Dict[str, Union[int, str, bool]]]):
+        """Output generated results and/or save. If an output path was given or in
+        progressive mode, rows are written as they are generated unless they need
+        to be sorted.
+        """
+        if self.output_path or (self.progressive and not self.quiet):
+            self._stream(data)
+            return
+        with spinner.Spinner():
+            data = list(self._order(data))
         if self.save:
             self._save_to_file(data)
         if not self.quiet:
             self._tabularize_and_print(data)
 
+    def _stream(self, data: Iterable[Dict[str, Union[int, str, bool]]]):
+        """Writes rows to the output path, or prints them as a table and saves
+        them, one at a time.
+        """
+        data = self._order(data)
+        with contextlib.ExitStack() as stack:
+            outputs: List[writers.Writer] = []
+            if self.output_path:
+                outputs.append(
+                    writers.open_writer(self.output_format, self.output_path)
+                )
+            else:
+                outputs.append(writers.TableWriter())
+                if self.save:
+                    outputs.append(
+                        writers.open_writer(self.output_format, self._save_path())
+                    )
+            for writer in outputs:
+                stack.enter_context(writer)
+            for row in data:
+                for writer in outputs:
+                    writer.write(row)
+
+
+def exit_on_instance_errors(sections: Sequence[str], errors: Dict[str, Exception]):
+    """Prints the errors of instances that failed, in section order, and exits
+    with status 1 if there were any.
+    """
+    for section in sections:
+        if section in errors:
+            print(f"Error on instance {section}: {errors[section]}", file=sys.stderr)
+    if errors:
+        sys.exit(1)
+
+
+def _row_comparator(
+    keys: Sequence[Tuple[str, bool]]
+) -> Callable[[Dict[str, Any], Dict[str, Any]], int]:
+    """Returns a function comparing two rows by (field, descending) sort keys."""
+
+    def compare(a: Dict[str, Any], b: Dict[str, Any]) -> int:
+        for sort_key, descending in keys:
+            if a[sort_key] != b[sort_key]:
+                result = -1 if a[sort_key] < b[sort_key] else 1
+                return -result if descending else result
+        return 0
+
+    return compare
+
+
+class _JitteredRetry(retry.Retry):
+    """Retry that waits a random time of up to the exponential backoff ("full
+    jitter") so that concurrent workers don't retry in lockstep.
+
+    Besides idempotent requests, POST requests to memo.READ_ONLY_POSTS, such as
+    query runs, are retried since they only read data. Other POST requests and
+    calls to NO_RETRY_PATHS are only retried if they couldn't connect.
+    """
+
+    def get_backoff_time(self) -> float:
+        return random.uniform(0, super().get_backoff_time())
+
+    def increment(
+        self,
+        method: Optional[str] = None,
+        url: Optional[str] = None,
+        response: Any = None,
+        error: Optional[Exception] = None,
+        _pool: Any = None,
+        _stacktrace: Any = None,
+    ) -> "_JitteredRetry":
+        args = (method, url, response, error, _pool, _stacktrace)
+        if not _may_resend(method, url) and not (
+            error and self._is_connection_error(error)
+        ):
+            # What requests does without retries: read errors are raised as is
+            # and responses returned
+            no_retries = self.new(total=0, read=False, raise_on_status=False)
+            return retry.Retry.increment(no_retries, *args)
+        return super().increment(*args)
+
+
+def _may_resend(method: Optional[str], url: Optional[str]) -> bool:
+    """Whether a call that may have reached the API can be sent again."""
+    path = urllib.parse.urlsplit(url or "").path
+    if path.endswith(NO_RETRY_PATHS):
+        return False
+    if method == "POST":
+        return any(p in path for p in memo.READ_ONLY_POSTS)
+    return True
+
+
+def _unstructure(obj: Any) -> Any:
+    """Converts SDK models nested in API results to JSON serializable values."""
+    if isinstance(obj, enum.Enum):
+        return obj.value
+    return serialize.converter40.unstructure(obj)
+
 
 class Input(NamedTuple):
     command: str
@@ -414,10 +1138,32 @@ class Input(NamedTuple):
     explore: Optional[str] = None
     timeframe: Optional[int] = 90
     min_queries: Optional[int] = 0
-    sortkey: Optional[Tuple[str, str]] = None
+    sortkey: Optional[Sequence[Tuple[str, str]]] = None
     limit: Optional[Sequence[int]] = None
     config_file: str = "looker.ini"
     section: str = "Looker"
     quiet: bool = False
     save: Optional[bool] = False
     timeout: Optional[int] = 120
+    concurrency: Optional[int] = 10
+    cache: bool = True
+    refresh_cache: bool = False
+    cache_ttl: int = 3600
+    incremental: bool = False
+    transport: str = "sync"
+    retries: int = 3
+    backoff: float = 0.5
+    connection_timeout: Optional[int] = 60
+    output_format: str = "csv"
+    output_path: Optional[str] = None
+    progressive: bool = False
+    token_cache: bool = False
+    profile: bool = False
+    trace_file: Optional[str] = None
+    record: Optional[str] = None
+    replay: Optional[str] = None
+    sections: Optional[Sequence[str]] = None
+    host: str = "127.0.0.1"
+    port: int = 8765
+    socket_path: Optional[str] = None
+    refresh_interval: int = 600
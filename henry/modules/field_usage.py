@@ -0,0 +1,63 @@
+import functools
+import re
+import sys
+from collections import defaultdict
+from typing import Any, DefaultDict, Dict, Iterable, Optional, Tuple
+
+FIELD_PATTERN = re.compile(r"\w+\.\w+")
+
+# The same formatted_fields/formatted_filters pair shows up once per model, day or
+# page of history it was run in, so recently parsed pairs are memoized.
+PARSE_CACHE_SIZE = 1 << 16
+
+
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_fields(
+    formatted_fields: str, formatted_filters: Optional[str] = None
+) -> Tuple[str, ...]:
+    """Returns the view.field names a query used, once per use.
+
+    A field used as a filter in a query is not listed in query.formatted_fields
+    BUT if the field is used as both a filter and a dimension/measure, it's listed
+    in both query.formatted_fields and query.formatted_filters. Filter fields that
+    are also selected are skipped so that no double counting occurs.
+    """
+    fields = FIELD_PATTERN.findall(formatted_fields)
+    if formatted_filters:
+        selected = set(fields)
+        fields.extend(
+            f for f in FIELD_PATTERN.findall(formatted_filters) if f not in selected
+        )
+    return tuple(map(sys.intern, fields))
+
+
+def count_fields(rows: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+    """Returns the query count of every field used in the history rows."""
+    used_fields: DefaultDict[str, int] = defaultdict(int)
+    for row in rows:
+        query_count = row["history.query_run_count"]
+        for f in parse_fields(
+            row["query.formatted_fields"], row["query.formatted_filters"]
+        ):
+            used_fields[f] += query_count
+    return dict(used_fields)
+
+
+def count_fields_by_explore(
+    rows: Iterable[Dict[str, Any]]
+) -> Dict[Tuple[str, str], Dict[str, int]]:
+    """Returns the query count of every field used in the history rows keyed by
+    (model, explore).
+    """
+    by_explore: Dict[Tuple[str, str], DefaultDict[str, int]] = {}
+    for row in rows:
+        key = (str(row["query.model"]), str(row["query.view"]))
+        used_fields = by_explore.get(key)
+        if used_fields is None:
+            used_fields = by_explore[key] = defaultdict(int)
+        query_count = row["history.query_run_count"]
+        for f in parse_fields(
+            row["query.formatted_fields"], row["query.formatted_filters"]
+        ):
+            used_fields[f] += query_count
+    return {key: dict(used_fields) for key, used_fields in by_explore.items()}
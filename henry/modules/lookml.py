@@ -0,0 +1,72 @@
+import json
+import sys
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from looker_sdk.sdk.api40 import models
+
+
+class Explore:
+    """The parts of an explore henry uses: its name, model, whether it's hidden,
+    its description, its joins (scopes) and its non hidden fields, sorted.
+
+    Explores with thousands of fields take a lot of memory as SDK models, which
+    also hold every field's SQL, labels, links etc. An Explore is built as soon as
+    an explore is fetched, keeping only names, which are interned since the same
+    view and field names recur across explores.
+    """
+
+    __slots__ = ("model_name", "name", "hidden", "description", "scopes", "fields")
+
+    def __init__(
+        self,
+        model_name: str,
+        name: str,
+        hidden: bool = False,
+        description: Optional[str] = None,
+        scopes: Iterable[str] = (),
+        fields: Iterable[str] = (),
+    ):
+        self.model_name = sys.intern(model_name)
+        self.name = sys.intern(name)
+        self.hidden = hidden
+        self.description = description
+        self.scopes: Tuple[str, ...] = tuple(sys.intern(s) for s in scopes)
+        self.fields: Tuple[str, ...] = tuple(sorted({sys.intern(f) for f in fields}))
+
+    @classmethod
+    def from_sdk(cls, explore: models.LookmlModelExplore) -> "Explore":
+        fields = explore.fields
+        return cls(
+            model_name=explore.model_name or "",
+            name=explore.name or "",
+            hidden=bool(explore.hidden),
+            description=explore.description,
+            scopes=explore.scopes or (),
+            # SDK models define __len__, which unstructures them, so truth testing
+            # them is slow
+            fields=(
+                f.name
+                for f in [*(fields.dimensions or []), *(fields.measures or [])]
+                if f.name and not f.hidden
+            )
+            if fields is not None
+            else (),
+        )
+
+    @classmethod
+    def from_json(cls, data: str) -> "Explore":
+        return cls(**json.loads(data))
+
+    def to_json(self) -> str:
+        return json.dumps(self._asdict(), separators=(",", ":"))
+
+    def _asdict(self) -> Dict[str, Any]:
+        return {s: getattr(self, s) for s in self.__slots__}
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Explore):
+            return NotImplemented
+        return self._asdict() == other._asdict()
+
+    def __repr__(self) -> str:
+        return f"Explore({self.model_name!r}, {self.name!r})"
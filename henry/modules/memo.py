@@ -0,0 +1,127 @@
+import collections
+import json
+import threading
+from concurrent import futures
+from typing import Any, Dict, MutableMapping, Optional, Tuple
+
+from looker_sdk.rtl import requests_transport, transport
+
+MAX_SIZE = 64 * 1024 * 1024  # bytes
+# Calls that read data without changing it, besides GET requests
+READ_ONLY_POSTS = ("/queries/run/",)
+# Calls that change nothing the other calls return
+NEUTRAL_PATHS = ("/login", "/logout")
+
+TKey = Tuple[str, str, str, Optional[bytes]]
+
+
+class MemoizingTransport(requests_transport.RequestsTransport):
+    """RequestsTransport that answers a call it has already made from memory, for
+    the lifetime of the transport.
+
+    Only successful GET requests and query runs are memoized, keyed on the method,
+    path, query parameters and body. Identical calls made concurrently are sent
+    once, the others waiting for its response. Any other call, e.g. switching to
+    the dev workspace, may change what the API returns so it forgets all responses.
+    Responses are evicted least recently used first once they add up to more than
+    max_size bytes.
+    """
+
+    def __init__(
+        self,
+        settings: transport.PTransportSettings,
+        session: Any,
+        max_size: int = MAX_SIZE,
+    ):
+        super().__init__(settings, session)
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self._responses: "collections.OrderedDict[TKey, transport.Response]" = (
+            collections.OrderedDict()
+        )
+        self._in_flight: Dict[TKey, futures.Future] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def request(
+        self,
+        method: transport.HttpMethod,
+        path: str,
+        query_params: Optional[MutableMapping[str, str]] = None,
+        body: Optional[bytes] = None,
+        authenticator: transport.TAuthenticator = None,
+        transport_options: Optional[transport.TransportOptions] = None,
+    ) -> transport.Response:
+        args = (method, path, query_params, body, authenticator, transport_options)
+        if not _is_read_only(method, path):
+            if not path.endswith(NEUTRAL_PATHS):
+                self.clear()
+            return super().request(*args)
+
+        key: TKey = (
+            method.name,
+            path,
+            json.dumps(query_params or {}, sort_keys=True, default=str),
+            body,
+        )
+        with self._lock:
+            response = self._responses.get(key)
+            if response is not None:
+                self._responses.move_to_end(key)
+                self.hits += 1
+                return response
+            pending = self._in_flight.get(key)
+            if pending is None:
+                future: futures.Future = futures.Future()
+                self._in_flight[key] = future
+                generation = self._generation
+            else:
+                self.hits += 1
+        if pending is not None:
+            return pending.result()
+
+        try:
+            response = super().request(*args)
+        except BaseException as e:
+            with self._lock:
+                self._forget_in_flight(key, future)
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._forget_in_flight(key, future)
+            if response.ok and generation == self._generation:
+                self._store(key, response)
+        future.set_result(response)
+        return response
+
+    def clear(self):
+        """Forgets all responses. Calls in flight are not memoized when they return."""
+        with self._lock:
+            self._responses.clear()
+            self._in_flight.clear()
+            self.size = 0
+            self._generation += 1
+
+    def _forget_in_flight(self, key: TKey, future: futures.Future):
+        # The same call may have been made again since the responses were cleared
+        if self._in_flight.get(key) is future:
+            del self._in_flight[key]
+
+    def _store(self, key: TKey, response: transport.Response):
+        size = len(response.value)
+        if size > self.max_size:
+            return
+        self._responses[key] = response
+        self.size += size
+        while self.size > self.max_size:
+            _, evicted = self._responses.popitem(last=False)
+            self.size -= len(evicted.value)
+
+
+def _is_read_only(method: transport.HttpMethod, path: str) -> bool:
+    if method == transport.HttpMethod.GET:
+        return True
+    return method == transport.HttpMethod.POST and any(
+        p in path for p in READ_ONLY_POSTS
+    )
@@ -0,0 +1,202 @@
+import base64
+import contextlib
+import gzip
+import json
+import threading
+import urllib.parse
+from typing import Any, Dict, Iterator, List, MutableMapping, Optional, Tuple
+
+from looker_sdk.rtl import transport
+
+VERSION = 1
+# Calls that are not recorded, so that no access token ends up in a snapshot
+UNRECORDED_PATHS = ("/login", "/logout")
+
+TKey = Tuple[str, str, str, str]
+
+_recording: Optional["Snapshot"] = None
+_replaying: Optional["Snapshot"] = None
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class Snapshot:
+    """API responses of a run, keyed on the method, path, query parameters and
+    body of the call that returned them. Saved as gzipped JSON.
+    """
+
+    def __init__(self, base_url: str = ""):
+        self.base_url = base_url
+        self.responses: Dict[TKey, List[transport.Response]] = {}
+        self._replayed: Dict[TKey, int] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str) -> "Snapshot":
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            raise SnapshotError(f"Could not read snapshot {path}: {e}") from e
+        if not isinstance(data, dict) or data.get("version") != VERSION:
+            raise SnapshotError(f"Unsupported snapshot version in {path}.")
+        snapshot = cls(data["base_url"])
+        for *key, ok, mode, encoding, value in data["responses"]:
+            response = transport.Response(
+                ok, _decode(value, mode), transport.ResponseMode[mode], encoding
+            )
+            snapshot.responses.setdefault(tuple(key), []).append(response)
+        return snapshot
+
+    def save(self, path: str):
+        responses = [
+            [
+                *key,
+                response.ok,
+                response.response_mode.name,
+                response.encoding,
+                _encode(response.value, response.response_mode.name),
+            ]
+            for key, recorded in self.responses.items()
+            for response in recorded
+        ]
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump(
+                {"version": VERSION, "base_url": self.base_url, "responses": responses},
+                f,
+                separators=(",", ":"),
+            )
+
+    def record(self, key: TKey, response: transport.Response):
+        with self._lock:
+            self.responses.setdefault(key, []).append(response)
+
+    def replay(self, key: TKey) -> transport.Response:
+        """Returns the responses recorded for a call in the order they were
+        recorded, repeating the last one once they have all been returned.
+        """
+        with self._lock:
+            recorded = self.responses.get(key)
+            if not recorded:
+                method, path, params, _ = key
+                raise SnapshotError(
+                    f"The snapshot has no response for {method} {path} {params}. "
+                    "Record it again with the same command and options."
+                )
+            i = self._replayed.get(key, 0)
+            self._replayed[key] = i + 1
+            return recorded[min(i, len(recorded) - 1)]
+
+
+class _SnapshotTransport(transport.Transport):
+    @classmethod
+    def configure(cls, settings: transport.PTransportSettings) -> transport.Transport:
+        raise NotImplementedError("Snapshot transports are created with a snapshot.")
+
+
+class RecordingTransport(_SnapshotTransport):
+    """Transport that makes calls with another transport and records their
+    responses in a snapshot.
+    """
+
+    def __init__(self, inner: transport.Transport, snapshot: Snapshot):
+        self.inner = inner
+        self.snapshot = snapshot
+
+    def request(
+        self,
+        method: transport.HttpMethod,
+        path: str,
+        query_params: Optional[MutableMapping[str, str]] = None,
+        body: Optional[bytes] = None,
+        authenticator: transport.TAuthenticator = None,
+        transport_options: Optional[transport.TransportOptions] = None,
+    ) -> transport.Response:
+        response = self.inner.request(
+            method, path, query_params, body, authenticator, transport_options
+        )
+        if not path.endswith(UNRECORDED_PATHS):
+            self.snapshot.record(_key(method, path, query_params, body), response)
+        return response
+
+
+class ReplayTransport(_SnapshotTransport):
+    """Transport that answers calls from a snapshot, without any network access."""
+
+    def __init__(self, snapshot: Snapshot):
+        self.snapshot = snapshot
+
+    def request(
+        self,
+        method: transport.HttpMethod,
+        path: str,
+        query_params: Optional[MutableMapping[str, str]] = None,
+        body: Optional[bytes] = None,
+        authenticator: transport.TAuthenticator = None,
+        transport_options: Optional[transport.TransportOptions] = None,
+    ) -> transport.Response:
+        return self.snapshot.replay(_key(method, path, query_params, body))
+
+
+def _key(
+    method: transport.HttpMethod,
+    path: str,
+    query_params: Optional[MutableMapping[str, Any]],
+    body: Optional[bytes],
+) -> TKey:
+    # Only the path is kept from the URL so snapshots don't depend on the host
+    return (
+        method.name,
+        urllib.parse.urlsplit(path).path,
+        json.dumps(
+            {k: v for k, v in (query_params or {}).items() if v is not None},
+            sort_keys=True,
+            default=str,
+        ),
+        body.decode("utf-8") if isinstance(body, bytes) else body or "",
+    )
+
+
+def _encode(value: bytes, mode: str) -> str:
+    if mode == "BINARY":
+        return base64.b64encode(value).decode("ascii")
+    return value.decode("utf-8", "surrogateescape")
+
+
+def _decode(value: str, mode: str) -> bytes:
+    if mode == "BINARY":
+        return base64.b64decode(value)
+    return value.encode("utf-8", "surrogateescape")
+
+
+def recording() -> Optional[Snapshot]:
+    """Returns the snapshot API responses should be recorded in, if any."""
+    return _recording
+
+
+def replaying() -> Optional[Snapshot]:
+    """Returns the snapshot API calls should be answered from, if any."""
+    return _replaying
+
+
+@contextlib.contextmanager
+def use(record: Optional[str] = None, replay: Optional[str] = None) -> Iterator[None]:
+    """Records the API responses of the block to the file record, or answers API
+    calls from the snapshot file replay. A recording is only saved if the block
+    completes.
+    """
+    global _recording, _replaying
+    if record and replay:
+        raise ValueError("A snapshot can't be recorded while replaying another.")
+    try:
+        if replay:
+            _replaying = Snapshot.load(replay)
+        elif record:
+            _recording = Snapshot()
+        yield
+        if _recording and record:
+            _recording.save(record)
+    finally:
+        _recording = _replaying = None
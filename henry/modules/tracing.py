@@ -0,0 +1,204 @@
+import contextlib
+import json
+import sys
+import threading
+import time
+import urllib.parse
+from typing import IO, Any, Dict, Iterator, List, NamedTuple, Optional, cast
+
+import requests
+import tabulate
+
+# Path segments followed by an id, e.g. /lookml_models/{lookml_model_name}
+ID_COLLECTIONS = {
+    "connections",
+    "dashboards",
+    "explores",
+    "git_connection_tests",
+    "legacy_features",
+    "looks",
+    "lookml_models",
+    "projects",
+    "run",
+    "users",
+}
+
+_active: Optional["Tracer"] = None
+
+
+class Call(NamedTuple):
+    """An API call, with times in seconds since the tracer started."""
+
+    endpoint: str
+    url: str
+    status: int
+    start: float
+    duration: float
+    size: int
+    retries: int
+    thread: str
+
+
+class Tracer:
+    """Records every API call made while it is active: its endpoint, status,
+    latency, response size and the number of times it was retried.
+    """
+
+    def __init__(self):
+        self.calls: List[Call] = []
+        self.started = time.perf_counter()
+        self.wall_time = 0.0
+        self._lock = threading.Lock()
+
+    def hook(self, response: requests.Response, **kwargs: Any):
+        """requests response hook that records the call. Its latency includes
+        retries and reading the response body.
+        """
+        now = time.perf_counter()
+        size = len(response.content)
+        retries = getattr(response.raw, "retries", None)
+        self.record(
+            cast(str, response.request.method),
+            cast(str, response.request.url),
+            response.status_code,
+            now - response.elapsed.total_seconds(),
+            time.perf_counter(),
+            size,
+            len(retries.history) if retries else 0,
+        )
+
+    def record(
+        self,
+        method: str,
+        url: str,
+        status: int,
+        start: float,
+        end: float,
+        size: int,
+        retries: int = 0,
+    ):
+        """Records a call that ran from start to end (time.perf_counter() values)."""
+        call = Call(
+            endpoint=endpoint(method, url),
+            url=url,
+            status=status,
+            start=start - self.started,
+            duration=end - start,
+            size=size,
+            retries=retries,
+            thread=threading.current_thread().name,
+        )
+        with self._lock:
+            self.calls.append(call)
+
+    def stop(self):
+        self.wall_time = time.perf_counter() - self.started
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Returns a row per endpoint, the slowest in total first."""
+        endpoints: Dict[str, List[Call]] = {}
+        for call in self.calls:
+            endpoints.setdefault(call.endpoint, []).append(call)
+        rows = [
+            {
+                "Endpoint": name,
+                "Calls": len(calls),
+                "Errors": sum(c.status >= 400 for c in calls),
+                "Retries": sum(c.retries for c in calls),
+                "Total (s)": round(sum(c.duration for c in calls), 3),
+                "Mean (ms)": round(sum(c.duration for c in calls) / len(calls) * 1e3),
+                "Max (ms)": round(max(c.duration for c in calls) * 1e3),
+                "Received (KB)": round(sum(c.size for c in calls) / 1024),
+            }
+            for name, calls in endpoints.items()
+        ]
+        return sorted(rows, key=lambda r: r["Total (s)"], reverse=True)
+
+    def report(self, file: IO[str] = sys.stderr):
+        """Prints the summary and how much of the run's time was spent in calls."""
+        api_time = sum(c.duration for c in self.calls)
+        file.write(
+            "\n"
+            + tabulate.tabulate(self.summary(), headers="keys", tablefmt="psql")
+            + f"\n{len(self.calls)} API calls took {api_time:.2f}s in a run of "
+            f"{self.wall_time:.2f}s, {api_time / (self.wall_time or 1):.1f} calls in "
+            "flight on average.\n"
+        )
+
+    def write_chrome_trace(self, path: str):
+        """Writes the calls in the Trace Event Format that chrome://tracing and
+        Perfetto open. Calls are laid out on as many rows as were in flight at
+        once, so gaps and single rows show where calls ran one after another.
+        """
+        events: List[Dict[str, Any]] = []
+        lanes: List[float] = []
+        for call in sorted(self.calls, key=lambda c: c.start):
+            lane = next((i for i, end in enumerate(lanes) if end <= call.start), None)
+            if lane is None:
+                lane = len(lanes)
+                lanes.append(0.0)
+            lanes[lane] = call.start + call.duration
+            events.append(
+                {
+                    "name": call.endpoint,
+                    "cat": "api",
+                    "ph": "X",
+                    "ts": round(call.start * 1e6),
+                    "dur": round(call.duration * 1e6),
+                    "pid": 1,
+                    "tid": lane,
+                    "args": {
+                        "url": call.url,
+                        "status": call.status,
+                        "bytes": call.size,
+                        "retries": call.retries,
+                        "thread": call.thread,
+                    },
+                }
+            )
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+def endpoint(method: str, url: str) -> str:
+    """Returns the method and path of a call with ids replaced, e.g.
+    "GET /lookml_models/:id/explores/:id".
+    """
+    segments = urllib.parse.urlsplit(url).path.strip("/").split("/")
+    # Drop the /api/<version> prefix
+    if len(segments) > 2 and segments[0] == "api":
+        segments = segments[2:]
+    path = [
+        ":id" if i and segments[i - 1] in ID_COLLECTIONS else s
+        for i, s in enumerate(segments)
+    ]
+    return f"{method} /" + "/".join(path)
+
+
+def active() -> Optional[Tracer]:
+    """Returns the tracer API calls should be recorded with, if any."""
+    return _active
+
+
+@contextlib.contextmanager
+def trace(
+    profile: bool = False, trace_file: Optional[str] = None
+) -> Iterator[Optional[Tracer]]:
+    """Records API calls made within the block if profile or trace_file are set.
+    When the block exits, a summary is printed if profile is set and the calls are
+    written to trace_file in Chrome's trace format.
+    """
+    global _active
+    if not profile and not trace_file:
+        yield None
+        return
+    tracer = _active = Tracer()
+    try:
+        yield tracer
+    finally:
+        _active = None
+        tracer.stop()
+        if trace_file:
+            tracer.write_chrome_trace(trace_file)
+        if profile:
+            tracer.report()
@@ -0,0 +1,134 @@
+import datetime
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from henry.modules import cache
+
+# Usage older than this many days is never queried and gets pruned
+MAX_DAYS = 90
+DAY_FORMAT = "%Y/%m/%d"
+
+# Kinds of usage kept in the store: query counts per explore and per field
+EXPLORE = "explore"
+FIELD = "field"
+
+
+class UsageStore:
+    """Keeps i__looker usage aggregated per day in a local sqlite database.
+
+    Days before today are complete once synced and are never fetched again.
+    Today is always treated as missing since queries are still being run.
+
+    A store may be created in one thread and used in others, e.g. when running on
+    several instances, so its connection is shared and used under a lock.
+    """
+
+    def __init__(
+        self, namespace: Sequence[Any] = (), directory: str = cache.DEFAULT_DIRECTORY
+    ):
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        digest = hashlib.sha256(repr(list(namespace)).encode("utf-8")).hexdigest()
+        self.path = os.path.join(directory, f"usage_{digest[:16]}.sqlite")
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS synced_days "
+                "(kind TEXT, day TEXT, PRIMARY KEY (kind, day))"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS usage "
+                "(kind TEXT, day TEXT, model TEXT, explore TEXT, field TEXT, "
+                "query_count INTEGER, PRIMARY KEY (kind, day, model, explore, field))"
+            )
+
+    @staticmethod
+    def window(days: int) -> List[str]:
+        """Returns the days making up a timeframe of the given length, oldest first.
+        The timeframe ends today, like the "N days" filter in Looker.
+        """
+        today = datetime.date.today()
+        return [
+            (today - datetime.timedelta(days=i)).strftime(DAY_FORMAT)
+            for i in reversed(range(days))
+        ]
+
+    def missing_days(self, kind: str, days: int) -> List[str]:
+        """Returns the days of the timeframe that have not been synced yet."""
+        with self._lock:
+            synced = {
+                r[0]
+                for r in self.conn.execute(
+                    "SELECT day FROM synced_days WHERE kind = ?", (kind,)
+                )
+            }
+        return [d for d in self.window(days) if d not in synced]
+
+    def save_day(
+        self,
+        kind: str,
+        day: str,
+        usage: Iterable[Tuple[str, str, str, int]],
+    ):
+        """Replaces the usage stored for a day with (model, explore, field,
+        query count) rows and marks the day as synced unless it is today.
+        """
+        with self._lock, self.conn:
+            self.conn.execute(
+                "DELETE FROM usage WHERE kind = ? AND day = ?", (kind, day)
+            )
+            self.conn.executemany(
+                "INSERT INTO usage VALUES (?, ?, ?, ?, ?, ?)",
+                ((kind, day, *row) for row in usage),
+            )
+            if day != datetime.date.today().strftime(DAY_FORMAT):
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO synced_days VALUES (?, ?)", (kind, day)
+                )
+
+    def prune(self):
+        """Removes usage that is older than MAX_DAYS."""
+        oldest = self.window(MAX_DAYS)[0]
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM usage WHERE day < ?", (oldest,))
+            self.conn.execute("DELETE FROM synced_days WHERE day < ?", (oldest,))
+
+    def explore_usage(
+        self, days: int, *, model: Optional[str] = None
+    ) -> Dict[str, Dict[str, int]]:
+        """Returns the query count of every used explore over the timeframe, keyed by
+        model and explore name.
+        """
+        result: Dict[str, Dict[str, int]] = {}
+        for m, e, _, count in self._usage(EXPLORE, days, model):
+            result.setdefault(m, {})[e] = count
+        return result
+
+    def field_usage(
+        self, days: int, *, model: Optional[str] = None
+    ) -> Dict[Tuple[str, str], Dict[str, int]]:
+        """Returns the query count of every used field over the timeframe, keyed by
+        (model, explore) and field name.
+        """
+        result: Dict[Tuple[str, str], Dict[str, int]] = {}
+        for m, e, f, count in self._usage(FIELD, days, model):
+            result.setdefault((m, e), {})[f] = count
+        return result
+
+    def _usage(
+        self, kind: str, days: int, model: Optional[str]
+    ) -> List[Tuple[str, str, str, int]]:
+        query = (
+            "SELECT model, explore, field, SUM(query_count) FROM usage "
+            "WHERE kind = ? AND day >= ?"
+        )
+        params: List[Any] = [kind, self.window(days)[0]]
+        if model:
+            query += " AND model = ?"
+            params.append(model)
+        query += " GROUP BY model, explore, field"
+        with self._lock:
+            return self.conn.execute(query, params).fetchall()
@@ -0,0 +1,167 @@
+import csv
+import json
+import sys
+import textwrap
+from typing import Any, Dict, IO, List, Optional, Union
+
+TRow = Dict[str, Union[str, int, bool]]
+
+FORMATS = ("csv", "jsonl", "ndjson", "json")
+# Writing to this path writes to standard output
+STDOUT = "-"
+
+
+class Writer:
+    """Writes result rows to a file as they come, without holding on to them.
+
+    Writers are context managers; leaving the block finishes the output and closes
+    the file unless it is standard output.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rows = 0
+        if path == STDOUT:
+            self.file: IO[str] = sys.stdout
+        else:
+            self.file = open(path, "w", newline="", encoding="utf-8")
+
+    def __enter__(self) -> "Writer":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, row: TRow):
+        """Writes a row and flushes it so that readers see it right away."""
+        self._write(row)
+        self.rows += 1
+        self.file.flush()
+
+    def close(self):
+        if self.file is sys.stdout:
+            self.file.flush()
+        else:
+            self.file.close()
+
+    def _write(self, row: TRow):
+        raise NotImplementedError
+
+
+class CsvWriter(Writer):
+    """Writes rows as CSV with a header taken from the first row."""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.writer: Optional[csv.DictWriter] = None
+
+    def _write(self, row: TRow):
+        if self.writer is None:
+            self.writer = csv.DictWriter(self.file, fieldnames=list(row.keys()))
+            self.writer.writeheader()
+        # Replace "\n" which is required when printing, with ','
+        self.writer.writerow({k: str(v).replace("\n", ",") for k, v in row.items()})
+
+
+class JsonLinesWriter(Writer):
+    """Writes one JSON object per line (JSON Lines, also known as NDJSON)."""
+
+    def _write(self, row: TRow):
+        self.file.write(json.dumps(row, default=str))
+        self.file.write("\n")
+
+
+class JsonWriter(Writer):
+    """Writes a JSON array, one row per line, that is only valid once closed."""
+
+    def _write(self, row: TRow):
+        self.file.write(",\n" if self.rows else "[\n")
+        self.file.write(json.dumps(row, default=str))
+
+    def close(self):
+        self.file.write("\n]\n" if self.rows else "[]\n")
+        super().close()
+
+
+class TableWriter(Writer):
+    """Prints rows as a table in the style of tabulate's "psql" format, each row
+    as soon as it is written.
+
+    Since later rows are not known yet, column widths are fixed by the headers and
+    the first row, at least min_width and at most max_width characters. Longer
+    values are wrapped, and numbers are centered like numalign="center".
+    """
+
+    def __init__(self, path: str = STDOUT, min_width: int = 10, max_width: int = 50):
+        super().__init__(path)
+        self.min_width = min_width
+        self.max_width = max_width
+        self.columns: List[str] = []
+        self.widths: List[int] = []
+
+    def _write(self, row: TRow):
+        if not self.columns:
+            self.columns = list(row.keys())
+            self.widths = [
+                max(
+                    len(c),
+                    min(max(self.min_width, *map(len, _lines(row[c]))), self.max_width),
+                )
+                for c in self.columns
+            ]
+            self.file.write(self._border("+", "-") + "\n")
+            self.file.write(self._line(self.columns, [False] * len(self.columns)))
+            self.file.write(self._border("|", "-") + "\n")
+        cells = [
+            [
+                wrapped
+                for line in _lines(row.get(c, ""))
+                for wrapped in textwrap.wrap(line, width) or [""]
+            ]
+            for c, width in zip(self.columns, self.widths)
+        ]
+        numeric = [_is_number(row.get(c)) for c in self.columns]
+        for i in range(max(len(c) for c in cells)):
+            self.file.write(
+                self._line([c[i] if i < len(c) else "" for c in cells], numeric)
+            )
+
+    def close(self):
+        if self.columns:
+            self.file.write(self._border("+", "-") + "\n\n")
+        else:
+            self.file.write("No results found.\n\n")
+        super().close()
+
+    def _border(self, edge: str, fill: str) -> str:
+        return edge + "+".join(fill * (w + 2) for w in self.widths) + edge
+
+    def _line(self, values: List[str], numeric: List[bool]) -> str:
+        cells = [
+            v.center(w) if n else v.ljust(w)
+            for v, w, n in zip(values, self.widths, numeric)
+        ]
+        return "| " + " | ".join(cells) + " |\n"
+
+
+def _lines(value: Any) -> List[str]:
+    return str(value).split("\n")
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def open_writer(fmt: str, path: str) -> Writer:
+    """Returns a writer for the given format writing to path, or to standard
+    output if path is "-".
+    """
+    writers: Dict[str, Any] = {
+        "csv": CsvWriter,
+        "jsonl": JsonLinesWriter,
+        "ndjson": JsonLinesWriter,
+        "json": JsonWriter,
+    }
+    if fmt not in writers:
+        raise ValueError(f"Unrecognized output format: {fmt}.")
+    return writers[fmt](path)
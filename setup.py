@@ -10,6 +10,7 @@ setup(
     author="Joseph Axisa",
     author_email="jax@looker.com",
     description="A Looker Cleanup Tool",
+    extras_require={"async": ["aiohttp"]},
     install_requires=REQUIRES,
     license="MIT",
     long_description=open("README.md", encoding="utf-8").read(),
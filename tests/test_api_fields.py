@@ -0,0 +1,77 @@
+from typing import Iterator, List, Optional, Type
+
+import pytest  # type: ignore
+
+from benchmarks import fake_looker
+from henry.commands import analyze, pulse, vacuum
+from henry.modules import fetcher
+
+# Commands to run, as (command class, command, subcommand, model)
+COMMANDS = [
+    (analyze.Analyze, "analyze", "projects", None),
+    (analyze.Analyze, "analyze", "models", None),
+    (analyze.Analyze, "analyze", "explores", None),
+    (vacuum.Vacuum, "vacuum", "models", None),
+    (vacuum.Vacuum, "vacuum", "explores", "model_0"),
+    (pulse.Pulse, "pulse", None, None),
+]
+
+
+@pytest.fixture(name="looker")
+def initialize_looker(tmp_path) -> Iterator[fake_looker.FakeLooker]:
+    """Returns a fake Looker instance with a looker.ini in tmp_path."""
+    scale = fake_looker.Scale(models=2, explores=4, fields=5, history=200)
+    with fake_looker.FakeLooker(scale) as looker:
+        looker.write_config(str(tmp_path / "looker.ini"))
+        yield looker
+
+
+def run(
+    cls: Type[fetcher.Fetcher],
+    command: str,
+    subcommand: Optional[str],
+    model: Optional[str],
+    tmp_path,
+) -> List:
+    """Returns the rows of a command, or the sections of pulse."""
+    user_input = fetcher.Input(
+        command=command,
+        subcommand=subcommand,
+        model=model,
+        config_file=str(tmp_path / "looker.ini"),
+        cache=False,
+        backoff=0,
+    )
+    f = cls(user_input)
+    if isinstance(f, pulse.Pulse):
+        return list(f.checks())
+    return f.ordered_results(user_input)
+
+
+def test_metadata_calls_request_only_the_fields_read(
+    looker: fake_looker.FakeLooker, tmp_path, monkeypatch: pytest.MonkeyPatch
+):
+    """Metadata calls should pass the fields henry reads, and every command
+    should output the same results as it does from whole responses.
+    """
+    results = [run(*c, tmp_path) for c in COMMANDS]
+    assert looker.fields == {
+        "GET /lookml_models": fetcher.MODEL_FIELDS,
+        "GET /lookml_models/:id": fetcher.MODEL_FIELDS,
+        "GET /lookml_models/:id/explores/:id": fetcher.EXPLORE_FIELDS,
+        "GET /projects": fetcher.PROJECT_FIELDS,
+        "GET /projects/:id/files": fetcher.PROJECT_FILE_FIELDS,
+        "GET /connections": fetcher.CONNECTION_FIELDS,
+    }
+
+    for name in [
+        "MODEL_FIELDS",
+        "EXPLORE_FIELDS",
+        "PROJECT_FIELDS",
+        "PROJECT_FILE_FIELDS",
+        "CONNECTION_FIELDS",
+    ]:
+        monkeypatch.setattr(fetcher, name, None)
+    looker.reset()
+    assert [run(*c, tmp_path) for c in COMMANDS] == results
+    assert not looker.fields
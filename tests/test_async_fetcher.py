@@ -0,0 +1,69 @@
+import asyncio
+from typing import Any, Dict, Iterator, List, Tuple
+
+import pytest  # type: ignore
+from looker_sdk import error
+
+from benchmarks import fake_looker
+from henry.modules import auth, fetcher
+
+
+@pytest.fixture(name="looker")
+def initialize_looker(tmp_path) -> Iterator[fake_looker.FakeLooker]:
+    """Returns a fake Looker instance with a looker.ini in tmp_path."""
+    scale = fake_looker.Scale(models=1, explores=3, fields=2, history=0)
+    with fake_looker.FakeLooker(scale) as looker:
+        looker.write_config(str(tmp_path / "looker.ini"))
+        yield looker
+
+
+def get_explores(tmp_path, **options: Any) -> Tuple[fetcher.Fetcher, List[str]]:
+    """Fetches the explores of model_0 with the async transport."""
+    f = fetcher.Fetcher(
+        fetcher.Input(
+            command="vacuum",
+            config_file=str(tmp_path / "looker.ini"),
+            cache=False,
+            backoff=0,
+            **options,
+        )
+    )
+    f.sdk.auth.token_cache = auth.TokenCache(directory=str(tmp_path))
+    names = [("model_0", f"explore_{e}", None) for e in range(3)]
+    return f, [e.name for e in asyncio.run(f.get_explores_async(names))]
+
+
+def test_transient_errors_are_retried(looker: fake_looker.FakeLooker, tmp_path):
+    """Explores fetched over aiohttp should be retried on transient statuses,
+    up to the number of retries.
+    """
+    handle = looker.handle
+    failures: Dict[str, int] = {"/lookml_models/model_0/explores/explore_1": 2}
+
+    def flaky(method: str, path: str, body: Any) -> Tuple[int, Any]:
+        if failures.get(path):
+            failures[path] -= 1
+            return 503, {"message": "Service Unavailable"}
+        return handle(method, path, body)
+
+    looker.handle = flaky  # type: ignore
+    _, explores = get_explores(tmp_path, retries=2)
+    assert explores == ["explore_0", "explore_1", "explore_2"]
+    assert looker.calls["GET /lookml_models/:id/explores/:id"] == 5
+
+    failures["/lookml_models/model_0/explores/explore_1"] = 2
+    with pytest.raises(error.SDKError, match="Service Unavailable"):
+        get_explores(tmp_path, retries=1)
+
+
+def test_login_uses_the_token_cache(looker: fake_looker.FakeLooker, tmp_path):
+    """Logging in over aiohttp should cache the token, and a cached token
+    should be used rather than logging in.
+    """
+    f, _ = get_explores(tmp_path)
+    assert looker.calls["POST /login"] == 1
+    cached = auth.TokenCache(directory=str(tmp_path)).load()
+    assert cached and cached.access_token == f.sdk.auth.token.access_token
+
+    get_explores(tmp_path)
+    assert looker.calls["POST /login"] == 1
@@ -0,0 +1,106 @@
+import functools
+import os
+import stat
+
+import pytest  # type: ignore
+from looker_sdk import error
+from looker_sdk.rtl import auth_token
+
+from benchmarks import fake_looker
+from henry.modules import auth, fetcher
+
+
+@pytest.fixture(name="tc")
+def initialize(tmp_path) -> auth.TokenCache:
+    """Returns a token cache in a temporary directory."""
+    return auth.TokenCache(namespace=("url", "client_id"), directory=str(tmp_path))
+
+
+def token(access_token: str = "abc", expires_in: int = 3600) -> auth_token.AuthToken:
+    return auth_token.AuthToken(
+        auth_token.AccessToken(
+            access_token=access_token, token_type="Bearer", expires_in=expires_in
+        )
+    )
+
+
+def test_token_cache_returns_saved_token(tc: auth.TokenCache):
+    """TokenCache.load() should return the token that was saved."""
+    assert tc.load() is None
+    tc.save(token())
+    loaded = tc.load()
+    assert loaded.access_token == "abc"
+    assert loaded.token_type == "Bearer"
+    assert loaded.is_active
+
+
+def test_token_cache_is_namespaced(tc: auth.TokenCache, tmp_path):
+    """TokenCache.load() should not return tokens saved for another client."""
+    tc.save(token())
+    other = auth.TokenCache(namespace=("url", "other"), directory=str(tmp_path))
+    assert other.load() is None
+
+
+def test_token_cache_ignores_expiring_tokens(tc: auth.TokenCache):
+    """TokenCache.load() should not return tokens about to expire."""
+    tc.save(token(expires_in=auth.EXPIRY_MARGIN))
+    assert tc.load() is None
+
+
+def test_token_cache_is_private(tc: auth.TokenCache):
+    """TokenCache.save() should write a file only the current user can read."""
+    tc.save(token())
+    assert stat.S_IMODE(os.stat(tc.path).st_mode) == 0o600
+
+
+def test_token_cache_clear(tc: auth.TokenCache):
+    """TokenCache.clear() should remove the saved token."""
+    tc.save(token())
+    tc.clear()
+    assert tc.load() is None
+    tc.clear()
+
+
+def test_cached_tokens_are_used_in_production(tmp_path, monkeypatch):
+    """A run reusing a cached token should switch its session back to the
+    production workspace, in case another run left it in the dev workspace, and
+    runs that switch workspaces should not share cached tokens.
+    """
+    monkeypatch.setattr(
+        auth, "TokenCache", functools.partial(auth.TokenCache, directory=str(tmp_path))
+    )
+    with fake_looker.FakeLooker(fake_looker.Scale(history=0)) as looker:
+        looker.write_config(str(tmp_path / "looker.ini"))
+
+        def run(subcommand: str):
+            options = fetcher.Input(
+                command="analyze",
+                subcommand=subcommand,
+                config_file=str(tmp_path / "looker.ini"),
+                token_cache=True,
+            )
+            fetcher.Fetcher(options).get_projects()
+
+        run("models")
+        assert looker.calls["POST /login"] == 1
+        assert looker.calls["PATCH /session"] == 0
+        run("explores")
+        assert looker.calls["POST /login"] == 1
+        assert looker.calls["PATCH /session"] == 1
+        run("projects")
+        assert looker.calls["POST /login"] == 2
+
+
+def test_login_errors_are_reported(tmp_path, capsys):
+    """Logging in with bad credentials should say so on stderr."""
+    with fake_looker.FakeLooker(fake_looker.Scale(history=0)) as looker:
+        looker.write_config(str(tmp_path / "looker.ini"))
+        looker.handle = lambda method, path, body: (404, {"message": "Not found"})
+        options = fetcher.Input(
+            command="pulse", config_file=str(tmp_path / "looker.ini")
+        )
+        with pytest.raises(error.SDKError):
+            fetcher.Fetcher(options).sdk.me()
+    captured = capsys.readouterr()
+    assert captured.out == ""
+    assert "Error logging in to the Looker API" in captured.err
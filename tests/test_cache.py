@@ -0,0 +1,93 @@
+import os
+import time
+from typing import List, Optional
+
+import pytest  # type: ignore
+
+from benchmarks import fake_looker
+from henry.modules import cache, fetcher
+
+
+@pytest.fixture(name="mc")
+def initialize(tmp_path) -> cache.MetadataCache:
+    """Returns an instance of the metadata cache in a temporary directory."""
+    return cache.MetadataCache(namespace=("url", "section"), directory=str(tmp_path))
+
+
+def test_cache_returns_stored_values(mc: cache.MetadataCache):
+    """cache.get() should return what was stored under the same key."""
+    mc.set('{"name": "model"}', "lookml_model", "model")
+    assert mc.get("lookml_model", "model") == '{"name": "model"}'
+    assert mc.get("lookml_model", "other_model") is None
+
+
+def test_cache_keys_are_namespaced(mc: cache.MetadataCache, tmp_path):
+    """cache.get() should not return values stored under another namespace."""
+    mc.set("value", "key")
+    other = cache.MetadataCache(namespace=("url", "other"), directory=str(tmp_path))
+    assert other.get("key") is None
+
+
+def test_cache_expires_entries(mc: cache.MetadataCache):
+    """cache.get() should ignore entries older than the ttl."""
+    mc.set("value", "key")
+    mc.ttl = -1
+    assert mc.get("key") is None
+
+
+def test_cache_evicts_least_recently_used_entries(mc: cache.MetadataCache):
+    """cache.set() should evict the least recently used entries once the cache
+    grows beyond its maximum size.
+    """
+    mc.max_size = 2500
+    mc.set("a" * 1000, "a")
+    mc.set("b" * 1000, "b")
+    past = time.time() - 60
+    os.utime(mc._path(["a"]), (past, past))
+    os.utime(mc._path(["b"]), (past - 60, past - 60))
+    assert mc.get("a") is not None
+    mc.set("c" * 1000, "c")
+    assert mc.get("b") is None
+    assert mc.get("a") is not None
+    assert mc.get("c") is not None
+
+
+def test_cache_tracks_its_size(mc: cache.MetadataCache, monkeypatch):
+    """cache.set() should only read the size of the cache from disk once, and
+    evict entries when the size it tracks grows beyond the maximum.
+    """
+    scans = []
+    scandir = os.scandir
+    monkeypatch.setattr(os, "scandir", lambda path: scans.append(path) or scandir(path))
+    mc.max_size = 5000
+    for key in range(4):
+        mc.set("a" * 1000, key)
+    mc.set("b" * 1000, 0)
+    assert len(scans) == 1
+    mc.set("c" * 1000, "c")
+    assert len(scans) == 2
+    assert mc._size is not None and mc._size <= mc.max_size * cache.EVICT_TO
+    assert mc.get("c") is not None
+
+
+def test_deploys_invalidate_cached_models(tmp_path):
+    """Cached lists of models should be fetched again once their project is
+    deployed, so explores added or removed by the deploy are seen.
+    """
+    scale = fake_looker.Scale(models=1, explores=2, history=0)
+    with fake_looker.FakeLooker(scale) as looker:
+        looker.write_config(str(tmp_path / "looker.ini"))
+
+        def explores(model: Optional[str] = None) -> List[str]:
+            config_file = str(tmp_path / "looker.ini")
+            f = fetcher.Fetcher(
+                fetcher.Input(command="vacuum", config_file=config_file)
+            )
+            f.cache = cache.MetadataCache(directory=str(tmp_path / "cache"))
+            return [e.name for e in f.get_explores(model=model)]
+
+        assert explores() == explores("model_0") == ["explore_0", "explore_1"]
+        looker.instance.models["model_0"][1:] = ["explore_2"]
+        assert explores() == explores("model_0") == ["explore_0", "explore_1"]
+        looker.instance.git_head = "def456"
+        assert explores() == explores("model_0") == ["explore_0", "explore_2"]
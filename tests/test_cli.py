@@ -1,7 +1,14 @@
 import argparse
+import json
+import os
+import pathlib
+import subprocess
+import sys
+from typing import List
 
 import pytest  # type: ignore
 
+from benchmarks import fake_looker
 from henry import cli
 
 
@@ -15,7 +22,7 @@ def test_parse_input_with_pulse(parser: argparse.ArgumentParser):
     ip = parser.parse_args(["pulse"])
     assert ip.command == "pulse"
     assert ip.config_file == "looker.ini"
-    assert ip.section == "Looker"
+    assert ip.section == ["Looker"]
     assert ip.timeout == 120
 
     ip = parser.parse_args(
@@ -23,5 +30,319 @@ def test_parse_input_with_pulse(parser: argparse.ArgumentParser):
     )
     assert ip.command == "pulse"
     assert ip.config_file == "some_file.ini"
-    assert ip.section == "some_section"
+    assert ip.section == ["some_section"]
     assert ip.timeout == 120
+
+
+def test_parse_input_with_sections(
+    parser: argparse.ArgumentParser, monkeypatch: pytest.MonkeyPatch, tmp_path
+):
+    """parse_input should run against every section given, or every section of
+    the config file with --all-sections.
+    """
+    config_file = tmp_path / "looker.ini"
+    config_file.write_text("[Prod]\nbase_url=a\n\n[Staging]\nbase_url=b\n")
+
+    monkeypatch.setattr(sys, "argv", ["henry", "vacuum", "explores"])
+    ip = cli.parse_input(parser)
+    assert ip.section == "Looker"
+    assert ip.sections == ["Looker"]
+
+    monkeypatch.setattr(
+        sys, "argv", ["henry", "pulse", "--section", "Prod", "Staging", "Prod"]
+    )
+    ip = cli.parse_input(parser)
+    assert ip.section == "Prod"
+    assert ip.sections == ["Prod", "Staging"]
+
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "henry",
+            "analyze",
+            "models",
+            "--all-sections",
+            f"--config-file={config_file}",
+        ],
+    )
+    assert cli.parse_input(parser).sections == ["Prod", "Staging"]
+
+    with pytest.raises(SystemExit):
+        parser.parse_args(["pulse", "--section", "Prod", "--all-sections"])
+
+    # A command without a subcommand takes no section
+    for argv in (["henry"], ["henry", "analyze"]):
+        monkeypatch.setattr(sys, "argv", argv)
+        with pytest.raises(SystemExit):
+            cli.parse_input(parser)
+
+
+def test_parse_input_with_serve(
+    parser: argparse.ArgumentParser, monkeypatch: pytest.MonkeyPatch
+):
+    """parse_input should serve on a local port unless given a socket, and only
+    against a single section.
+    """
+    ip = parser.parse_args(["serve"])
+    assert ip.host == "127.0.0.1"
+    assert ip.port == 8765
+    assert ip.socket_path is None
+    assert ip.refresh_interval == 600
+
+    ip = parser.parse_args(["serve", "--socket", "henry.sock"])
+    assert ip.socket_path == "henry.sock"
+
+    monkeypatch.setattr(sys, "argv", ["henry", "serve", "--section", "a", "b"])
+    with pytest.raises(SystemExit):
+        cli.parse_input(parser)
+
+
+def test_parse_input_with_concurrency(parser: argparse.ArgumentParser):
+    """parse_input should default to 10 concurrent API calls."""
+    ip = parser.parse_args(["vacuum", "explores"])
+    assert ip.concurrency == 10
+
+    ip = parser.parse_args(["vacuum", "explores", "--concurrency", "4"])
+    assert ip.concurrency == 4
+
+    ip = parser.parse_args(["pulse"])
+    assert ip.concurrency == 10
+
+    ip = parser.parse_args(["pulse", "--concurrency", "2"])
+    assert ip.concurrency == 2
+
+
+def test_parse_input_with_cache_options(parser: argparse.ArgumentParser):
+    """parse_input should enable the metadata cache unless told otherwise."""
+    ip = parser.parse_args(["analyze", "explores"])
+    assert ip.cache is True
+    assert ip.refresh_cache is False
+    assert ip.cache_ttl == 3600
+
+    ip = parser.parse_args(["analyze", "explores", "--no-cache"])
+    assert ip.cache is False
+
+    ip = parser.parse_args(["analyze", "explores", "--refresh-cache"])
+    assert ip.cache is True
+    assert ip.refresh_cache is True
+
+
+def test_parse_input_with_incremental(parser: argparse.ArgumentParser):
+    """parse_input should only use the local usage store when asked to."""
+    ip = parser.parse_args(["vacuum", "explores"])
+    assert ip.incremental is False
+
+    ip = parser.parse_args(["vacuum", "explores", "--incremental"])
+    assert ip.incremental is True
+
+
+def test_parse_input_with_transport(parser: argparse.ArgumentParser):
+    """parse_input should default to the sync transport."""
+    ip = parser.parse_args(["analyze", "explores"])
+    assert ip.transport == "sync"
+
+    ip = parser.parse_args(["analyze", "explores", "--transport", "async"])
+    assert ip.transport == "async"
+
+    with pytest.raises(SystemExit):
+        parser.parse_args(["analyze", "explores", "--transport", "http2"])
+
+
+def test_parse_input_with_retries(parser: argparse.ArgumentParser):
+    """parse_input should accept retry settings for all commands."""
+    ip = parser.parse_args(["vacuum", "models"])
+    assert ip.retries == 3
+    assert ip.backoff == 0.5
+
+    ip = parser.parse_args(["pulse", "--retries", "5", "--backoff", "1.5"])
+    assert ip.retries == 5
+    assert ip.backoff == 1.5
+
+
+def test_parse_input_with_connection_timeout(parser: argparse.ArgumentParser):
+    """parse_input should accept a connection test timeout for pulse."""
+    ip = parser.parse_args(["pulse"])
+    assert ip.connection_timeout == 60
+
+    ip = parser.parse_args(["pulse", "--connection-timeout", "5"])
+    assert ip.connection_timeout == 5
+
+
+def test_parse_input_with_output(parser: argparse.ArgumentParser):
+    """parse_input should accept an output format and destination."""
+    ip = parser.parse_args(["vacuum", "explores"])
+    assert ip.output_format == "csv"
+    assert ip.output_path is None
+
+    ip = parser.parse_args(
+        ["vacuum", "explores", "--format", "jsonl", "--output", "-"]
+    )
+    assert ip.output_format == "jsonl"
+    assert ip.output_path == "-"
+
+    with pytest.raises(SystemExit):
+        parser.parse_args(["vacuum", "explores", "--format", "xml"])
+
+
+def test_parse_input_with_progressive(parser: argparse.ArgumentParser):
+    """parse_input should only print rows progressively when asked to."""
+    ip = parser.parse_args(["analyze", "explores"])
+    assert ip.progressive is False
+
+    ip = parser.parse_args(["analyze", "explores", "--progressive"])
+    assert ip.progressive is True
+
+
+def test_parse_input_with_token_cache(parser: argparse.ArgumentParser):
+    """parse_input should only cache tokens when asked to."""
+    ip = parser.parse_args(["pulse"])
+    assert ip.token_cache is False
+
+    ip = parser.parse_args(["pulse", "--token-cache"])
+    assert ip.token_cache is True
+    ip = parser.parse_args(["vacuum", "models", "--token-cache"])
+    assert ip.token_cache is True
+
+
+def test_parse_input_with_profile(parser: argparse.ArgumentParser):
+    """parse_input should only profile API calls when asked to."""
+    ip = parser.parse_args(["vacuum", "explores"])
+    assert ip.profile is False
+    assert ip.trace_file is None
+
+    ip = parser.parse_args(["pulse", "--profile", "--trace-file", "trace.json"])
+    assert ip.profile is True
+    assert ip.trace_file == "trace.json"
+
+
+def test_parse_input_with_snapshots(parser: argparse.ArgumentParser):
+    """parse_input should accept recording or replaying a snapshot, not both."""
+    ip = parser.parse_args(["vacuum", "explores", "--record", "a.henry"])
+    assert ip.record == "a.henry"
+    assert ip.replay is None
+
+    ip = parser.parse_args(["pulse", "--replay", "a.henry"])
+    assert ip.replay == "a.henry"
+    with pytest.raises(SystemExit):
+        parser.parse_args(["pulse", "--record", "a.henry", "--replay", "b.henry"])
+
+
+def test_parse_input_with_multiple_sort_keys(parser: argparse.ArgumentParser):
+    """parse_input should accept --order-by more than once."""
+    ip = parser.parse_args(
+        [
+            "analyze",
+            "explores",
+            "--order-by",
+            "Model",
+            "asc",
+            "--order-by",
+            "Query Count",
+            "desc",
+        ]
+    )
+    assert ip.sortkey == [["Model", "asc"], ["Query Count", "desc"]]
+
+
+@pytest.mark.parametrize(
+    "argv", [["--help"], ["analyze", "--help"], ["vacuum", "explores", "--bad"]]
+)
+def test_parsing_does_not_import_the_sdk(argv):
+    """Parsing arguments, --help and usage errors should not import the Looker
+    SDK or other heavy dependencies, which are only needed to run commands.
+    """
+    code = "import sys; from henry import cli; sys.argv[1:] = %r; cli.main()" % argv
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    assert proc.returncode in (0, 2)
+    imported = {
+        line.split("|")[-1].strip()
+        for line in proc.stderr.splitlines()
+        if line.startswith("import time:")
+    }
+    assert "henry.cli" in imported
+    for module in ["looker_sdk", "requests", "tabulate", "henry.modules.fetcher"]:
+        assert module not in imported
+
+
+def run_henry(
+    argv: List[str], cwd: pathlib.Path
+) -> "subprocess.CompletedProcess[str]":
+    """Runs henry in a subprocess, with its cache kept under cwd."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return subprocess.run(
+        [sys.executable, "-c", "from henry import cli; cli.main()", *argv],
+        cwd=cwd,
+        env={**os.environ, "PYTHONPATH": root, "XDG_CACHE_HOME": str(cwd)},
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+
+
+def test_output_to_stdout_is_only_rows(tmp_path: pathlib.Path):
+    """With --output - stdout should only hold the rows, with notices such as
+    paginated query history going to stderr, so it can be piped to e.g. jq.
+    """
+    scale = fake_looker.Scale(
+        models=1, explores=3, fields=3, history=12_000, distinct_queries=12_000
+    )
+    with fake_looker.FakeLooker(scale) as looker:
+        looker.write_config(str(tmp_path / "looker.ini"))
+        proc = run_henry(
+            ["vacuum", "explores", "--no-cache", "--format", "jsonl", "--output", "-"],
+            tmp_path,
+        )
+    assert proc.returncode == 0, proc.stderr
+    assert "Read query history in 3 pages" in proc.stderr
+    rows = [json.loads(line) for line in proc.stdout.splitlines()]
+    assert [row["Explore"] for row in rows] == ["explore_0", "explore_1", "explore_2"]
+
+
+def test_run_on_several_instances_incrementally(tmp_path: pathlib.Path):
+    """Each instance's fetcher, and the usage store it opens, should be usable
+    by the thread running the command on that instance.
+    """
+    scale = fake_looker.Scale(models=1, explores=2, fields=2, history=100)
+    with fake_looker.FakeLooker(scale) as a, fake_looker.FakeLooker(scale) as b:
+        config = ""
+        for section, looker in [("A", a), ("B", b)]:
+            looker.write_config(str(tmp_path / section), section)
+            config += (tmp_path / section).read_text()
+        (tmp_path / "looker.ini").write_text(config)
+        proc = run_henry(
+            ["vacuum", "explores", "--incremental", "--timeframe", "2"]
+            + ["--section", "A", "B", "--format", "jsonl", "--output", "-"],
+            tmp_path,
+        )
+    assert proc.returncode == 0, proc.stderr
+    rows = [json.loads(line) for line in proc.stdout.splitlines()]
+    assert [row["Instance"] for row in rows] == ["A", "A", "B", "B"]
+
+
+def test_replay_without_config_file(tmp_path: pathlib.Path):
+    """Replaying a snapshot should need neither the API nor a config file, and
+    snapshot errors should be reported in one line.
+    """
+    argv = ["analyze", "models", "--format", "jsonl", "--output", "-"]
+    with fake_looker.FakeLooker(fake_looker.Scale(history=100)) as looker:
+        looker.write_config(str(tmp_path / "looker.ini"))
+        recorded = run_henry(argv + ["--record", "snap.gz"], tmp_path)
+    assert recorded.returncode == 0, recorded.stderr
+
+    replayed = run_henry(
+        argv + ["--replay", "snap.gz", "--config-file", "missing.ini"], tmp_path
+    )
+    assert replayed.returncode == 0, replayed.stderr
+    assert replayed.stdout == recorded.stdout
+
+    replayed = run_henry(argv[:2] + ["--replay", "missing.gz"], tmp_path)
+    assert replayed.returncode == 1
+    assert replayed.stderr.startswith("Error: Could not read snapshot missing.gz")
+    assert len(replayed.stderr.splitlines()) == 1
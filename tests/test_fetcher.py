@@ -1,9 +1,11 @@
+import time
 from typing import Callable, Dict, Optional, Sequence, Tuple, Union
 
 import pytest  # type: ignore
+import urllib3
 from looker_sdk.sdk.api40 import methods, models
 
-from henry.modules import exceptions, fetcher
+from henry.modules import exceptions, fetcher, lookml
 
 
 @pytest.fixture(name="fc")
@@ -90,12 +92,27 @@ def test_get_used_models(fc: fetcher.Fetcher, test_model):
     assert test_model["name"] in used_models.keys()
 
 
+def test_get_used_explores_by_model(
+    fc: fetcher.Fetcher, test_model, test_used_explore_names
+):
+    """fetcher.get_used_explores_by_model() should return used explores grouped by
+    model with counts that add up to the model query count.
+    """
+    usage = fc.get_used_explores_by_model()
+    assert isinstance(usage, dict)
+    assert test_model["name"] in usage
+    used_explores = usage[test_model["name"]]
+    assert all(e in test_used_explore_names for e in used_explores)
+    assert all(type(query_count) == int for query_count in used_explores.values())
+    assert sum(used_explores.values()) == fc.get_used_models()[test_model["name"]]
+
+
 def test_get_explores(fc: fetcher.Fetcher):
     """fetcher.get_explores() should return a list of explores."""
     explores = fc.get_explores()
     assert isinstance(explores, list)
     assert len(explores) > 0
-    assert isinstance(explores[0], models.LookmlModelExplore)
+    assert isinstance(explores[0], lookml.Explore)
 
 
 def test_get_explores_filters(fc: fetcher.Fetcher):
@@ -110,6 +127,80 @@ def test_get_explores_filters(fc: fetcher.Fetcher):
     )
 
 
+def test_get_explores_concurrently_preserves_order(fc: fetcher.Fetcher):
+    """fetcher.get_explores() should return the same explores in the same order
+    regardless of concurrency.
+    """
+    fc.concurrency = 1
+    serial = [(e.model_name, e.name) for e in fc.get_explores()]
+    fc.concurrency = 8
+    concurrent = [(e.model_name, e.name) for e in fc.get_explores()]
+    assert concurrent == serial
+
+
+def test_configure_sdk_retries_and_pools_connections(fc: fetcher.Fetcher):
+    """fetcher.configure_sdk() should retry transient errors on idempotent calls
+    and keep as many connections alive as there are workers.
+    """
+    adapter = fc.sdk.transport.session.get_adapter(fc.sdk.auth.settings.base_url)
+    assert adapter._pool_maxsize == fc.concurrency
+    retries = adapter.max_retries
+    assert retries.total == 3
+    assert 503 in retries.status_forcelist
+    assert retries.is_retry("GET", 429)
+
+
+@pytest.mark.parametrize(
+    "method, url, retried",
+    [
+        ("GET", "/api/4.0/lookml_models", True),
+        ("POST", "/api/4.0/queries/run/json", True),
+        ("POST", "/api/4.0/login", False),
+        ("PATCH", "/api/4.0/session", False),
+    ],
+)
+def test_read_only_calls_are_retried(method: str, url: str, retried: bool):
+    """Calls that only read data, including query runs, should be retried on
+    transient statuses and read errors. Other calls should not be sent again.
+    """
+    retries = fetcher._JitteredRetry(
+        total=3,
+        status_forcelist=fetcher.RETRY_STATUSES,
+        allowed_methods=urllib3.Retry.DEFAULT_ALLOWED_METHODS | {"POST"},
+        raise_on_status=False,
+    )
+    unavailable = urllib3.HTTPResponse(status=503)
+    timeout = urllib3.exceptions.ReadTimeoutError(None, url, "Read timed out.")
+    if retried:
+        assert retries.is_retry(method, 503)
+        assert retries.increment(method, url, response=unavailable).total == 2
+        assert retries.increment(method, url, error=timeout).total == 2
+    else:
+        if retries.is_retry(method, 503):
+            with pytest.raises(urllib3.exceptions.MaxRetryError):
+                retries.increment(method, url, response=unavailable)
+        with pytest.raises(urllib3.exceptions.ReadTimeoutError):
+            retries.increment(method, url, error=timeout)
+
+
+def test_connection_tests_are_not_retried():
+    """Connection tests that time out or fail should not be sent again, unless
+    they couldn't connect to the API.
+    """
+    retries = fetcher._JitteredRetry(
+        total=3, status_forcelist=fetcher.RETRY_STATUSES, raise_on_status=False
+    )
+    url = "/api/4.0/connections/db/test?tests=connect"
+    timeout = urllib3.exceptions.ReadTimeoutError(None, url, "Read timed out.")
+    with pytest.raises(urllib3.exceptions.ReadTimeoutError):
+        retries.increment("PUT", url, error=timeout)
+    with pytest.raises(urllib3.exceptions.MaxRetryError):
+        retries.increment("PUT", url, response=urllib3.HTTPResponse(status=503))
+    refused = urllib3.exceptions.ConnectTimeoutError(None, "Connection timed out.")
+    assert retries.increment("PUT", url, error=refused).total == 2
+    assert retries.increment("PUT", "/api/4.0/connections/db", error=timeout).total == 2
+
+
 @pytest.mark.parametrize(
     "model, explore, msg",
     [
@@ -151,7 +242,7 @@ def test_get_explore_fields_gets_fields(
     explore = fc.get_explores(model=test_model["name"], explore=test_explore["name"])
     assert isinstance(explore, list)
     explore = explore[0]
-    assert isinstance(explore, models.LookmlModelExplore)
+    assert isinstance(explore, lookml.Explore)
     assert explore.model_name == test_model["name"]
     assert explore.name == test_explore["name"]
     fields = fc.get_explore_fields(explore)
@@ -170,7 +261,11 @@ def test_get_explore_fields_gets_fields_for_dimension_or_measure_only_explores(
     assert isinstance(explore, list)
     actual = explore[0]
     assert actual.name == expected["name"]
-    assert not (actual.fields.dimensions and actual.fields.measures)
+    sdk_explore = fc.sdk.lookml_model_explore(
+        test_model["name"], expected["name"], fields=fetcher.EXPLORE_FIELDS
+    )
+    assert sdk_explore.fields is not None
+    assert not (sdk_explore.fields.dimensions and sdk_explore.fields.measures)
     expected_fields = [f["name"] for f in expected["fields"]]
     actual_fields = fc.get_explore_fields(actual)
     assert actual_fields == expected_fields
@@ -200,6 +295,36 @@ def test_get_explore_field_stats(
     assert all(actual_stats[k] > 0 for k in expected_stats["used_fields"])
 
 
+def test_get_used_fields_by_explore(
+    fc: fetcher.Fetcher, test_model, test_used_explore_names
+):
+    """fetcher.get_used_fields_by_explore() should partition a model's field usage
+    per explore, matching the usage queried for each explore on its own.
+    """
+    field_usage = fc.get_used_fields_by_explore(model=test_model["name"])
+    assert isinstance(field_usage, dict)
+    assert all(model == test_model["name"] for model, _ in field_usage.keys())
+    for explore in test_used_explore_names:
+        expected = fc.get_used_explore_fields(model=test_model["name"], explore=explore)
+        assert field_usage.get((test_model["name"], explore), {}) == expected
+
+
+def test_iter_history_paginates(fc: fetcher.Fetcher, test_model):
+    """fetcher._iter_history() should return the same rows regardless of the
+    page size.
+    """
+    query = models.WriteQuery(
+        model="i__looker",
+        view="history",
+        fields=["query.view", "history.query_run_count"],
+        filters={"query.model": test_model["name"].replace("_", "^_")},
+    )
+    expected = list(fc._iter_history(query))
+    actual = list(fc._iter_history(query, page_size=2))
+    assert len(expected) > 2
+    assert actual == expected
+
+
 def test_get_explore_join_stats(fc: fetcher.Fetcher, test_model):
     """fetcher.get_explore_join_stats() should return the stats of all joins in
     an explore.
@@ -227,6 +352,30 @@ def test_get_explore_join_stats(fc: fetcher.Fetcher, test_model):
     assert join_stats == {"join1": 30, "join2": 0}
 
 
+def test_dev_workspace_switches_back_to_production(fc: fetcher.Fetcher):
+    """fetcher.dev_workspace() should leave the session in production even if
+    the block raises.
+    """
+    with pytest.raises(ValueError):
+        with fc.dev_workspace():
+            assert fc.sdk.session().workspace_id == "dev"
+            raise ValueError
+    assert fc.sdk.session().workspace_id == "production"
+
+
+def test_imap_concurrently_yields_in_order(fc: fetcher.Fetcher):
+    """fetcher._imap_concurrently() should yield results in the order of the
+    items even when later items finish first.
+    """
+
+    def slow_for_small(i: int) -> int:
+        time.sleep(0.05 * (3 - i))
+        return i * 10
+
+    fc.concurrency = 3
+    assert list(fc._imap_concurrently(slow_for_small, [0, 1, 2])) == [0, 10, 20]
+
+
 @pytest.mark.parametrize(
     "limit, input_data, expected_result",
     [
@@ -306,6 +455,42 @@ def test_sort(
     assert result == expected_output
 
 
+MULTI_KEY_DATA: Sequence[Dict[str, Union[str, int]]] = [
+    {"model": "m1", "explore": "a", "join count": 1},
+    {"model": "m2", "explore": "b", "join count": 0},
+    {"model": "m1", "explore": "c", "join count": 2},
+    {"model": "m2", "explore": "d", "join count": 3},
+    {"model": "m1", "explore": "e", "join count": 2},
+]
+
+
+def test_sort_by_multiple_keys(fc: fetcher.Fetcher):
+    """fetcher._sort() should sort by each key in turn, keeping ties in order."""
+    fc.sortkey = [("model", "desc"), ("join count", "asc")]
+    result = fc._sort(MULTI_KEY_DATA)
+    assert [r["explore"] for r in result] == ["b", "d", "a", "c", "e"]
+
+
+@pytest.mark.parametrize(
+    "sortkey, limit",
+    [
+        ([("model", "desc"), ("join count", "asc")], 3),
+        ([("join count", "desc")], 2),
+        (("explore", "asc"), 10),
+    ],
+)
+def test_top_matches_sort_and_limit(
+    fc: fetcher.Fetcher, sortkey: Sequence[Tuple[str, str]], limit: int
+):
+    """fetcher._top() should return the same results as sorting then limiting,
+    from an iterator.
+    """
+    fc.sortkey = sortkey
+    fc.limit = limit
+    expected = fc._limit(fc._sort(MULTI_KEY_DATA))
+    assert fc._top(iter(MULTI_KEY_DATA)) == expected
+
+
 @pytest.mark.parametrize(
     "sortkey", [(("explore", "invalid")), (("invalid field", "asc"))]
 )
@@ -0,0 +1,51 @@
+import json
+
+from henry.modules import field_usage
+
+
+def row(model, explore, fields, filters=None, query_count=1):
+    return {
+        "query.model": model,
+        "query.view": explore,
+        "query.formatted_fields": json.dumps(fields),
+        "query.formatted_filters": filters,
+        "history.query_run_count": query_count,
+    }
+
+
+def test_parse_fields_skips_filters_that_are_also_selected():
+    """field_usage.parse_fields() should count a field used as both a filter and
+    a dimension/measure once, and filter-only fields once per use.
+    """
+    fields = field_usage.parse_fields(
+        '["users.id", "users.count"]', "users.id: >1, orders.status: done"
+    )
+    assert fields == ("users.id", "users.count", "orders.status")
+
+
+def test_count_fields():
+    """field_usage.count_fields() should add up query counts per field."""
+    rows = [
+        row("m", "users", ["users.id", "users.count"], query_count=3),
+        row("m", "users", ["users.id"], "orders.status: done", query_count=2),
+        row("m", "users", ["users.id"], "users.id: 1", query_count=1),
+    ]
+    assert field_usage.count_fields(rows) == {
+        "users.id": 6,
+        "users.count": 3,
+        "orders.status": 2,
+    }
+
+
+def test_count_fields_by_explore():
+    """field_usage.count_fields_by_explore() should keep usage per explore."""
+    rows = [
+        row("m", "users", ["users.id"], query_count=3),
+        row("m", "orders", ["users.id", "orders.id"], query_count=2),
+        row("n", "users", ["users.id"], query_count=1),
+    ]
+    assert field_usage.count_fields_by_explore(rows) == {
+        ("m", "users"): {"users.id": 3},
+        ("m", "orders"): {"users.id": 2, "orders.id": 2},
+        ("n", "users"): {"users.id": 1},
+    }
@@ -0,0 +1,68 @@
+from looker_sdk.sdk.api40 import models
+
+from henry.modules import lookml
+
+Field = models.LookmlModelExploreField
+
+
+def sdk_explore() -> models.LookmlModelExplore:
+    return models.LookmlModelExplore(
+        name="orders",
+        model_name="shop",
+        hidden=False,
+        description="Orders and their users",
+        scopes=["orders", "users"],
+        sql_table_name="public.orders",
+        fields=models.LookmlModelExploreFieldset(
+            dimensions=[
+                Field(name="orders.id", hidden=False, sql="${TABLE}.id"),
+                Field(name="users.id", hidden=True, sql="${TABLE}.id"),
+                Field(name="users.name", hidden=False),
+            ],
+            measures=[Field(name="orders.count", hidden=False)],
+        ),
+    )
+
+
+def test_from_sdk():
+    """Explore.from_sdk() should keep the names henry uses and the non hidden
+    fields, sorted.
+    """
+    explore = lookml.Explore.from_sdk(sdk_explore())
+    assert explore.model_name == "shop"
+    assert explore.name == "orders"
+    assert explore.hidden is False
+    assert explore.description == "Orders and their users"
+    assert explore.scopes == ("orders", "users")
+    assert explore.fields == ("orders.count", "orders.id", "users.name")
+    assert not hasattr(explore, "__dict__")
+
+
+def test_from_sdk_without_fields():
+    """Explore.from_sdk() should handle explores with only dimensions or none."""
+    sdk = models.LookmlModelExplore(
+        name="orders",
+        model_name="shop",
+        fields=models.LookmlModelExploreFieldset(
+            dimensions=[Field(name="orders.id", hidden=False)]
+        ),
+    )
+    assert lookml.Explore.from_sdk(sdk).fields == ("orders.id",)
+    sdk.fields = None
+    explore = lookml.Explore.from_sdk(sdk)
+    assert explore.fields == ()
+    assert explore.hidden is False
+
+
+def test_names_are_interned():
+    """Names shared by explores should be stored once."""
+    a = lookml.Explore.from_sdk(sdk_explore())
+    b = lookml.Explore.from_sdk(sdk_explore())
+    assert all(x is y for x, y in zip(a.fields, b.fields))
+    assert all(x is y for x, y in zip(a.scopes, b.scopes))
+
+
+def test_json_round_trip():
+    """An Explore should be the same once stored as JSON and read back."""
+    explore = lookml.Explore.from_sdk(sdk_explore())
+    assert lookml.Explore.from_json(explore.to_json()) == explore
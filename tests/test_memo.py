@@ -0,0 +1,110 @@
+import threading
+import types
+from concurrent import futures
+from typing import Optional
+
+import pytest  # type: ignore
+import requests
+from looker_sdk.rtl import transport
+
+from henry.modules import memo
+
+GET = transport.HttpMethod.GET
+POST = transport.HttpMethod.POST
+PATCH = transport.HttpMethod.PATCH
+
+
+class Session:
+    """Stands in for requests.Session, counting requests."""
+
+    def __init__(self, status: int = 200, delay: Optional[threading.Event] = None):
+        self.headers: dict = {}
+        self.calls = 0
+        self.status = status
+        self.delay = delay
+
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        if self.delay:
+            self.delay.wait(1)
+        response = requests.Response()
+        response.status_code = self.status
+        response._content = f'{{"call": {self.calls}}}'.encode()
+        response.headers["Content-Type"] = "application/json"
+        return response
+
+
+@pytest.fixture(name="session")
+def initialize_session() -> Session:
+    return Session()
+
+
+def make_transport(session: Session, **kwargs) -> memo.MemoizingTransport:
+    settings = types.SimpleNamespace(
+        agent_tag="test", headers=None, verify_ssl=True, timeout=10
+    )
+    return memo.MemoizingTransport(settings, session, **kwargs)
+
+
+def test_repeated_calls_are_memoized(session: Session):
+    """MemoizingTransport should only send a GET or query run once."""
+    t = make_transport(session)
+    first = t.request(GET, "/api/4.0/lookml_models", {"fields": "name"})
+    assert t.request(GET, "/api/4.0/lookml_models", {"fields": "name"}) is first
+    t.request(GET, "/api/4.0/lookml_models", {"fields": "label"})
+    assert session.calls == 2
+
+    t.request(POST, "/api/4.0/queries/run/json", body=b'{"model": "m"}')
+    t.request(POST, "/api/4.0/queries/run/json", body=b'{"model": "m"}')
+    t.request(POST, "/api/4.0/queries/run/json", body=b'{"model": "n"}')
+    assert session.calls == 4
+    assert t.hits == 2
+
+
+def test_other_calls_clear_memoized_responses(session: Session):
+    """MemoizingTransport should forget responses after a call that may change
+    them, but not after logging in.
+    """
+    t = make_transport(session)
+    t.request(GET, "/api/4.0/user")
+    t.request(POST, "/api/4.0/login")
+    t.request(GET, "/api/4.0/user")
+    assert session.calls == 2
+    t.request(PATCH, "/api/4.0/session", body=b'{"workspace_id": "dev"}')
+    t.request(GET, "/api/4.0/user")
+    assert session.calls == 4
+
+
+def test_errors_are_not_memoized():
+    """MemoizingTransport should send failed calls again."""
+    session = Session(status=500)
+    t = make_transport(session)
+    assert not t.request(GET, "/api/4.0/user").ok
+    t.request(GET, "/api/4.0/user")
+    assert session.calls == 2
+
+
+def test_concurrent_calls_are_coalesced():
+    """MemoizingTransport should send identical calls made at once only once."""
+    release = threading.Event()
+    session = Session(delay=release)
+    t = make_transport(session)
+    with futures.ThreadPoolExecutor(max_workers=4) as pool:
+        results = [pool.submit(t.request, GET, "/api/4.0/user") for _ in range(4)]
+        release.set()
+        values = {r.result().value for r in results}
+    assert session.calls == 1
+    assert values == {b'{"call": 1}'}
+
+
+def test_responses_are_evicted_beyond_max_size(session: Session):
+    """MemoizingTransport should keep at most max_size bytes of responses."""
+    t = make_transport(session, max_size=len(b'{"call": 1}') * 2)
+    t.request(GET, "/api/4.0/a")
+    t.request(GET, "/api/4.0/b")
+    t.request(GET, "/api/4.0/c")
+    assert session.calls == 3
+    t.request(GET, "/api/4.0/c")
+    assert session.calls == 3
+    t.request(GET, "/api/4.0/a")
+    assert session.calls == 4
@@ -0,0 +1,174 @@
+import threading
+import time
+import types
+from concurrent import futures
+from typing import List, Tuple
+
+import pytest  # type: ignore
+
+from henry.commands import serve
+from henry.modules import fetcher
+
+
+class Transport:
+    """Stands in for the memoizing transport, counting clears."""
+
+    def __init__(self):
+        self.clears = 0
+
+    def clear(self):
+        self.clears += 1
+
+
+@pytest.fixture(name="service")
+def initialize_service(monkeypatch: pytest.MonkeyPatch) -> serve.Service:
+    sdk = types.SimpleNamespace(transport=Transport())
+    monkeypatch.setattr(
+        fetcher,
+        "Fetcher",
+        lambda options: types.SimpleNamespace(sdk=sdk, cache=None, usage_store=None),
+    )
+    service = serve.Service(fetcher.Input(command="serve", sections=["Looker"]))
+    computed = []
+
+    def compute(request: fetcher.Input) -> serve.Result:
+        computed.append(request)
+        return serve.Result(str(len(computed)).encode(), 0.0)
+
+    monkeypatch.setattr(service, "_compute", compute)
+    service.computed = computed  # type: ignore
+    return service
+
+
+def test_parse(service: serve.Service):
+    """parse should map a URL to the input of the command it names."""
+    request = service.parse("/vacuum/explores", "model=m&min_queries=2&limit=5")
+    assert request.command == "vacuum"
+    assert request.subcommand == "explores"
+    assert request.model == "m"
+    assert request.min_queries == 2
+    assert request.limit == (5,)
+    assert request.sections is None
+
+    request = service.parse("/pulse/", "")
+    assert request.command == "pulse"
+    assert request.subcommand is None
+
+    request = service.parse(
+        "/analyze/models", "order_by=Query+Count:desc&order_by=Model"
+    )
+    assert request.sortkey == (("Query Count", "desc"), ("Model", "asc"))
+    # Equivalent requests are kept once
+    assert request == service.parse(
+        "/analyze/models", "order_by=Query Count:desc&order_by=Model"
+    )
+
+
+@pytest.mark.parametrize(
+    "path, query, status",
+    [
+        ("/analyze", "", 404),
+        ("/vacuum/projects", "", 404),
+        ("/vacuum/models", "days=3", 400),
+        ("/vacuum/models", "timeframe=a", 400),
+        ("/vacuum/models", "model=a&model=b", 400),
+        ("/analyze/models", "order_by=Nope:desc", 400),
+        ("/analyze/models", "order_by=Model:sideways", 400),
+        ("/pulse", "order_by=Model", 400),
+    ],
+)
+def test_parse_rejects_invalid_requests(
+    service: serve.Service, path: str, query: str, status: int
+):
+    """parse should reject unknown commands and parameters."""
+    with pytest.raises(serve.RequestError) as e:
+        service.parse(path, query)
+    assert e.value.status == status
+
+
+def test_get_keeps_results(service: serve.Service):
+    """get should only compute a result the first time it's requested."""
+    request = service.parse("/analyze/models", "")
+    assert service.get(request).body == b"1"
+    assert service.get(request).body == b"1"
+    assert service.get(service.parse("/analyze/models", "model=m")).body == b"2"
+
+
+def test_get_computes_concurrent_requests_once(service: serve.Service):
+    """Identical requests made while a result is computed should wait for it."""
+    started, release = threading.Event(), threading.Event()
+
+    def compute(request: fetcher.Input) -> serve.Result:
+        started.set()
+        release.wait(1)
+        return serve.Result(b"[]", 0.0)
+
+    service._compute = compute  # type: ignore
+    request = service.parse("/vacuum/models", "")
+    with futures.ThreadPoolExecutor(max_workers=2) as pool:
+        first = pool.submit(service.get, request)
+        started.wait(1)
+        second = pool.submit(service.get, request)
+        release.set()
+        assert first.result() is second.result()
+
+
+def test_refresh(service: serve.Service):
+    """refresh should forget API responses, recompute requested results with
+    the metadata cache refreshed and drop results that are no longer requested.
+    """
+    pulse = service.parse("/pulse", "")
+    models = service.parse("/analyze/models", "")
+    service.get(pulse)
+    service.get(models)
+    service.refresh()
+    assert service.sdk.transport.clears == 1
+    # pulse is refreshed last since it forgets memoized responses
+    assert service.computed[2:] == [  # type: ignore
+        models._replace(refresh_cache=True),
+        pulse._replace(refresh_cache=True),
+    ]
+    assert service.get(models).body == b"3"
+
+    for _ in range(serve.IDLE_REFRESHES):
+        service.get(models)
+        service.refresh()
+    assert service._results.keys() == {models}
+
+
+def test_dev_workspace_commands_run_alone(
+    service: serve.Service, monkeypatch: pytest.MonkeyPatch
+):
+    """Commands switching the shared session to the dev workspace should not run
+    at the same time as any other command.
+    """
+    running: List[str] = []
+    overlaps: List[Tuple[str, List[str]]] = []
+    lock = threading.Lock()
+
+    class Command:
+        def __init__(self, request: fetcher.Input, sdk):
+            self.path = serve._path(request)
+
+        def ordered_results(self, request: fetcher.Input):
+            with lock:
+                overlaps.append((self.path, list(running)))
+                running.append(self.path)
+            time.sleep(0.05)
+            with lock:
+                running.remove(self.path)
+            return []
+
+    monkeypatch.setattr(serve, "COMMANDS", dict.fromkeys(serve.COMMANDS, Command))
+    paths = ["/analyze/models", "/analyze/projects", "/vacuum/models"] * 2
+    with futures.ThreadPoolExecutor(max_workers=len(paths)) as pool:
+        list(
+            pool.map(
+                lambda p: serve.Service._compute(service, service.parse(p, "")), paths
+            )
+        )
+    assert len(overlaps) == len(paths)
+    for path, others in overlaps:
+        assert "/analyze/projects" not in others
+        if path == "/analyze/projects":
+            assert not others
@@ -0,0 +1,76 @@
+import pytest  # type: ignore
+from looker_sdk.rtl import transport
+
+from henry.modules import snapshot
+
+GET = transport.HttpMethod.GET
+POST = transport.HttpMethod.POST
+
+
+class Transport(transport.Transport):
+    """Stands in for the SDK transport, answering with the number of calls made."""
+
+    def __init__(self):
+        self.calls = 0
+
+    @classmethod
+    def configure(cls, settings):
+        return cls()
+
+    def request(self, method, path, query_params=None, body=None, *args, **kwargs):
+        self.calls += 1
+        return transport.Response(
+            True, str(self.calls).encode(), transport.ResponseMode.STRING
+        )
+
+
+def test_snapshot_replays_recorded_responses(tmp_path):
+    """A saved snapshot should answer the calls that were recorded, in order."""
+    recorded = snapshot.Snapshot("https://looker.example.com:19999")
+    recorder = snapshot.RecordingTransport(Transport(), recorded)
+    url = "https://looker.example.com:19999/api/4.0"
+    recorder.request(POST, f"{url}/login")
+    recorder.request(GET, f"{url}/lookml_models", {"fields": "name", "x": None})
+    recorder.request(POST, f"{url}/queries/run/json", body=b'{"model": "m"}')
+    recorder.request(POST, f"{url}/queries/run/json", body=b'{"model": "m"}')
+    path = str(tmp_path / "snapshot.henry")
+    recorded.save(path)
+
+    loaded = snapshot.Snapshot.load(path)
+    assert loaded.base_url == "https://looker.example.com:19999"
+    replay = snapshot.ReplayTransport(loaded)
+    # The host doesn't matter, and responses are returned in the order recorded
+    response = replay.request(
+        GET, "http://other/api/4.0/lookml_models", {"fields": "name"}
+    )
+    assert response.value == b"2"
+    assert response.response_mode == transport.ResponseMode.STRING
+    body = b'{"model": "m"}'
+    assert replay.request(POST, f"{url}/queries/run/json", body=body).value == b"3"
+    assert replay.request(POST, f"{url}/queries/run/json", body=body).value == b"4"
+    assert replay.request(POST, f"{url}/queries/run/json", body=body).value == b"4"
+
+
+def test_snapshot_does_not_record_logins():
+    """RecordingTransport should leave access tokens out of snapshots."""
+    recorded = snapshot.Snapshot()
+    snapshot.RecordingTransport(Transport(), recorded).request(POST, "/api/4.0/login")
+    with pytest.raises(snapshot.SnapshotError):
+        snapshot.ReplayTransport(recorded).request(POST, "/api/4.0/login")
+
+
+def test_use_saves_recordings_only_on_success(tmp_path):
+    """snapshot.use() should save a recording once its block completes."""
+    path = tmp_path / "snapshot.henry"
+    with pytest.raises(RuntimeError):
+        with snapshot.use(record=str(path)):
+            assert snapshot.recording() is not None
+            raise RuntimeError
+    assert not path.exists()
+    assert snapshot.recording() is None
+
+    with snapshot.use(record=str(path)):
+        pass
+    with snapshot.use(replay=str(path)):
+        assert snapshot.replaying() is not None
+    assert snapshot.replaying() is None
@@ -0,0 +1,77 @@
+import json
+
+from henry.modules import tracing
+
+
+def test_endpoint_replaces_ids():
+    """tracing.endpoint() should group calls to the same endpoint."""
+    assert (
+        tracing.endpoint("GET", "https://x:19999/api/4.0/lookml_models/m/explores/e")
+        == "GET /lookml_models/:id/explores/:id"
+    )
+    assert (
+        tracing.endpoint("POST", "https://x/api/4.0/queries/run/json?cache=true")
+        == "POST /queries/run/:id"
+    )
+    assert tracing.endpoint("POST", "https://x/api/4.0/login") == "POST /login"
+
+
+def test_summary():
+    """Tracer.summary() should aggregate calls per endpoint, slowest first."""
+    tracer = tracing.Tracer()
+    tracer.record("GET", "/api/4.0/lookml_models/a", 200, 0, 0.1, 100)
+    tracer.record("GET", "/api/4.0/lookml_models/b", 404, 0, 0.3, 50, retries=2)
+    tracer.record("POST", "/api/4.0/login", 200, 0, 0.2, 10)
+    assert tracer.summary() == [
+        {
+            "Endpoint": "GET /lookml_models/:id",
+            "Calls": 2,
+            "Errors": 1,
+            "Retries": 2,
+            "Total (s)": 0.4,
+            "Mean (ms)": 200,
+            "Max (ms)": 300,
+            "Received (KB)": 0,
+        },
+        {
+            "Endpoint": "POST /login",
+            "Calls": 1,
+            "Errors": 0,
+            "Retries": 0,
+            "Total (s)": 0.2,
+            "Mean (ms)": 200,
+            "Max (ms)": 200,
+            "Received (KB)": 0,
+        },
+    ]
+
+
+def test_chrome_trace_lays_out_concurrent_calls(tmp_path):
+    """Tracer.write_chrome_trace() should put overlapping calls on separate rows and
+    reuse rows once calls have finished.
+    """
+    tracer = tracing.Tracer()
+    start = tracer.started
+    tracer.record("GET", "/api/4.0/lookml_models/a", 200, start, start + 1, 1)
+    tracer.record("GET", "/api/4.0/lookml_models/b", 200, start + 0.5, start + 2, 1)
+    tracer.record("GET", "/api/4.0/lookml_models/c", 200, start + 1, start + 3, 1)
+    path = tmp_path / "trace.json"
+    tracer.write_chrome_trace(str(path))
+    events = json.loads(path.read_text())["traceEvents"]
+    assert [(e["ts"], e["dur"], e["tid"]) for e in events] == [
+        (0, 1000000, 0),
+        (500000, 1500000, 1),
+        (1000000, 2000000, 0),
+    ]
+
+
+def test_trace_is_only_active_when_asked_for(tmp_path):
+    """tracing.trace() should only record calls when profiling or tracing."""
+    with tracing.trace() as tracer:
+        assert tracer is None
+        assert tracing.active() is None
+    path = tmp_path / "trace.json"
+    with tracing.trace(trace_file=str(path)) as tracer:
+        assert tracing.active() is tracer
+    assert tracing.active() is None
+    assert json.loads(path.read_text())["traceEvents"] == []
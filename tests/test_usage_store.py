@@ -0,0 +1,87 @@
+import datetime
+from concurrent import futures
+
+import pytest  # type: ignore
+
+from henry.modules import usage_store
+
+
+@pytest.fixture(name="store")
+def initialize(tmp_path) -> usage_store.UsageStore:
+    """Returns a usage store in a temporary directory."""
+    return usage_store.UsageStore(namespace=("url", "section"), directory=str(tmp_path))
+
+
+def days_ago(n: int) -> str:
+    day = datetime.date.today() - datetime.timedelta(days=n)
+    return day.strftime(usage_store.DAY_FORMAT)
+
+
+def test_window_ends_today():
+    """usage_store.window() should return the last n days, oldest first."""
+    assert usage_store.UsageStore.window(3) == [days_ago(2), days_ago(1), days_ago(0)]
+
+
+def test_missing_days(store: usage_store.UsageStore):
+    """store.missing_days() should only return days that have not been synced,
+    always including today.
+    """
+    assert store.missing_days(usage_store.EXPLORE, 3) == [
+        days_ago(2),
+        days_ago(1),
+        days_ago(0),
+    ]
+    for n in range(3):
+        store.save_day(usage_store.EXPLORE, days_ago(n), [])
+    assert store.missing_days(usage_store.EXPLORE, 3) == [days_ago(0)]
+    assert store.missing_days(usage_store.FIELD, 1) == [days_ago(0)]
+
+
+def test_usage_is_summed_over_the_timeframe(store: usage_store.UsageStore):
+    """store.explore_usage() and store.field_usage() should sum daily usage over
+    the requested timeframe.
+    """
+    for n in range(3):
+        store.save_day(
+            usage_store.EXPLORE, days_ago(n), [("model", "explore", "", n + 1)]
+        )
+        store.save_day(
+            usage_store.FIELD,
+            days_ago(n),
+            [("model", "explore", "view.field", 10), ("other", "e", "v.f", 1)],
+        )
+    assert store.explore_usage(3) == {"model": {"explore": 6}}
+    assert store.explore_usage(2) == {"model": {"explore": 3}}
+    assert store.field_usage(2, model="model") == {
+        ("model", "explore"): {"view.field": 20}
+    }
+
+
+def test_save_day_replaces_existing_usage(store: usage_store.UsageStore):
+    """store.save_day() should replace the usage previously stored for a day."""
+    store.save_day(usage_store.EXPLORE, days_ago(0), [("model", "explore", "", 1)])
+    store.save_day(usage_store.EXPLORE, days_ago(0), [("model", "explore", "", 5)])
+    assert store.explore_usage(1) == {"model": {"explore": 5}}
+
+
+def test_prune_removes_old_usage(store: usage_store.UsageStore):
+    """store.prune() should drop usage older than the maximum timeframe."""
+    old = days_ago(usage_store.MAX_DAYS + 1)
+    store.save_day(usage_store.EXPLORE, old, [("model", "explore", "", 1)])
+    store.prune()
+    count = store.conn.execute("SELECT COUNT(*) FROM usage").fetchone()[0]
+    assert count == 0
+
+
+def test_store_can_be_used_from_other_threads(store: usage_store.UsageStore):
+    """A store created in one thread should be usable from several others, as
+    when running on several instances.
+    """
+
+    def sync(n: int):
+        store.save_day(usage_store.EXPLORE, days_ago(n), [("model", "explore", "", 1)])
+        return store.missing_days(usage_store.EXPLORE, 1)
+
+    with futures.ThreadPoolExecutor(max_workers=4) as pool:
+        assert list(pool.map(sync, range(8))) == [[days_ago(0)]] * 8
+    assert store.explore_usage(8) == {"model": {"explore": 8}}
@@ -0,0 +1,94 @@
+import json
+import pathlib
+
+import pytest  # type: ignore
+
+from henry.modules import writers
+
+ROWS = [
+    {"Model": "a", "Unused Explores": "e1\ne2", "Query Count": 3},
+    {"Model": "b", "Unused Explores": "", "Query Count": 0},
+]
+
+
+@pytest.mark.parametrize("fmt", ["csv", "jsonl", "json"])
+def test_writers_write_nothing_but_a_valid_file_for_no_rows(tmp_path, fmt):
+    """writers should produce a valid (empty) file when there are no rows."""
+    path = str(tmp_path / f"out.{fmt}")
+    with writers.open_writer(fmt, path):
+        pass
+    content = pathlib.Path(path).read_text()
+    if fmt == "json":
+        assert json.loads(content) == []
+    else:
+        assert content == ""
+
+
+def test_csv_writer(tmp_path):
+    """writers.CsvWriter should write a header and replace newlines in values."""
+    path = str(tmp_path / "out.csv")
+    with writers.open_writer("csv", path) as w:
+        for row in ROWS:
+            w.write(row)
+    assert pathlib.Path(path).read_text().splitlines() == [
+        "Model,Unused Explores,Query Count",
+        "a,\"e1,e2\",3",
+        "b,,0",
+    ]
+
+
+def test_json_lines_writer_flushes_each_row(tmp_path):
+    """writers.JsonLinesWriter should make each row readable once written."""
+    path = str(tmp_path / "out.jsonl")
+    with writers.open_writer("jsonl", path) as w:
+        w.write(ROWS[0])
+        with open(path) as f:
+            assert [json.loads(line) for line in f] == ROWS[:1]
+        w.write(ROWS[1])
+    with open(path) as f:
+        assert [json.loads(line) for line in f] == ROWS
+
+
+def test_json_writer(tmp_path):
+    """writers.JsonWriter should write a JSON array of rows."""
+    path = str(tmp_path / "out.json")
+    with writers.open_writer("json", path) as w:
+        for row in ROWS:
+            w.write(row)
+    with open(path) as f:
+        assert json.load(f) == ROWS
+
+
+def test_open_writer_throws_for_unknown_formats(tmp_path):
+    """writers.open_writer() should reject unknown formats."""
+    with pytest.raises(ValueError):
+        writers.open_writer("xml", str(tmp_path / "out.xml"))
+
+
+def test_table_writer_wraps_values_to_the_first_rows_widths(tmp_path):
+    """writers.TableWriter should fix column widths from the first row and wrap
+    longer values in later rows.
+    """
+    path = str(tmp_path / "out.txt")
+    with writers.TableWriter(path, min_width=5, max_width=10) as w:
+        w.write({"Model": "a", "Count": 1})
+        w.write({"Model": "a_long_model", "Count": 100})
+    assert pathlib.Path(path).read_text().splitlines() == [
+        "+-------+-------+",
+        "| Model | Count |",
+        "|-------+-------|",
+        "| a     |   1   |",
+        "| a_lon |  100  |",
+        "| g_mod |       |",
+        "| el    |       |",
+        "+-------+-------+",
+        "",
+    ]
+
+
+def test_table_writer_without_rows(tmp_path):
+    """writers.TableWriter should say so when there are no results."""
+    path = str(tmp_path / "out.txt")
+    with writers.TableWriter(path):
+        pass
+    assert pathlib.Path(path).read_text() == "No results found.\n\n"